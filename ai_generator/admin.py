@@ -1,3 +1,19 @@
 from django.contrib import admin
+from .models import GenerationJob, GenerationRun
 
-# Register your models here.
+
+class GenerationJobAdmin(admin.ModelAdmin):
+    list_display = ('keyword', 'author', 'status', 'attempts', 'created_on', 'finished_on')
+    list_filter = ('status', 'language')
+    raw_id_fields = ('author', 'post')
+
+
+class GenerationRunAdmin(admin.ModelAdmin):
+    list_display = ('keyword', 'source', 'outcome', 'model', 'total_ms', 'search_ms',
+                    'generation_ms', 'prompt_tokens', 'completion_tokens', 'retries', 'created_on')
+    list_filter = ('outcome', 'source', 'model')
+    raw_id_fields = ('author', 'job')
+
+
+admin.site.register(GenerationJob, GenerationJobAdmin)
+admin.site.register(GenerationRun, GenerationRunAdmin)
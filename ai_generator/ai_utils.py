@@ -1,32 +1,58 @@
 """
 AI Article Generation utilities
-Generates plain text articles using OpenAI API
+Generates plain text articles through the configured LLM and search
+providers (ai_generator.providers)
 """
 import logging
-from typing import Dict
+from typing import AsyncIterator, Dict, Iterator, Optional
 import requests
-from openai import OpenAI
+from asgiref.sync import sync_to_async
+from openai import AsyncOpenAI, OpenAI
+from simple_blog_ai.request_timing import timed
+from . import dedupe, resilience, search_cache
+from .providers import LLMProvider, OpenAIProvider, SearchProvider, ValueSerpProvider
+from .telemetry import Telemetry
 
 logger = logging.getLogger(__name__)
 
+VALUESERP_URL = "https://api.valueserp.com/search"
+
+
+class GenerationError(Exception):
+    """
+    The completion failed; the upstream error is chained as __cause__
+    """
+
 
 class ArticleGenerator:
     """
-    Handles AI-powered article generation using OpenAI API
+    Handles AI-powered article generation
     Output: plain text, well-structured
+    Pass `llm`/`search` providers, or the OpenAI/ValueSerp keys and URLs
     """
     
-    def __init__(self, openai_key: str, valueserp_key: str):
-        self.client = OpenAI(api_key=openai_key)
-        self.valueserp_key = valueserp_key
-        self.model = "gpt-4o-mini"
+    def __init__(self, openai_key: str = "", valueserp_key: str = "",
+                 openai_base_url: Optional[str] = None,
+                 search_url: str = VALUESERP_URL,
+                 client: Optional[OpenAI] = None,
+                 session: Optional[requests.Session] = None,
+                 async_client: Optional[AsyncOpenAI] = None,
+                 llm: Optional[LLMProvider] = None,
+                 search: Optional[SearchProvider] = None):
+        # Pooled per-process clients keep connections warm between requests
+        self.llm = llm or OpenAIProvider(openai_key, openai_base_url, client, async_client)
+        self.search = search or ValueSerpProvider(valueserp_key, search_url, session)
+        self.model = self.llm.model
+        # Timings and token usage of the latest call (ai_generator.telemetry)
+        self.telemetry = Telemetry(self.model)
     
     def generate_article(self, keyword: str, language: str = "en", 
                         tone: str = "professional", target_audience: str = "general",
                         min_words: int = 800, max_words: int = 1200,
-                        country: str = "us") -> str:
+                        country: str = "us", force_fresh: bool = False) -> str:
         """
         Generate plain text article based on parameters
+        Identical requests (same model and final prompt) share one completion
         
         Args:
             keyword: Main topic/keyword
@@ -36,12 +62,16 @@ class ArticleGenerator:
             min_words: Minimum word count
             max_words: Maximum word count
             country: Country code for search context
+            force_fresh: Always call the API, never reuse a recent result
             
         Returns:
             Plain text article content
         """
+        self.telemetry = Telemetry(self.model)
+
         # Search context from web
-        context = self._search_context(keyword, country, language)
+        with self.telemetry.phase("search"):
+            context = self._search_context(keyword, country, language)
         
         # Build prompt
         prompt = self._build_prompt(
@@ -49,49 +79,123 @@ class ArticleGenerator:
             min_words, max_words, context
         )
         
-        # Generate via OpenAI
-        article_text = self._generate_with_openai(prompt, language)
+        # Generate via the LLM provider, deduplicated on the final prompt
+        article_text = dedupe.get_or_generate(
+            dedupe.request_key(self.model, prompt),
+            lambda: self._generate_with_openai(prompt, language),
+            force_fresh=force_fresh
+        )
+        self.telemetry.finish(article_text)
         
         return article_text
-    
+
+    def stream_article(self, keyword: str, language: str = "en",
+                       tone: str = "professional", target_audience: str = "general",
+                       min_words: int = 800, max_words: int = 1200,
+                       country: str = "us", force_fresh: bool = False) -> Iterator[str]:
+        """
+        Same as generate_article, but yields text fragments as the LLM produces them
+
+        The first fragments arrive after the search call plus the model's
+        time-to-first-token, instead of after the whole completion. A recent
+        identical completion (or one still in flight, once it finishes) is
+        replayed in one fragment unless force_fresh.
+        """
+        self.telemetry = Telemetry(self.model)
+        with self.telemetry.phase("search"):
+            context = self._search_context(keyword, country, language)
+        prompt = self._build_prompt(
+            keyword, language, tone, target_audience,
+            min_words, max_words, context
+        )
+        key = dedupe.request_key(self.model, prompt)
+
+        if not force_fresh:
+            article = dedupe.reuse_or_claim(key)
+            if article is not None:
+                self.telemetry.finish(article)
+                yield article
+                return
+
+        try:
+            parts = []
+            for fragment in self._stream_with_openai(prompt, language):
+                parts.append(fragment)
+                yield fragment
+            article = "".join(parts).strip()
+            self.telemetry.finish(article)
+            dedupe.remember(key, article)
+        finally:
+            if not force_fresh:
+                dedupe.release(key)
+
+    async def astream_article(self, keyword: str, language: str = "en",
+                              tone: str = "professional", target_audience: str = "general",
+                              min_words: int = 800, max_words: int = 1200,
+                              country: str = "us", force_fresh: bool = False) -> AsyncIterator[str]:
+        """
+        stream_article for async views: the completion streams over the
+        provider's async client, so a slow generation holds no worker thread
+        """
+        self.telemetry = Telemetry(self.model)
+        # Search and cache calls are short and sync; run them off the event loop
+        with self.telemetry.phase("search"):
+            context = await sync_to_async(self._search_context)(keyword, country, language)
+        prompt = self._build_prompt(
+            keyword, language, tone, target_audience,
+            min_words, max_words, context
+        )
+        key = dedupe.request_key(self.model, prompt)
+
+        if not force_fresh:
+            # May wait on an identical in-flight request; keep that off the
+            # shared sync thread
+            article = await sync_to_async(dedupe.reuse_or_claim, thread_sensitive=False)(key)
+            if article is not None:
+                self.telemetry.finish(article)
+                yield article
+                return
+
+        try:
+            parts = []
+            async for fragment in self._astream_with_openai(prompt, language):
+                parts.append(fragment)
+                yield fragment
+            article = "".join(parts).strip()
+            self.telemetry.finish(article)
+            await sync_to_async(dedupe.remember)(key, article)
+        finally:
+            if not force_fresh:
+                await sync_to_async(dedupe.release)(key)
+
     def _search_context(self, keyword: str, country: str, lang: str) -> Dict:
         """
-        Search web for context using ValueSerp API
-        Returns overview and URLs
+        Search web for context through the search provider
+        Returns overview and URLs, served from the shared cache when possible
+        While the search breaker is open only cached context is used, so a
+        degraded search API adds no latency to generation
         """
-        context = {"overview": "", "urls": []}
-        
         try:
-            response = requests.get(
-                "https://api.valueserp.com/search",
-                params={
-                    "api_key": self.valueserp_key,
-                    "q": keyword,
-                    "hl": lang,
-                    "gl": country,
-                    "num": 5
-                },
-                timeout=10
+            if resilience.get_breaker("search").is_open():
+                return search_cache.get_cached(keyword, country, lang) or {"overview": "", "urls": []}
+            return search_cache.get_or_fetch(
+                keyword, country, lang,
+                lambda: self._fetch_search_context(keyword, country, lang)
             )
-            
-            if response.status_code == 200:
-                data = response.json()
-                
-                # Get answer box if available
-                if answer_box := data.get("answer_box"):
-                    context["overview"] = (
-                        answer_box.get("answer") or 
-                        answer_box.get("snippet") or ""
-                    )[:600]
-                
-                # Get top URLs
-                organic = data.get("organic_results", [])[:3]
-                context["urls"] = [r["link"] for r in organic if r.get("link")]
-                
         except Exception as e:
             logger.warning(f"Search error for '{keyword}': {e}")
-        
-        return context
+            return {"overview": "", "urls": []}
+
+    def _fetch_search_context(self, keyword: str, country: str, lang: str) -> Dict:
+        """
+        Call the search provider; raises on failure so errors are never cached
+        """
+        with timed("search"):
+            return resilience.call(
+                "search",
+                lambda timeout: self.search.search(keyword, country, lang, timeout),
+                on_retry=self.telemetry.retried
+            )
     
     def _build_prompt(self, keyword: str, language: str, tone: str,
                     audience: str, min_words: int, max_words: int,
@@ -136,36 +240,94 @@ class ArticleGenerator:
         return prompt
 
     
+    def _messages(self, prompt: str, language: str) -> list:
+        """
+        Chat messages shared by the blocking and streaming calls
+        """
+        return [
+            {
+                "role": "system",
+                "content": f"You are a professional {language} content writer. Always write ONLY in {language}. Return plain text, well-structured for a blog."
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+
     def _generate_with_openai(self, prompt: str, language: str) -> str:
         """
-        Call OpenAI API to generate plain text article
+        Call the LLM provider to generate plain text article
         """
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": f"You are a professional {language} content writer. Always write ONLY in {language}. Return plain text, well-structured for a blog."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=0.7,
-                max_tokens=3000
-            )
-            
-            # Safe extraction
-            message_content = response.choices[0].message.content
+            with timed("ai"), self.telemetry.phase("generation"):
+                message_content, usage = resilience.call(
+                    "openai",
+                    lambda timeout: self.llm.complete(self._messages(prompt, language), timeout),
+                    on_retry=self.telemetry.retried
+                )
+            self.telemetry.add_usage(usage)
             
             if message_content is None:
-                raise ValueError("OpenAI returned empty content")
+                raise ValueError(f"{self.model} returned empty content")
             
             article = message_content.strip()
             return article
             
         except Exception as e:
-            logger.error(f"OpenAI API error: {e}")
-            raise Exception(f"Failed to generate article: {str(e)}")
+            logger.error(f"LLM error ({self.model}): {e}")
+            raise GenerationError(f"Failed to generate article: {str(e)}") from e
+
+    def _stream_with_openai(self, prompt: str, language: str) -> Iterator[str]:
+        """
+        Stream a completion from the LLM provider and yield content deltas
+        """
+        try:
+            # Includes the consumer's time between fragments
+            with timed("ai"), self.telemetry.phase("generation"):
+                # Retried only until the stream opens, never mid-article
+                deltas = resilience.call(
+                    "openai",
+                    lambda timeout: self.llm.open_stream(self._messages(prompt, language), timeout),
+                    on_retry=self.telemetry.retried
+                )
+
+                received = False
+                for text, usage in deltas:
+                    self.telemetry.add_usage(usage)
+                    if text:
+                        received = True
+                        yield text
+
+            if not received:
+                raise ValueError(f"{self.model} returned empty content")
+
+        except Exception as e:
+            logger.error(f"LLM error ({self.model}): {e}")
+            raise GenerationError(f"Failed to generate article: {str(e)}") from e
+
+    async def _astream_with_openai(self, prompt: str, language: str) -> AsyncIterator[str]:
+        """
+        _stream_with_openai over the provider's async stream
+        """
+        try:
+            with timed("ai"), self.telemetry.phase("generation"):
+                deltas = await resilience.acall(
+                    "openai",
+                    lambda timeout: self.llm.aopen_stream(self._messages(prompt, language), timeout),
+                    on_retry=self.telemetry.retried
+                )
+
+                received = False
+                async for text, usage in deltas:
+                    self.telemetry.add_usage(usage)
+                    if text:
+                        received = True
+                        yield text
+
+            if not received:
+                raise ValueError(f"{self.model} returned empty content")
+
+        except Exception as e:
+            logger.error(f"LLM error ({self.model}): {e}")
+            raise GenerationError(f"Failed to generate article: {str(e)}") from e
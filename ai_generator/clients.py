@@ -0,0 +1,129 @@
+"""
+Process-wide HTTP clients for the AI and search APIs
+Clients are created once per process and reused, so requests go over warm
+keep-alive connections instead of a new TCP/TLS handshake each time
+"""
+import asyncio
+import os
+import threading
+import weakref
+
+import httpx
+import requests
+from django.conf import settings
+from openai import AsyncOpenAI, OpenAI
+from requests.adapters import HTTPAdapter
+
+_lock = threading.Lock()
+_pid = os.getpid()
+_openai_clients = {}
+# Async clients are bound to the event loop that created them
+_async_openai_clients = weakref.WeakKeyDictionary()
+_http_session = None
+
+
+def reset():
+    """
+    Forget every client; the next call builds fresh ones
+
+    Used after fork: sockets inherited from the parent must not be shared
+    between processes, so the child drops them without closing them.
+    """
+    global _pid, _http_session
+    with _lock:
+        _pid = os.getpid()
+        _openai_clients.clear()
+        _async_openai_clients.clear()
+        _http_session = None
+
+
+def _after_fork():
+    """
+    Child-side fork hook: the parent's lock may have been held mid-fork,
+    so replace it instead of acquiring it
+    """
+    global _lock
+    _lock = threading.Lock()
+    reset()
+
+
+def _check_fork():
+    if os.getpid() != _pid:
+        _after_fork()
+
+
+def _limits():
+    return httpx.Limits(
+        max_connections=settings.AI_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.AI_HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=settings.AI_HTTP_KEEPALIVE_EXPIRY,
+    )
+
+
+def get_openai_client(api_key, base_url=None):
+    """
+    Shared OpenAI client (and its httpx connection pool) for this key/URL
+    """
+    _check_fork()
+    key = (api_key, base_url)
+    client = _openai_clients.get(key)
+    if client is None:
+        with _lock:
+            client = _openai_clients.get(key)
+            if client is None:
+                client = OpenAI(
+                    api_key=api_key,
+                    base_url=base_url,
+                    http_client=httpx.Client(limits=_limits()),
+                    # Retries and timeouts come from ai_generator.resilience
+                    max_retries=0,
+                )
+                _openai_clients[key] = client
+    return client
+
+
+def get_async_openai_client(api_key, base_url=None):
+    """
+    Shared AsyncOpenAI client for this key/URL on the running event loop
+    Under an ASGI server that is one pool per worker process
+    """
+    _check_fork()
+    loop = asyncio.get_running_loop()
+    with _lock:
+        per_loop = _async_openai_clients.setdefault(loop, {})
+        client = per_loop.get((api_key, base_url))
+        if client is None:
+            client = AsyncOpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                http_client=httpx.AsyncClient(limits=_limits()),
+                max_retries=0,
+            )
+            per_loop[(api_key, base_url)] = client
+    return client
+
+
+def get_http_session():
+    """
+    Shared requests.Session with a bounded keep-alive pool
+    """
+    global _http_session
+    _check_fork()
+    session = _http_session
+    if session is None:
+        with _lock:
+            if _http_session is None:
+                adapter = HTTPAdapter(
+                    pool_connections=settings.AI_HTTP_MAX_KEEPALIVE,
+                    pool_maxsize=settings.AI_HTTP_MAX_CONNECTIONS,
+                )
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _http_session = session
+            session = _http_session
+    return session
+
+
+# Gunicorn and the generation worker may fork after clients exist
+os.register_at_fork(after_in_child=_after_fork)
@@ -0,0 +1,116 @@
+"""
+Content-addressed deduplication of article generations
+Requests are keyed on a hash of the model name and the final prompt, so
+identical requests share one completion: concurrent duplicates wait for the
+in-flight call, later ones may reuse a recent result
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+def request_key(model, prompt):
+    """
+    Hash identifying a completion request
+    """
+    digest = hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).hexdigest()
+    return f"generation:{digest}"
+
+
+def _store(cache, key, article):
+    # Kept at least as long as the lock so waiters always find it
+    timeout = max(settings.AI_DEDUPE_REUSE_WINDOW, settings.AI_DEDUPE_LOCK_TIMEOUT)
+    cache.set(f"{key}:result", (time.time(), article), timeout=timeout)
+
+
+def _result(cache, key, newer_than):
+    """
+    Stored article if it completed after `newer_than` (a timestamp)
+    """
+    stored = cache.get(f"{key}:result")
+    if stored is not None and stored[0] >= newer_than:
+        return stored[1]
+    return None
+
+
+def reusable_result(key):
+    """
+    A completed article for this key inside the reuse window, if any
+    """
+    window = settings.AI_DEDUPE_REUSE_WINDOW
+    if window <= 0:
+        return None
+    return _result(caches["default"], key, time.time() - window)
+
+
+def remember(key, article):
+    """
+    Record a completion produced outside get_or_generate (e.g. streamed)
+    """
+    _store(caches["default"], key, article)
+
+
+def reuse_or_claim(key):
+    """
+    A recent or in-flight identical completion, or None once the caller
+    holds the key's lock; it must then generate, remember() and release()
+
+    Used directly by the streaming path, which cannot wrap its generation in
+    get_or_generate's callable.
+    """
+    article = reusable_result(key)
+    if article is not None:
+        return article
+
+    cache = caches["default"]
+    lock_key = f"{key}:lock"
+    lock_timeout = settings.AI_DEDUPE_LOCK_TIMEOUT
+    waiting_since = time.time()
+
+    if not cache.add(lock_key, 1, timeout=lock_timeout):
+        # An identical request is in flight; wait for its result
+        deadline = time.monotonic() + lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(settings.AI_DEDUPE_WAIT_INTERVAL)
+            article = _result(cache, key, waiting_since)
+            if article is not None:
+                return article
+            if cache.get(lock_key) is None:
+                # Finished between the two reads, or failed
+                article = _result(cache, key, waiting_since)
+                if article is not None:
+                    return article
+                break
+        cache.add(lock_key, 1, timeout=lock_timeout)
+    return None
+
+
+def release(key):
+    """
+    Drop the lock taken by reuse_or_claim
+    """
+    caches["default"].delete(f"{key}:lock")
+
+
+def get_or_generate(key, generate, force_fresh=False):
+    """
+    Return the article for `key`, calling generate() at most once per window
+
+    force_fresh skips both reuse and waiting on an in-flight duplicate.
+    """
+    if not force_fresh:
+        article = reuse_or_claim(key)
+        if article is not None:
+            return article
+        try:
+            article = generate()
+            remember(key, article)
+            return article
+        finally:
+            release(key)
+
+    article = generate()
+    remember(key, article)
+    return article
@@ -0,0 +1,113 @@
+"""
+Local stand-in for the OpenAI chat completions and ValueSerp APIs
+Used by the tests and by `manage.py run_benchmarks` to exercise the real
+HTTP clients without network access or API costs
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ARTICLE_FRAGMENTS = ["Streamed Title", "\n\n", "First paragraph. ", "Second paragraph."]
+# Reported in every completion's `usage` field
+USAGE = {"prompt_tokens": 120, "completion_tokens": 12, "total_tokens": 132}
+
+
+class FakeUpstreamHandler(BaseHTTPRequestHandler):
+    """
+    Answers any GET as a search and any POST as a chat completion
+    Prompts containing "FAIL" get a 400, like a rejected request; the next
+    `search_outages`/`completion_outages` calls get a 503
+    """
+
+    completions = 0
+    searches = 0
+    search_outages = 0
+    completion_outages = 0
+    # Seconds to wait before each streamed fragment (simulated generation time)
+    fragment_delay = 0.0
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        FakeUpstreamHandler.searches += 1
+        if FakeUpstreamHandler.search_outages > 0:
+            FakeUpstreamHandler.search_outages -= 1
+            self._send_json(503, {"error": "unavailable"})
+            return
+        self._send_json(200, {"answer_box": {"answer": "Fake search overview"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length))
+        FakeUpstreamHandler.completions += 1
+
+        if FakeUpstreamHandler.completion_outages > 0:
+            FakeUpstreamHandler.completion_outages -= 1
+            self._send_json(503, {"error": {"message": "overloaded", "type": "server_error"}})
+            return
+
+        if "FAIL" in request["messages"][-1]["content"]:
+            self._send_json(400, {"error": {"message": "bad request", "type": "invalid_request_error"}})
+            return
+
+        if not request.get("stream"):
+            self._send_json(200, {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": 0,
+                "model": request["model"],
+                "choices": [{
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": "".join(ARTICLE_FRAGMENTS)},
+                }],
+                "usage": USAGE,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        for fragment in ARTICLE_FRAGMENTS:
+            if self.fragment_delay:
+                time.sleep(self.fragment_delay)
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": 0,
+                "model": request["model"],
+                "choices": [{"index": 0, "delta": {"content": fragment}, "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+        if request.get("stream_options", {}).get("include_usage"):
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": 0,
+                "model": request["model"],
+                "choices": [],
+                "usage": USAGE,
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_fake_upstream():
+    """
+    Serve FakeUpstreamHandler on a free local port in a daemon thread
+    Returns (server, base_url); call server.shutdown() when done
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeUpstreamHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
@@ -51,6 +51,11 @@ class AIArticleForm(forms.Form):
         widget=forms.NumberInput(attrs={"class": "form-control"})
     )
     
+    force_fresh = forms.BooleanField(
+        required=False,
+        help_text="Always generate a new article, even if an identical request ran recently"
+    )
+    
     # Category selection from existing categories
     categories = forms.ModelMultipleChoiceField(
         queryset=Category.objects.all().order_by("name"),
@@ -0,0 +1,157 @@
+"""
+Database-backed queue for AI article generation
+Views enqueue GenerationJob rows; `manage.py run_generation_worker` runs them
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from blog import duplicates
+from blog.models import Post
+from . import providers, telemetry
+from .ai_utils import ArticleGenerator
+from .models import GenerationJob, GenerationRun
+
+logger = logging.getLogger(__name__)
+
+
+def build_generator():
+    """
+    ArticleGenerator over the providers selected in settings
+    """
+    return ArticleGenerator(
+        llm=providers.get_llm_provider(),
+        search=providers.get_search_provider()
+    )
+
+
+def save_article(author, full_article, keyword, language, categories):
+    """
+    Create the Post for a generated article and assign its categories
+    Raises NearDuplicateError instead when DUPLICATE_ACTION is "block" and
+    an existing post is nearly identical
+    """
+    title, body = split_article(full_article, keyword)
+    duplicate_of = duplicates.check(body)
+    with transaction.atomic():
+        post = Post.objects.create(
+            title=title,
+            body=body,
+            language=language,
+            author=author,
+            duplicate_of=duplicate_of
+        )
+        post.categories.set(categories)
+    return post
+
+
+def split_article(full_article, keyword):
+    """
+    Split generated text into (title, body); the first line is the title
+    """
+    lines = full_article.split('\n', 1)
+    if len(lines) >= 2:
+        return lines[0].strip(), lines[1].strip()
+    # Fallback if no line break
+    return keyword, full_article
+
+
+def submit_job(author, cleaned_data, country=None):
+    """
+    Queue a generation from validated AIArticleForm data
+    """
+    with transaction.atomic():
+        job = GenerationJob.objects.create(
+            author=author,
+            keyword=cleaned_data["keyword"],
+            language=cleaned_data["language"],
+            tone=cleaned_data["tone"],
+            target_audience=cleaned_data["target_audience"],
+            min_words=cleaned_data["min_words"],
+            max_words=cleaned_data["max_words"],
+            country=country or settings.DEFAULT_COUNTRY,
+            force_fresh=cleaned_data.get("force_fresh", False),
+        )
+        job.categories.set(cleaned_data["categories"])
+    return job
+
+
+def claim_next_job():
+    """
+    Atomically move the oldest queued job to running and return it
+    SKIP LOCKED lets several workers poll the table without blocking each other
+    """
+    with transaction.atomic():
+        job = (
+            GenerationJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=GenerationJob.STATUS_QUEUED)
+            .order_by("created_on", "id")
+            .first()
+        )
+        if job is None:
+            return None
+
+        job.status = GenerationJob.STATUS_RUNNING
+        job.started_on = timezone.now()
+        job.attempts += 1
+        job.save(update_fields=["status", "started_on", "attempts"])
+    return job
+
+
+def requeue_stale_jobs(older_than):
+    """
+    Put back jobs left running by a worker that died mid-generation
+    """
+    cutoff = timezone.now() - timedelta(seconds=older_than)
+    return GenerationJob.objects.filter(
+        status=GenerationJob.STATUS_RUNNING,
+        started_on__lt=cutoff,
+    ).update(status=GenerationJob.STATUS_QUEUED)
+
+
+def run_job(job):
+    """
+    Generate the article for a claimed job and save it as a Post
+    """
+    try:
+        generator = build_generator()
+        with telemetry.recorded(
+            generator, GenerationRun.SOURCE_JOB, job.keyword,
+            # Earlier attempts were claims by workers that died mid-generation
+            retries=max(job.attempts - 1, 0), author=job.author, job=job
+        ):
+            full_article = generator.generate_article(
+                keyword=job.keyword,
+                language=job.language,
+                tone=job.tone,
+                target_audience=job.target_audience,
+                min_words=job.min_words,
+                max_words=job.max_words,
+                country=job.country,
+                force_fresh=job.force_fresh
+            )
+            # Timed up to here; a post blocked as a near-duplicate still fails the run
+            generator.telemetry.stop()
+            with transaction.atomic():
+                post = save_article(
+                    job.author, full_article, job.keyword,
+                    job.language, job.categories.all()
+                )
+                job.post = post
+                job.status = GenerationJob.STATUS_DONE
+                job.error = ""
+                job.finished_on = timezone.now()
+                job.save(update_fields=["post", "status", "error", "finished_on"])
+
+    except Exception as e:
+        logger.error(f"Generation job {job.pk} failed: {e}")
+        job.status = GenerationJob.STATUS_FAILED
+        job.error = str(e)
+        job.finished_on = timezone.now()
+        job.save(update_fields=["status", "error", "finished_on"])
+
+    return job
@@ -0,0 +1,315 @@
+"""
+Management command to generate many AI articles concurrently
+Usage: python manage.py generate_articles keywords.csv --author admin [--concurrency 4] [--rate 1]
+
+Input is CSV (header row) or JSONL with one article per row/line:
+  keyword (required), language, tone, target_audience, min_words, max_words,
+  country, categories (CSV: separated by ";", JSONL: a list)
+"""
+import argparse
+import csv
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from blog import duplicates, page_cache, related
+from blog.categories import adjust_post_counts, count_links
+from blog.models import Category, Post
+from blog.search import refresh_search_vectors
+from ai_generator.jobs import build_generator, split_article
+from ai_generator.models import GenerationRun
+from ai_generator.throttling import TokenBucket
+from dashboard.stats import rebuild as rebuild_user_stats
+
+DEFAULTS = {
+    "language": "en",
+    "tone": "professional, informative",
+    "target_audience": "general readers",
+    "min_words": 800,
+    "max_words": 1200,
+}
+
+
+def positive(cast):
+    """
+    argparse type: `cast` the value and reject zero or negatives
+    """
+    def parse(value):
+        number = cast(value)
+        if number <= 0:
+            raise argparse.ArgumentTypeError(f'must be greater than 0, got {value}')
+        return number
+    return parse
+
+
+class Command(BaseCommand):
+    help = 'Generate AI articles in bulk from a CSV or JSONL file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSONL file with one article per row')
+        parser.add_argument('--author', required=True, help='Username that will own the posts')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Input format (default: from extension)')
+        parser.add_argument('--concurrency', type=positive(int), default=4, help='Generations running at once')
+        parser.add_argument('--rate', type=positive(float), default=1.0, help='Maximum generations started per second')
+        parser.add_argument('--burst', type=positive(int), default=None, help='Token bucket size (default: concurrency)')
+        parser.add_argument('--batch-size', type=positive(int), default=50, help='Posts written per bulk insert')
+        parser.add_argument('--force-fresh', action='store_true', help='Never reuse recent identical completions')
+
+    def handle(self, *args, **options):
+        try:
+            author = User.objects.get(username=options['author'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['author']}' does not exist")
+
+        rows = self._read_rows(options['path'], options['format'])
+        if not rows:
+            raise CommandError('No articles found in input file')
+        categories = self._resolve_categories(rows)
+
+        self.options = options
+        self.blocked = 0
+        self.bucket = TokenBucket(options['rate'], options['burst'] or options['concurrency'])
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Generating {len(rows)} articles "
+            f"(concurrency={options['concurrency']}, rate={options['rate']}/s)..."
+        ))
+
+        started = time.monotonic()
+        latencies = []
+        retries = 0
+        failures = 0
+        pending = []
+        saved = 0
+
+        with ThreadPoolExecutor(max_workers=max(options['concurrency'], 1)) as pool:
+            futures = {pool.submit(self._generate, row): row for row in rows}
+
+            for future in as_completed(futures):
+                row = futures[future]
+                article, elapsed, error, telemetry = future.result()
+                retries += telemetry.retries
+
+                if error is not None:
+                    telemetry.save(GenerationRun.SOURCE_BULK, row['keyword'], error, author=author)
+                    failures += 1
+                    self.stdout.write(self.style.ERROR(f"✗ {row['keyword']}: {error}"))
+                    continue
+
+                latencies.append(elapsed)
+                self.stdout.write(self.style.SUCCESS(f"✓ {row['keyword']} ({elapsed:.1f}s)"))
+                # Recorded by _save_batch, once the duplicate check has run
+                pending.append((row, article, telemetry))
+                if len(pending) >= options['batch_size']:
+                    saved += self._save_batch(pending, author, categories)
+
+        saved += self._save_batch(pending, author, categories)
+        # bulk_create sends no signals, so refresh the author's dashboard counters
+        rebuild_user_stats([author.pk])
+        self._summary(len(rows), saved, failures, retries, latencies, time.monotonic() - started)
+
+    def _read_rows(self, path, fmt):
+        """
+        Load article parameters from CSV or JSONL, applying defaults
+        """
+        fmt = fmt or ('jsonl' if path.endswith(('.jsonl', '.json')) else 'csv')
+        rows = []
+        try:
+            with open(path, newline='', encoding='utf-8') as f:
+                if fmt == 'csv':
+                    records = list(csv.DictReader(f))
+                else:
+                    records = [json.loads(line) for line in f if line.strip()]
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Could not read {path}: {e}')
+
+        for number, record in enumerate(records, start=1):
+            keyword = (record.get('keyword') or '').strip()
+            if not keyword:
+                raise CommandError(f'Row {number} has no keyword')
+
+            names = record.get('categories') or []
+            if isinstance(names, str):
+                names = names.split(';')
+
+            row = {key: record.get(key) or default for key, default in DEFAULTS.items()}
+            try:
+                min_words, max_words = int(row['min_words']), int(row['max_words'])
+            except (TypeError, ValueError):
+                raise CommandError(
+                    f"Row {number} has non-numeric min_words/max_words: "
+                    f"{row['min_words']!r}, {row['max_words']!r}"
+                )
+            if not 0 < min_words <= max_words:
+                raise CommandError(
+                    f'Row {number} needs 0 < min_words <= max_words, got {min_words} and {max_words}'
+                )
+            row.update(
+                keyword=keyword,
+                min_words=min_words,
+                max_words=max_words,
+                country=record.get('country') or settings.DEFAULT_COUNTRY,
+                categories=[name.strip() for name in names if name.strip()],
+            )
+            rows.append(row)
+        return rows
+
+    def _resolve_categories(self, rows):
+        """
+        Map every category name in the input to a Category, creating new ones
+        """
+        names = {name for row in rows for name in row['categories']}
+        existing = {c.name: c for c in Category.objects.filter(name__in=names)}
+        for name in sorted(names - existing.keys()):
+            # Few and rare: create() fills in the unique slug
+            category = Category.objects.create(name=name)
+            existing[category.name] = category
+            self.stdout.write(self.style.WARNING(f'+ Created category: {category.name}'))
+        return existing
+
+    def _generate(self, row):
+        """
+        Run one rate-limited generation (worker thread)
+        Retries, latency budgets and circuit breakers are ArticleGenerator's
+        (ai_generator.resilience); a row that still fails is reported, not retried
+        Returns (article, seconds, error, telemetry)
+        """
+        generator = build_generator()
+        self.bucket.acquire()
+        started = time.monotonic()
+        try:
+            article = generator.generate_article(
+                keyword=row['keyword'],
+                language=row['language'],
+                tone=row['tone'],
+                target_audience=row['target_audience'],
+                min_words=row['min_words'],
+                max_words=row['max_words'],
+                country=row['country'],
+                force_fresh=self.options['force_fresh']
+            )
+            return article, time.monotonic() - started, None, generator.telemetry
+        except Exception as e:
+            return None, time.monotonic() - started, e, generator.telemetry
+        finally:
+            # Saved by the main thread, after the queue wait
+            generator.telemetry.stop()
+            # The search cache may have opened a connection in this thread
+            connection.close()
+
+    def _save_batch(self, pending, author, categories):
+        """
+        Insert a batch of posts and their category links with bulk queries
+        """
+        if not pending:
+            return 0
+
+        posts = []
+        kept = []
+        # (post, earlier post of this batch) pairs, linked once both have ids
+        flagged = []
+        for row, article, telemetry in pending:
+            title, body = split_article(article, row['keyword'])
+            try:
+                duplicate_of = duplicates.check(body)
+            except duplicates.NearDuplicateError as e:
+                self._blocked(row, telemetry, e, author)
+                continue
+            post = Post(
+                title=title, body=body, language=row['language'],
+                author=author, duplicate_of=duplicate_of
+            )
+            # bulk_create skips save(), so render the stored HTML here
+            post.render_body()
+
+            # duplicates.check only sees saved posts; compare with this batch too
+            earlier = None
+            if duplicate_of is None and settings.DUPLICATE_ACTION != 'off':
+                earlier = self._batch_duplicate(post, posts)
+            if earlier is not None:
+                match, distance = earlier
+                if settings.DUPLICATE_ACTION == 'block':
+                    self._blocked(row, telemetry, duplicates.NearDuplicateError(match, distance), author)
+                    continue
+                flagged.append((post, match))
+            posts.append(post)
+            kept.append((row, telemetry))
+
+        Link = Post.categories.through
+        with transaction.atomic():
+            Post.objects.bulk_create(posts)
+            if flagged:
+                for post, match in flagged:
+                    post.duplicate_of = match
+                Post.objects.bulk_update([post for post, _ in flagged], ['duplicate_of'])
+            links = [
+                Link(post_id=post.pk, category_id=category_id)
+                for post, (row, _) in zip(posts, kept)
+                for category_id in {categories[name].pk for name in row['categories']}
+            ]
+            Link.objects.bulk_create(links)
+            # bulk_create sends no m2m_changed, so bump the cached counts here
+            adjust_post_counts(count_links([link.category_id for link in links]))
+            refresh_search_vectors(Post.objects.filter(pk__in=[p.pk for p in posts]))
+            page_cache.invalidate([page_cache.NAV, *page_cache.post_tags([p.pk for p in posts])])
+            related.schedule_update([p.pk for p in posts])
+
+        for row, telemetry in kept:
+            telemetry.save(GenerationRun.SOURCE_BULK, row['keyword'], author=author)
+
+        pending.clear()
+        return len(posts)
+
+    def _blocked(self, row, telemetry, error, author):
+        """
+        Report and record a row rejected as a near-duplicate
+        """
+        self.stdout.write(self.style.ERROR(f"✗ {row['keyword']}: {error}"))
+        telemetry.save(GenerationRun.SOURCE_BULK, row['keyword'], error, author=author)
+        self.blocked += 1
+
+    def _batch_duplicate(self, post, accepted):
+        """
+        (post, distance) of the closest post accepted earlier in the batch
+        within DUPLICATE_MAX_DISTANCE bits, or None
+        """
+        if post.simhash is None:
+            return None
+
+        best = None
+        for other in accepted:
+            if other.simhash is None:
+                continue
+            distance = duplicates.hamming(post.simhash, other.simhash)
+            if distance <= settings.DUPLICATE_MAX_DISTANCE and (best is None or distance < best[1]):
+                best = (other, distance)
+        return best
+
+    def _summary(self, total, saved, failures, retries, latencies, wall):
+        """
+        Print throughput and latency percentiles
+        """
+        self.stdout.write(self.style.MIGRATE_HEADING('\nSummary:'))
+        self.stdout.write(self.style.SUCCESS(f'Articles saved: {saved}/{total}'))
+        if failures:
+            self.stdout.write(self.style.ERROR(f'Failed: {failures}'))
+        if self.blocked:
+            self.stdout.write(self.style.ERROR(f'Blocked as near-duplicates: {self.blocked}'))
+        self.stdout.write(self.style.WARNING(f'Retries: {retries}'))
+        self.stdout.write(f'Wall time: {wall:.1f}s')
+        self.stdout.write(f'Throughput: {saved / wall * 60 if wall else 0:.1f} articles/min')
+
+        if latencies:
+            if len(latencies) > 1:
+                cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+                p50, p95 = cuts[49], cuts[94]
+            else:
+                p50 = p95 = latencies[0]
+            self.stdout.write(
+                f'Latency: p50={p50:.1f}s p95={p95:.1f}s max={max(latencies):.1f}s'
+            )
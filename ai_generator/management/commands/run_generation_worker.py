@@ -0,0 +1,125 @@
+"""
+Management command that processes queued AI generation jobs
+Usage: python manage.py run_generation_worker [--concurrency N] [--once]
+
+Besides the generation threads, one thread drains the related-posts update
+queue (blog.related.process_pending), so saves on the web never re-score
+neighbours themselves.
+"""
+import logging
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from ai_generator.jobs import claim_next_job, requeue_stale_jobs, run_job
+from blog import related
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Run queued AI article generation jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=settings.AI_WORKER_CONCURRENCY,
+            help='Number of jobs processed in parallel',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=settings.AI_WORKER_POLL_INTERVAL,
+            help='Seconds to wait before polling an empty queue again',
+        )
+        parser.add_argument(
+            '--stale-after',
+            type=int,
+            default=settings.AI_WORKER_STALE_AFTER,
+            help='Requeue jobs left running longer than this many seconds',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit when the queue is empty instead of polling forever',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Start one polling thread per concurrency slot and wait for them
+        """
+        self.stop = threading.Event()
+        self.options = options
+        signal.signal(signal.SIGTERM, lambda *_: self.stop.set())
+
+        requeued = requeue_stale_jobs(options['stale_after'])
+        if requeued:
+            self.stdout.write(self.style.WARNING(f'Requeued {requeued} stale job(s)'))
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Generation worker started (concurrency={options['concurrency']})"
+        ))
+
+        threads = [
+            threading.Thread(target=self._work, name=f'generation-worker-{i}', daemon=True)
+            for i in range(max(options['concurrency'], 1))
+        ]
+        threads.append(threading.Thread(target=self._index_related, name='related-posts', daemon=True))
+        for thread in threads:
+            thread.start()
+
+        try:
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(timeout=1)
+        except KeyboardInterrupt:
+            self.stop.set()
+            self.stdout.write(self.style.WARNING('Stopping after running jobs finish...'))
+            for thread in threads:
+                thread.join()
+
+        self.stdout.write(self.style.SUCCESS('Generation worker stopped'))
+
+    def _work(self):
+        """
+        Claim and run jobs until stopped (or until the queue drains with --once)
+        """
+        try:
+            while not self.stop.is_set():
+                close_old_connections()
+                job = claim_next_job()
+
+                if job is None:
+                    if self.options['once']:
+                        return
+                    self.stop.wait(self.options['poll_interval'])
+                    continue
+
+                job = run_job(job)
+                style = self.style.SUCCESS if job.status == job.STATUS_DONE else self.style.ERROR
+                self.stdout.write(style(f'Job {job.pk} "{job.keyword}": {job.status}'))
+        finally:
+            connection.close()
+
+    def _index_related(self):
+        """
+        Apply queued related-post updates until stopped (or drained with --once)
+        """
+        try:
+            while not self.stop.is_set():
+                close_old_connections()
+                try:
+                    updated = related.process_pending()
+                except Exception:
+                    logger.exception('Related posts update failed')
+                    updated = 0
+
+                if not updated:
+                    if self.options['once']:
+                        return
+                    self.stop.wait(self.options['poll_interval'])
+        finally:
+            connection.close()
@@ -0,0 +1,29 @@
+"""
+Management command to report search context cache effectiveness
+Usage: python manage.py search_cache_stats [--reset]
+"""
+from django.core.management.base import BaseCommand
+from ai_generator import search_cache
+
+
+class Command(BaseCommand):
+    help = 'Show hit/miss statistics of the ValueSerp search cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Reset the counters after printing them',
+        )
+
+    def handle(self, *args, **options):
+        stats = search_cache.get_stats()
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Search cache statistics:'))
+        self.stdout.write(self.style.SUCCESS(f"Hits: {stats['hits']}"))
+        self.stdout.write(self.style.WARNING(f"Misses: {stats['misses']}"))
+        self.stdout.write(self.style.SUCCESS(f"Hit rate: {stats['hit_rate']:.1%}"))
+
+        if options['reset']:
+            search_cache.reset_stats()
+            self.stdout.write(self.style.WARNING('Counters reset'))
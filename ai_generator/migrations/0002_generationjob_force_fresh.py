@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_generator', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generationjob',
+            name='force_fresh',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-17 13:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_generator', '0002_generationjob_force_fresh'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GenerationRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('job', 'Queued job'), ('stream', 'Streamed'), ('bulk', 'Bulk command')], max_length=10)),
+                ('keyword', models.CharField(max_length=200)),
+                ('model', models.CharField(max_length=100)),
+                ('outcome', models.CharField(choices=[('ok', 'Generated'), ('reused', 'Reused recent completion'), ('failed', 'Failed')], max_length=10)),
+                ('error', models.TextField(blank=True)),
+                ('retries', models.PositiveSmallIntegerField(default=0)),
+                ('search_ms', models.PositiveIntegerField(blank=True, null=True)),
+                ('generation_ms', models.PositiveIntegerField(blank=True, null=True)),
+                ('total_ms', models.PositiveIntegerField()),
+                ('prompt_tokens', models.PositiveIntegerField(blank=True, null=True)),
+                ('completion_tokens', models.PositiveIntegerField(blank=True, null=True)),
+                ('words', models.PositiveIntegerField(default=0)),
+                ('created_on', models.DateTimeField(auto_now_add=True)),
+                ('author', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='generation_runs', to=settings.AUTH_USER_MODEL)),
+                ('job', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='runs', to='ai_generator.generationjob')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_on'], name='genrun_created_idx')],
+            },
+        ),
+    ]
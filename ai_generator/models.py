@@ -1,3 +1,110 @@
 from django.db import models
+from django.contrib.auth.models import User
+from blog.models import Category, Post
 
-# Create your models here.
+
+class GenerationJob(models.Model):
+    """
+    A queued AI article generation, processed by `manage.py run_generation_worker`
+    """
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_DONE, "Done"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="generation_jobs")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+
+    # Generation parameters (mirror AIArticleForm)
+    keyword = models.CharField(max_length=200)
+    language = models.CharField(max_length=2, choices=Post.LANGUAGE_CHOICES, default="en")
+    tone = models.CharField(max_length=100)
+    target_audience = models.CharField(max_length=100)
+    min_words = models.PositiveIntegerField()
+    max_words = models.PositiveIntegerField()
+    country = models.CharField(max_length=2, default="us")
+    categories = models.ManyToManyField(Category, blank=False)
+    force_fresh = models.BooleanField(default=False)
+
+    # Outcome
+    post = models.ForeignKey(Post, null=True, blank=True, on_delete=models.SET_NULL)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    created_on = models.DateTimeField(auto_now_add=True)
+    started_on = models.DateTimeField(null=True, blank=True)
+    finished_on = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Workers claim the oldest queued job first
+            models.Index(fields=["status", "created_on"], name="genjob_status_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.keyword} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_DONE, self.STATUS_FAILED)
+
+
+class GenerationRun(models.Model):
+    """
+    Telemetry for one article generation (see ai_generator.telemetry)
+    """
+    SOURCE_JOB = "job"
+    SOURCE_STREAM = "stream"
+    SOURCE_BULK = "bulk"
+    SOURCE_CHOICES = [
+        (SOURCE_JOB, "Queued job"),
+        (SOURCE_STREAM, "Streamed"),
+        (SOURCE_BULK, "Bulk command"),
+    ]
+    OUTCOME_OK = "ok"
+    OUTCOME_REUSED = "reused"
+    OUTCOME_FAILED = "failed"
+    OUTCOME_CHOICES = [
+        (OUTCOME_OK, "Generated"),
+        (OUTCOME_REUSED, "Reused recent completion"),
+        (OUTCOME_FAILED, "Failed"),
+    ]
+
+    author = models.ForeignKey(
+        User, null=True, blank=True, on_delete=models.SET_NULL, related_name="generation_runs"
+    )
+    job = models.ForeignKey(
+        GenerationJob, null=True, blank=True, on_delete=models.SET_NULL, related_name="runs"
+    )
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES)
+    keyword = models.CharField(max_length=200)
+    model = models.CharField(max_length=100)
+    outcome = models.CharField(max_length=10, choices=OUTCOME_CHOICES)
+    error = models.TextField(blank=True)
+    retries = models.PositiveSmallIntegerField(default=0)
+
+    # Milliseconds; generation_ms is null when no API call was made
+    search_ms = models.PositiveIntegerField(null=True, blank=True)
+    generation_ms = models.PositiveIntegerField(null=True, blank=True)
+    total_ms = models.PositiveIntegerField()
+    # From the API `usage` field, null when it was not reported
+    prompt_tokens = models.PositiveIntegerField(null=True, blank=True)
+    completion_tokens = models.PositiveIntegerField(null=True, blank=True)
+    words = models.PositiveIntegerField(default=0)
+
+    created_on = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # The dashboard panel aggregates a recent window
+            models.Index(fields=["created_on"], name="genrun_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.keyword} ({self.outcome}, {self.total_ms} ms)"
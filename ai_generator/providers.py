@@ -0,0 +1,358 @@
+"""
+Pluggable LLM and search backends for ArticleGenerator
+AI_LLM_PROVIDER and AI_SEARCH_PROVIDER pick one by name ("openai"/"fake",
+"valueserp"/"fake") or by dotted path to a class with the same interface.
+The fakes run in-process with no network: deterministic articles, with
+latency, token rate, streaming chunk size and injected errors set by the
+AI_FAKE_* settings, so the generation view, the worker and the bulk
+commands can be benchmarked offline.
+"""
+import abc
+import asyncio
+import hashlib
+import random
+import re
+import threading
+import time
+from collections import namedtuple
+
+import httpx
+import openai
+import requests
+from django.conf import settings
+from django.utils.module_loading import import_string
+from . import clients
+
+# Token counts as reported in the API `usage` field
+Usage = namedtuple("Usage", "prompt_tokens completion_tokens")
+# One streamed piece: text (may be empty) and usage (last piece only)
+Delta = namedtuple("Delta", "text usage")
+
+
+class LLMProvider(abc.ABC):
+    """
+    Chat completion backend
+    `timeout` is the seconds left in the call's latency budget
+    Subclasses missing a method fail when instantiated, not mid-generation
+    """
+    model = ""
+
+    @abc.abstractmethod
+    def complete(self, messages, timeout):
+        """
+        (text, Usage or None) of a whole completion
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def open_stream(self, messages, timeout):
+        """
+        Start a streamed completion and return an iterator of Delta
+        Errors before the first token must be raised here, so they can be retried
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def aopen_stream(self, messages, timeout):
+        """
+        open_stream for async views; returns an async iterator of Delta
+        """
+        raise NotImplementedError
+
+
+class SearchProvider(abc.ABC):
+    """
+    Web search backend returning {"overview": str, "urls": [str]}
+    """
+
+    @abc.abstractmethod
+    def search(self, keyword, country, lang, timeout):
+        raise NotImplementedError
+
+
+class OpenAIProvider(LLMProvider):
+    """
+    OpenAI chat completions over the pooled per-process clients
+    """
+    model = "gpt-4o-mini"
+
+    def __init__(self, api_key, base_url=None, client=None, async_client=None):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.client = client or clients.get_openai_client(api_key, base_url)
+        self._async_client = async_client
+
+    @property
+    def async_client(self):
+        """
+        Pooled AsyncOpenAI client for the running event loop
+        """
+        if self._async_client is None:
+            self._async_client = clients.get_async_openai_client(self.api_key, self.base_url)
+        return self._async_client
+
+    def _request(self, messages, timeout, **extra):
+        return dict(
+            model=self.model,
+            messages=messages,
+            temperature=0.7,
+            max_tokens=3000,
+            timeout=timeout,
+            **extra
+        )
+
+    def complete(self, messages, timeout):
+        response = self.client.chat.completions.create(**self._request(messages, timeout))
+        return response.choices[0].message.content, response.usage
+
+    def open_stream(self, messages, timeout):
+        stream = self.client.chat.completions.create(**self._request(
+            messages, timeout, stream=True,
+            # Token counts arrive in a final chunk with no choices
+            stream_options={"include_usage": True}
+        ))
+        return (
+            Delta(chunk.choices[0].delta.content if chunk.choices else None, chunk.usage)
+            for chunk in stream
+        )
+
+    async def aopen_stream(self, messages, timeout):
+        stream = await self.async_client.chat.completions.create(**self._request(
+            messages, timeout, stream=True, stream_options={"include_usage": True}
+        ))
+
+        async def deltas():
+            async for chunk in stream:
+                yield Delta(chunk.choices[0].delta.content if chunk.choices else None, chunk.usage)
+
+        return deltas()
+
+
+class ValueSerpProvider(SearchProvider):
+    """
+    ValueSerp search API over the pooled requests session
+    """
+
+    def __init__(self, api_key, url, session=None):
+        self.api_key = api_key
+        self.url = url
+        self.session = session or clients.get_http_session()
+
+    def search(self, keyword, country, lang, timeout):
+        response = self.session.get(
+            self.url,
+            params={
+                "api_key": self.api_key,
+                "q": keyword,
+                "hl": lang,
+                "gl": country,
+                "num": 5
+            },
+            timeout=timeout
+        )
+        response.raise_for_status()
+        data = response.json()
+
+        context = {"overview": "", "urls": []}
+        # Get answer box if available
+        if answer_box := data.get("answer_box"):
+            context["overview"] = (
+                answer_box.get("answer") or
+                answer_box.get("snippet") or ""
+            )[:600]
+
+        # Get top URLs
+        organic = data.get("organic_results", [])[:3]
+        context["urls"] = [r["link"] for r in organic if r.get("link")]
+        return context
+
+
+# Fakes
+
+FAKE_WORDS = """
+    data system model user design performance cache query service network
+    request response latency memory storage index feature release team code
+    test build deploy server client process thread queue metric error report
+    practice example pattern approach workflow review update change result
+""".split()
+KEYWORD = re.compile(r'about: "([^"]*)"')
+
+# Injected failures follow one seeded sequence per process
+_rng_lock = threading.Lock()
+_rng = None
+
+
+def _inject_error(kind):
+    """
+    Raise the configured fake failure for this call, if it is due
+    The errors are the real client exception types, so retries and
+    circuit breakers treat them like upstream failures
+    """
+    global _rng
+    rate = settings.AI_FAKE_ERROR_RATE
+    if rate <= 0:
+        return
+    with _rng_lock:
+        if _rng is None:
+            _rng = random.Random(settings.AI_FAKE_SEED)
+        due = _rng.random() < rate
+    if not due:
+        return
+
+    status = settings.AI_FAKE_ERROR_STATUS
+    if kind == "search":
+        response = requests.Response()
+        response.status_code = status
+        raise requests.HTTPError(f"{status} Fake search error", response=response)
+    request = httpx.Request("POST", "http://fake-llm/v1/chat/completions")
+    raise openai.APIStatusError(
+        f"Fake completion error {status}", response=httpx.Response(status, request=request), body=None
+    )
+
+
+def reset_fakes():
+    """
+    Restart the injected-error sequence (tests)
+    """
+    global _rng
+    with _rng_lock:
+        _rng = None
+
+
+def _timed_out(kind):
+    if kind == "search":
+        raise requests.Timeout("Fake search timed out")
+    raise openai.APITimeoutError(request=httpx.Request("POST", "http://fake-llm/v1/chat/completions"))
+
+
+class FakeLLMProvider(LLMProvider):
+    """
+    Deterministic offline LLM: the same prompt always gives the same article
+    Waits AI_FAKE_LATENCY before the first token, then produces
+    AI_FAKE_TOKENS_PER_SECOND tokens (one per word), streamed
+    AI_FAKE_CHUNK_TOKENS at a time
+    """
+    model = "fake-llm"
+
+    def _article(self, messages):
+        """
+        (tokens, Usage) for these messages
+        """
+        prompt = messages[-1]["content"]
+        digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+        rng = random.Random(digest)
+        match = KEYWORD.search(prompt)
+        keyword = match.group(1) if match else "the topic"
+
+        words = [rng.choice(FAKE_WORDS) for _ in range(settings.AI_FAKE_ARTICLE_WORDS)]
+        paragraphs = []
+        for start in range(0, len(words), 60):
+            sentence = " ".join(words[start:start + 60])
+            paragraphs.append(sentence[0].upper() + sentence[1:] + ".")
+        text = f"A practical guide to {keyword}\n\n" + "\n\n".join(paragraphs)
+
+        tokens = re.findall(r"\S+\s*", text)
+        prompt_tokens = sum(len(m["content"].split()) for m in messages)
+        return tokens, Usage(prompt_tokens, len(tokens))
+
+    def _start(self, timeout):
+        """
+        Injected error and time to first token; returns seconds left
+        """
+        _inject_error("llm")
+        latency = settings.AI_FAKE_LATENCY
+        if latency > timeout:
+            time.sleep(timeout)
+            _timed_out("llm")
+        time.sleep(latency)
+        return timeout - latency
+
+    def complete(self, messages, timeout):
+        tokens, usage = self._article(messages)
+        left = self._start(timeout)
+        seconds = len(tokens) / settings.AI_FAKE_TOKENS_PER_SECOND
+        if seconds > left:
+            time.sleep(left)
+            _timed_out("llm")
+        time.sleep(seconds)
+        return "".join(tokens), usage
+
+    def _chunks(self, tokens):
+        size = max(settings.AI_FAKE_CHUNK_TOKENS, 1)
+        delay = size / settings.AI_FAKE_TOKENS_PER_SECOND
+        for start in range(0, len(tokens), size):
+            yield "".join(tokens[start:start + size]), delay
+
+    def open_stream(self, messages, timeout):
+        tokens, usage = self._article(messages)
+        self._start(timeout)
+
+        def deltas():
+            for text, delay in self._chunks(tokens):
+                time.sleep(delay)
+                yield Delta(text, None)
+            yield Delta(None, usage)
+
+        return deltas()
+
+    async def aopen_stream(self, messages, timeout):
+        tokens, usage = self._article(messages)
+        _inject_error("llm")
+        latency = settings.AI_FAKE_LATENCY
+        if latency > timeout:
+            await asyncio.sleep(timeout)
+            _timed_out("llm")
+        await asyncio.sleep(latency)
+
+        async def deltas():
+            for text, delay in self._chunks(tokens):
+                await asyncio.sleep(delay)
+                yield Delta(text, None)
+            yield Delta(None, usage)
+
+        return deltas()
+
+
+class FakeSearchProvider(SearchProvider):
+    """
+    Deterministic offline search taking AI_FAKE_SEARCH_LATENCY seconds
+    """
+
+    def search(self, keyword, country, lang, timeout):
+        _inject_error("search")
+        latency = settings.AI_FAKE_SEARCH_LATENCY
+        if latency > timeout:
+            time.sleep(timeout)
+            _timed_out("search")
+        time.sleep(latency)
+        slug = re.sub(r"\W+", "-", keyword.lower()).strip("-")
+        return {
+            "overview": f"Offline overview of {keyword} ({lang}-{country})",
+            "urls": [f"https://example.com/{slug}/{n}" for n in range(1, 4)],
+        }
+
+
+LLM_PROVIDERS = {"openai": OpenAIProvider, "fake": FakeLLMProvider}
+SEARCH_PROVIDERS = {"valueserp": ValueSerpProvider, "fake": FakeSearchProvider}
+
+
+def get_llm_provider():
+    """
+    The LLM provider selected by AI_LLM_PROVIDER
+    """
+    name = settings.AI_LLM_PROVIDER
+    cls = LLM_PROVIDERS.get(name) or import_string(name)
+    if cls is OpenAIProvider:
+        return cls(settings.OPENAI_API_KEY, settings.OPENAI_BASE_URL)
+    return cls()
+
+
+def get_search_provider():
+    """
+    The search provider selected by AI_SEARCH_PROVIDER
+    """
+    name = settings.AI_SEARCH_PROVIDER
+    cls = SEARCH_PROVIDERS.get(name) or import_string(name)
+    if cls is ValueSerpProvider:
+        return cls(settings.VALUESERP_API_KEY, settings.VALUESERP_URL)
+    return cls()
@@ -0,0 +1,189 @@
+"""
+Circuit breakers, retries and latency budgets for the AI/search APIs
+Every upstream call goes through call()/acall() with an endpoint name
+("openai", "search"). Each endpoint has a per-process circuit breaker: after
+AI_BREAKER_FAILURES consecutive upstream failures (timeouts, connection
+errors, 429/5xx) it opens and calls fail at once with CircuitOpenError,
+until one trial call is let through AI_BREAKER_RESET seconds later.
+Retryable errors are retried with jittered backoff, and every attempt only
+gets what is left of the endpoint's latency budget as its timeout.
+"""
+import asyncio
+import logging
+import threading
+import time
+
+from django.conf import settings
+from .throttling import backoff_delay, is_retryable
+
+logger = logging.getLogger(__name__)
+
+# Shortest timeout worth giving an attempt
+MIN_TIMEOUT = 0.5
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling an endpoint whose breaker is open
+    """
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        super().__init__(f"{endpoint} is unavailable (circuit open)")
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure breaker: closed, open, then half-open after
+    `reset_after` seconds, when the next caller makes a trial call
+    """
+
+    def __init__(self, endpoint, threshold, reset_after):
+        self.endpoint = endpoint
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def is_open(self):
+        """
+        True while calls would fail fast (a trial call is not yet due)
+        """
+        opened_at = self.opened_at
+        return opened_at is not None and time.monotonic() - opened_at < self.reset_after
+
+    def admit(self):
+        """
+        Raise CircuitOpenError unless a call may go ahead
+        """
+        with self.lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at < self.reset_after:
+                raise CircuitOpenError(self.endpoint)
+            # Half-open: this caller makes the trial call, the others keep
+            # failing fast (and get their own trial if it never reports back)
+            self.opened_at = time.monotonic()
+
+    def success(self):
+        with self.lock:
+            if self.opened_at is not None:
+                logger.info(f"Circuit for {self.endpoint} closed")
+            self.failures = 0
+            self.opened_at = None
+
+    def failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.opened_at is not None or self.failures >= self.threshold:
+                if self.opened_at is None:
+                    logger.warning(
+                        f"Circuit for {self.endpoint} opened after {self.failures} failures"
+                    )
+                self.opened_at = time.monotonic()
+
+
+_lock = threading.Lock()
+_breakers = {}
+
+
+def get_breaker(endpoint):
+    """
+    This process's breaker for an endpoint
+    """
+    breaker = _breakers.get(endpoint)
+    if breaker is None:
+        with _lock:
+            breaker = _breakers.get(endpoint)
+            if breaker is None:
+                breaker = CircuitBreaker(
+                    endpoint, settings.AI_BREAKER_FAILURES, settings.AI_BREAKER_RESET
+                )
+                _breakers[endpoint] = breaker
+    return breaker
+
+
+def reset():
+    """
+    Forget every breaker (tests, or after a settings change)
+    """
+    with _lock:
+        _breakers.clear()
+
+
+def _policy(endpoint):
+    """
+    (retries, budget seconds) for an endpoint
+    """
+    if endpoint == "search":
+        return settings.AI_SEARCH_RETRIES, settings.AI_SEARCH_BUDGET
+    return settings.AI_OPENAI_RETRIES, settings.AI_OPENAI_BUDGET
+
+
+def _after_error(breaker, exc, attempt, retries, deadline):
+    """
+    Record a failed attempt; returns the delay before the next one, or None
+    to give up
+    """
+    if not is_retryable(exc):
+        # The endpoint answered; the request itself was bad
+        breaker.success()
+        return None
+    breaker.failure()
+    delay = backoff_delay(attempt, base=settings.AI_RETRY_BACKOFF)
+    if attempt > retries or time.monotonic() + delay + MIN_TIMEOUT > deadline:
+        return None
+    return delay
+
+
+def call(endpoint, fn, on_retry=None):
+    """
+    Run fn(timeout) against an endpoint with its breaker, retries and budget
+    on_retry() is called before each retry (telemetry counts them)
+    """
+    retries, budget = _policy(endpoint)
+    breaker = get_breaker(endpoint)
+    deadline = time.monotonic() + budget
+    attempt = 0
+    while True:
+        breaker.admit()
+        attempt += 1
+        try:
+            result = fn(max(deadline - time.monotonic(), MIN_TIMEOUT))
+        except Exception as e:
+            delay = _after_error(breaker, e, attempt, retries, deadline)
+            if delay is None:
+                raise
+            logger.warning(f"Retrying {endpoint} in {delay:.1f}s: {e}")
+            if on_retry is not None:
+                on_retry()
+            time.sleep(delay)
+        else:
+            breaker.success()
+            return result
+
+
+async def acall(endpoint, fn, on_retry=None):
+    """
+    call() for async clients: fn(timeout) returns an awaitable
+    """
+    retries, budget = _policy(endpoint)
+    breaker = get_breaker(endpoint)
+    deadline = time.monotonic() + budget
+    attempt = 0
+    while True:
+        breaker.admit()
+        attempt += 1
+        try:
+            result = await fn(max(deadline - time.monotonic(), MIN_TIMEOUT))
+        except Exception as e:
+            delay = _after_error(breaker, e, attempt, retries, deadline)
+            if delay is None:
+                raise
+            logger.warning(f"Retrying {endpoint} in {delay:.1f}s: {e}")
+            if on_retry is not None:
+                on_retry()
+            await asyncio.sleep(delay)
+        else:
+            breaker.success()
+            return result
@@ -0,0 +1,121 @@
+"""
+Shared cache for ValueSerp search context
+Entries live in the "search" cache alias (TTL + size bound set in settings),
+so every Gunicorn worker sees results fetched by the others
+"""
+import hashlib
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+KEY_VERSION = 1
+STATS_KEYS = {
+    "hits": "search-context:stats:hits",
+    "misses": "search-context:stats:misses",
+}
+
+
+def normalize(keyword, country, lang):
+    """
+    Canonical form of a search so trivially different inputs share an entry
+    """
+    keyword = " ".join((keyword or "").split()).casefold()
+    return keyword, (country or "").lower(), (lang or "").lower()
+
+
+def cache_key(keyword, country, lang):
+    """
+    Fixed-length key that is safe for every cache backend
+    """
+    raw = "|".join(normalize(keyword, country, lang))
+    digest = hashlib.sha256(raw.encode("utf-8")).hexdigest()
+    return f"search-context:v{KEY_VERSION}:{digest}"
+
+
+def _record(outcome):
+    """
+    Bump a shared hit/miss counter in the default cache
+    incr() is atomic on Redis and local memory; DatabaseCache may lose counts
+    """
+    stats = caches["default"]
+    key = STATS_KEYS[outcome]
+    stats.add(key, 0, timeout=None)
+    try:
+        stats.incr(key)
+    except ValueError:
+        # Evicted between add() and incr()
+        stats.set(key, 1, timeout=None)
+
+
+def get_cached(keyword, country, lang):
+    """
+    The cached context for a search, or None; never calls the API
+    """
+    context = caches["search"].get(cache_key(keyword, country, lang))
+    _record("hits" if context is not None else "misses")
+    return context
+
+
+def get_or_fetch(keyword, country, lang, fetch):
+    """
+    Return the cached context for a search, calling fetch() on a miss
+
+    Only one caller per key runs fetch() at a time: the others wait for the
+    result to appear (up to SEARCH_CACHE_LOCK_TIMEOUT) instead of hitting the
+    API too. Exceptions from fetch() propagate and nothing is cached.
+    """
+    cache = caches["search"]
+    key = cache_key(keyword, country, lang)
+
+    context = cache.get(key)
+    if context is not None:
+        _record("hits")
+        return context
+
+    lock_key = f"{key}:lock"
+    lock_timeout = settings.SEARCH_CACHE_LOCK_TIMEOUT
+
+    if not cache.add(lock_key, 1, timeout=lock_timeout):
+        # Someone else is fetching this keyword; wait for their result
+        deadline = time.monotonic() + lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(settings.SEARCH_CACHE_WAIT_INTERVAL)
+            context = cache.get(key)
+            if context is not None:
+                _record("hits")
+                return context
+            if cache.get(lock_key) is None:
+                # Their fetch failed; take over
+                break
+        cache.add(lock_key, 1, timeout=lock_timeout)
+
+    _record("misses")
+    try:
+        context = fetch()
+        cache.set(key, context)
+        return context
+    finally:
+        cache.delete(lock_key)
+
+
+def get_stats():
+    """
+    Hit/miss counters shared by all workers since the last reset
+    """
+    stats = caches["default"]
+    hits = stats.get(STATS_KEYS["hits"]) or 0
+    misses = stats.get(STATS_KEYS["misses"]) or 0
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / total if total else 0.0,
+    }
+
+
+def reset_stats():
+    caches["default"].delete_many(list(STATS_KEYS.values()))
@@ -0,0 +1,164 @@
+"""
+Generation telemetry: phase timings and token usage per article
+ArticleGenerator fills in a Telemetry for each generate/stream call; the
+caller (worker, streaming view, bulk command) stores it as a GenerationRun
+once it knows the outcome. summary() aggregates the rows for the dashboard.
+"""
+import logging
+import time
+from contextlib import contextmanager
+
+from django.db.models import Aggregate, Count, FloatField, Q, Sum
+from .models import GenerationRun
+
+logger = logging.getLogger(__name__)
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000)
+
+
+class Telemetry:
+    """
+    Timings ("search", "generation"), token usage and output size of one call
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.started = time.perf_counter()
+        self.elapsed = None
+        self.phases = {}
+        self.prompt_tokens = None
+        self.completion_tokens = None
+        self.words = 0
+        # Upstream retries made by ai_generator.resilience
+        self.retries = 0
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - started
+
+    def add_usage(self, usage):
+        """
+        Count the `usage` field of a completion or of the last stream chunk
+        """
+        if usage is None:
+            return
+        self.prompt_tokens = (self.prompt_tokens or 0) + usage.prompt_tokens
+        self.completion_tokens = (self.completion_tokens or 0) + usage.completion_tokens
+
+    def retried(self):
+        self.retries += 1
+
+    def finish(self, article):
+        self.words = len(article.split())
+
+    def stop(self):
+        """
+        Fix the total time, for callers that save the record later
+        """
+        if self.elapsed is None:
+            self.elapsed = time.perf_counter() - self.started
+
+    def save(self, source, keyword, error=None, retries=0, author=None, job=None):
+        """
+        Store as a GenerationRun; logs instead of raising, so telemetry
+        never fails a generation
+        `retries` are attempts made outside this call (e.g. earlier job
+        claims), added to the upstream retries counted here
+        """
+        self.stop()
+        if error is not None:
+            outcome = GenerationRun.OUTCOME_FAILED
+        elif "generation" in self.phases:
+            outcome = GenerationRun.OUTCOME_OK
+        else:
+            # Served by the dedupe cache, no API call made
+            outcome = GenerationRun.OUTCOME_REUSED
+
+        # Round the phases, then derive the total from the rest of the time,
+        # so the stored total is never below the sum of the stored phases
+        search_ms = _ms(self.phases.get("search"))
+        generation_ms = _ms(self.phases.get("generation"))
+        phases_ms = (search_ms or 0) + (generation_ms or 0)
+        other_ms = max(_ms(self.elapsed - sum(self.phases.values())), 0)
+
+        try:
+            return GenerationRun.objects.create(
+                source=source,
+                keyword=keyword[:200],
+                model=self.model,
+                outcome=outcome,
+                error="" if error is None else str(error),
+                retries=retries + self.retries,
+                search_ms=search_ms,
+                generation_ms=generation_ms,
+                total_ms=phases_ms + other_ms,
+                prompt_tokens=self.prompt_tokens,
+                completion_tokens=self.completion_tokens,
+                words=self.words,
+                author=author,
+                job=job,
+            )
+        except Exception as e:
+            logger.warning(f"Could not save generation telemetry: {e}")
+            return None
+
+
+@contextmanager
+def recorded(generator, source, keyword, retries=0, author=None, job=None):
+    """
+    Save the telemetry of the generator call made inside the block,
+    as failed if the block raises
+    """
+    try:
+        yield
+    except Exception as e:
+        generator.telemetry.save(source, keyword, e, retries, author, job)
+        raise
+    generator.telemetry.save(source, keyword, None, retries, author, job)
+
+
+class Percentile(Aggregate):
+    """
+    PostgreSQL percentile_cont(fraction) over an expression
+    """
+    function = "percentile_cont"
+    template = "%(function)s(%(fraction)s) WITHIN GROUP (ORDER BY %(expressions)s)"
+    output_field = FloatField()
+
+    def __init__(self, expression, fraction, **extra):
+        super().__init__(expression, fraction=float(fraction), **extra)
+
+
+def summary(runs):
+    """
+    Panel figures for a GenerationRun queryset, in one query
+    Latencies (ms) cover successful API generations only; tokens per word
+    uses the runs that reported usage
+    """
+    ok = Q(outcome=GenerationRun.OUTCOME_OK)
+    reported = Q(completion_tokens__isnull=False, words__gt=0)
+    figures = runs.aggregate(
+        total=Count("id"),
+        failed=Count("id", filter=Q(outcome=GenerationRun.OUTCOME_FAILED)),
+        reused=Count("id", filter=Q(outcome=GenerationRun.OUTCOME_REUSED)),
+        retry_total=Sum("retries", default=0),
+        p50=Percentile("total_ms", 0.5, filter=ok),
+        p95=Percentile("total_ms", 0.95, filter=ok),
+        search_p50=Percentile("search_ms", 0.5, filter=ok),
+        generation_p50=Percentile("generation_ms", 0.5, filter=ok),
+        prompt_total=Sum("prompt_tokens", default=0),
+        completion_total=Sum("completion_tokens", filter=reported, default=0),
+        word_total=Sum("words", filter=reported, default=0),
+    )
+    total = figures["total"]
+    figures["failure_rate"] = figures["failed"] / total * 100 if total else None
+    figures["tokens_per_word"] = (
+        figures["completion_total"] / figures["word_total"] if figures["word_total"] else None
+    )
+    return figures
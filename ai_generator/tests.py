@@ -1,3 +1,880 @@
-from django.test import TestCase
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import requests
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from blog.duplicates import NearDuplicateError
+from blog.models import Category, Post
+from . import clients, dedupe, providers, resilience, search_cache, telemetry
+from .ai_utils import ArticleGenerator, GenerationError
+from .fake_upstream import ARTICLE_FRAGMENTS, USAGE, FakeUpstreamHandler, start_fake_upstream
+from .jobs import (
+    build_generator, claim_next_job, requeue_stale_jobs, run_job, save_article, split_article,
+    submit_job,
+)
+from .models import GenerationJob, GenerationRun
+from .throttling import TokenBucket
+
+class FakeUpstreamTestCase(TestCase):
+    """
+    Runs a fake upstream HTTP server and points the generator settings at it
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server, base = start_fake_upstream()
+        cls.upstream = override_settings(
+            OPENAI_API_KEY="test-key",
+            OPENAI_BASE_URL=f"{base}/v1",
+            VALUESERP_URL=f"{base}/search",
+            # Worker threads must not block on rows locked by the test transaction
+            CACHES={
+                "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+                "search": {
+                    "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                    "LOCATION": "search",
+                },
+                "pages": {
+                    "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                    "LOCATION": "pages",
+                },
+            },
+        )
+        cls.upstream.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.upstream.disable()
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        super().setUp()
+        # Each test starts with no cached search results or completions
+        caches["default"].clear()
+        caches["search"].clear()
+        # ...and with every circuit closed
+        resilience.reset()
+
+    def make_generator(self):
+        base = f"http://127.0.0.1:{self.server.server_port}"
+        return ArticleGenerator(
+            openai_key="test-key",
+            valueserp_key="test-key",
+            openai_base_url=f"{base}/v1",
+            search_url=f"{base}/search",
+        )
+
+
+class GenerationJobTests(FakeUpstreamTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("writer", password="secret")
+        self.client.force_login(self.user)
+        self.category = Category.objects.create(name="Jobs")
+
+    def form_data(self, keyword):
+        return {
+            "keyword": keyword, "language": "en", "tone": "professional",
+            "target_audience": "developers", "min_words": 800, "max_words": 1200,
+            "categories": [self.category.pk],
+        }
+
+    def queue(self, keyword):
+        data = {**self.form_data(keyword), "categories": [self.category]}
+        return submit_job(self.user, data)
+
+    def test_submit_then_poll_until_the_post_is_ready(self):
+        response = self.client.post(reverse("generate_article"), self.form_data("python"))
+
+        job = GenerationJob.objects.get()
+        self.assertRedirects(response, reverse("generation_job", args=[job.pk]))
+        self.assertEqual(job.status, GenerationJob.STATUS_QUEUED)
+        self.assertEqual(list(job.categories.all()), [self.category])
+        self.assertFalse(Post.objects.exists())
+
+        status = self.client.get(reverse("generation_job", args=[job.pk]))
+        self.assertContains(status, "Queued")
+        self.assertContains(status, 'http-equiv="refresh"')
+
+        run_job(claim_next_job())
+        job.refresh_from_db()
+        self.assertRedirects(
+            self.client.get(reverse("generation_job", args=[job.pk])),
+            reverse("blog_detail", args=[job.post_id]),
+        )
+
+    def test_failed_job_shows_the_error_and_stops_polling(self):
+        job = self.queue("FAIL")
+        run_job(claim_next_job())
+
+        response = self.client.get(reverse("generation_job", args=[job.pk]))
+        self.assertContains(response, "Failed to generate article")
+        self.assertNotContains(response, 'http-equiv="refresh"')
+
+    def test_other_users_jobs_are_404(self):
+        job = submit_job(User.objects.create_user("other"), {
+            **self.form_data("python"), "categories": [self.category],
+        })
+        response = self.client.get(reverse("generation_job", args=[job.pk]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_invalid_form_is_not_queued(self):
+        response = self.client.post(reverse("generate_article"), {"keyword": ""})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(GenerationJob.objects.exists())
+
+    def test_jobs_are_claimed_oldest_first(self):
+        first, second = self.queue("first"), self.queue("second")
+
+        claimed = claim_next_job()
+        self.assertEqual(claimed, first)
+        self.assertEqual((claimed.status, claimed.attempts), (GenerationJob.STATUS_RUNNING, 1))
+        self.assertIsNotNone(claimed.started_on)
+        self.assertEqual(claim_next_job(), second)
+        self.assertIsNone(claim_next_job())
+
+    def test_stale_running_jobs_are_requeued(self):
+        stale, fresh = self.queue("stale"), self.queue("fresh")
+        claim_next_job()
+        claim_next_job()
+        GenerationJob.objects.filter(pk=stale.pk).update(
+            started_on=timezone.now() - timedelta(minutes=30)
+        )
+
+        self.assertEqual(requeue_stale_jobs(600), 1)
+
+        stale.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual(stale.status, GenerationJob.STATUS_QUEUED)
+        self.assertEqual(fresh.status, GenerationJob.STATUS_RUNNING)
+        # The next claim counts a second attempt
+        self.assertEqual(claim_next_job().attempts, 2)
+
+
+class ClaimNextJobLockingTests(TransactionTestCase):
+
+    def test_locked_jobs_are_skipped_not_waited_for(self):
+        user = User.objects.create_user("writer")
+        first, second = [
+            GenerationJob.objects.create(
+                author=user, keyword=keyword, tone="plain", target_audience="all",
+                min_words=100, max_words=200,
+            )
+            for keyword in ("first", "second")
+        ]
+        claimed = []
+
+        def other_worker():
+            try:
+                claimed.append(claim_next_job())
+            finally:
+                connection.close()
+
+        # Another worker is still claiming the oldest job
+        with transaction.atomic():
+            GenerationJob.objects.select_for_update().get(pk=first.pk)
+            worker = threading.Thread(target=other_worker)
+            worker.start()
+            worker.join(timeout=5)
+            self.assertFalse(worker.is_alive())
+
+        self.assertEqual(claimed, [second])
+
+
+class ArticleGeneratorStreamingTests(FakeUpstreamTestCase):
+
+    def test_stream_article_yields_fragments_in_order(self):
+        fragments = list(self.make_generator().stream_article("python"))
+        self.assertEqual(fragments, ARTICLE_FRAGMENTS)
+
+    def test_blocking_path_still_returns_full_article(self):
+        article = self.make_generator().generate_article("python")
+        self.assertEqual(article, "".join(ARTICLE_FRAGMENTS))
+
+    def test_async_stream_yields_fragments_in_order(self):
+        async def consume(generator):
+            return [fragment async for fragment in generator.astream_article("python")]
+
+        fragments = async_to_sync(consume)(self.make_generator())
+        self.assertEqual(fragments, ARTICLE_FRAGMENTS)
+
+
+class GenerateArticleStreamViewTests(FakeUpstreamTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("writer", password="secret")
+        self.client.force_login(self.user)
+        self.category = Category.objects.create(name="Streaming")
+
+    def post_form(self, keyword):
+        return self.client.post(reverse("generate_article_stream"), {
+            "keyword": keyword,
+            "language": "en",
+            "tone": "professional",
+            "target_audience": "developers",
+            "min_words": 800,
+            "max_words": 1200,
+            "categories": [self.category.pk],
+        })
+
+    def read_events(self, response):
+        async def consume():
+            return [chunk async for chunk in response.streaming_content]
+
+        chunks = async_to_sync(consume)() if response.is_async else response.streaming_content
+        body = b"".join(chunks).decode()
+        events = []
+        for message in body.strip().split("\n\n"):
+            event = "message"
+            for line in message.split("\n"):
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                elif line.startswith("data: "):
+                    events.append((event, json.loads(line[len("data: "):])))
+        return events
+
+    def test_streams_fragments_then_saves_post(self):
+        response = self.post_form("python")
+
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        events = self.read_events(response)
+        texts = [data["text"] for event, data in events if event == "message"]
+        self.assertEqual(texts, ARTICLE_FRAGMENTS)
+
+        event, data = events[-1]
+        self.assertEqual(event, "done")
+        post = Post.objects.get(pk=data["post"])
+        self.assertEqual(post.title, "Streamed Title")
+        self.assertEqual(post.body, "First paragraph. Second paragraph.")
+        self.assertEqual(post.author, self.user)
+        self.assertEqual(list(post.categories.all()), [self.category])
+        self.assertEqual(data["url"], reverse("blog_detail", args=[post.pk]))
+
+        run = GenerationRun.objects.get()
+        self.assertEqual(run.source, GenerationRun.SOURCE_STREAM)
+        self.assertEqual(run.outcome, GenerationRun.OUTCOME_OK)
+        self.assertEqual((run.prompt_tokens, run.completion_tokens), (120, 12))
+        self.assertEqual(run.words, 6)
+        self.assertIsNotNone(run.search_ms)
+
+    def test_wsgi_streams_from_a_sync_iterator(self):
+        # Django would buffer an async iterator until generation finished
+        response = self.post_form("python")
+        self.assertFalse(response.is_async)
+        first = next(iter(response.streaming_content))
+        self.assertEqual(json.loads(first.decode()[len("data: "):]), {"text": ARTICLE_FRAGMENTS[0]})
+
+    async def test_asgi_streams_from_the_async_client(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.post(reverse("generate_article_stream"), {
+            "keyword": "python", "language": "en", "tone": "professional",
+            "target_audience": "developers", "min_words": 800, "max_words": 1200,
+            "categories": [self.category.pk],
+        })
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+
+        events = [chunk.decode() for chunk in chunks]
+        self.assertEqual(len(events), len(ARTICLE_FRAGMENTS) + 1)
+        self.assertTrue(events[-1].startswith("event: done"))
+        self.assertTrue(await Post.objects.filter(author=self.user).aexists())
+
+    @override_settings(REQUEST_TIMING=True)
+    def test_request_timing_covers_the_streamed_generation(self):
+        with self.assertLogs("simple_blog_ai.requests") as logs:
+            response = self.post_form("python")
+            self.read_events(response)
+
+        self.assertIn("db;dur=", response["Server-Timing"])
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertIn("ai_ms", record)
+        self.assertIn("search_ms", record)
+
+    def test_upstream_failure_emits_error_event(self):
+        events = self.read_events(self.post_form("FAIL"))
+
+        self.assertEqual(events[-1][0], "error")
+        self.assertFalse(Post.objects.exists())
+        run = GenerationRun.objects.get()
+        self.assertEqual(run.outcome, GenerationRun.OUTCOME_FAILED)
+        self.assertIn("bad request", run.error)
+
+    def test_blocked_article_records_one_failed_run(self):
+        existing = Post.objects.create(title="Existing", body="Body", author=self.user)
+        blocked = NearDuplicateError(existing, 1)
+        with mock.patch("blog.duplicates.check", side_effect=blocked):
+            events = self.read_events(self.post_form("python"))
+
+        self.assertEqual(events[-1], ("error", {"error": str(blocked)}))
+        run = GenerationRun.objects.get()
+        self.assertEqual(run.outcome, GenerationRun.OUTCOME_FAILED)
+        self.assertIn("Near-duplicate", run.error)
+
+    def test_invalid_form_is_rejected(self):
+        response = self.client.post(reverse("generate_article_stream"), {"keyword": ""})
+        self.assertEqual(response.status_code, 400)
+
+
+class SearchContextCacheTests(FakeUpstreamTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.generator = self.make_generator()
+
+    def test_repeated_searches_hit_the_cache(self):
+        with mock.patch.object(
+            self.generator, "_fetch_search_context",
+            wraps=self.generator._fetch_search_context,
+        ) as fetch:
+            first = self.generator._search_context("Django  ORM", "us", "en")
+            second = self.generator._search_context("django orm", "US", "en")
+
+        self.assertEqual(first, second)
+        self.assertEqual(first["overview"], "Fake search overview")
+        fetch.assert_called_once()
+        self.assertEqual(search_cache.get_stats()["hits"], 1)
+        self.assertEqual(search_cache.get_stats()["misses"], 1)
+
+    def test_concurrent_misses_make_one_upstream_call(self):
+        calls = []
+
+        def slow_fetch():
+            calls.append(1)
+            time.sleep(0.3)
+            return {"overview": "shared", "urls": []}
+
+        results = []
+
+        def worker():
+            results.append(search_cache.get_or_fetch("python", "us", "en", slow_fetch))
+
+        threads = [threading.Thread(target=worker) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"overview": "shared", "urls": []}] * 5)
+
+    def test_failed_fetch_is_not_cached(self):
+        with mock.patch.object(
+            self.generator, "_fetch_search_context", side_effect=ConnectionError("down")
+        ):
+            context = self.generator._search_context("python", "us", "en")
+
+        self.assertEqual(context, {"overview": "", "urls": []})
+        self.assertIsNone(caches["search"].get(search_cache.cache_key("python", "us", "en")))
+
+
+@override_settings(
+    AI_BREAKER_FAILURES=2, AI_BREAKER_RESET=60, AI_RETRY_BACKOFF=0.01,
+    AI_SEARCH_RETRIES=1, AI_OPENAI_RETRIES=1,
+)
+class ResilienceTests(FakeUpstreamTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.generator = self.make_generator()
+        FakeUpstreamHandler.completions = 0
+        FakeUpstreamHandler.searches = 0
+        self.addCleanup(setattr, FakeUpstreamHandler, "search_outages", 0)
+        self.addCleanup(setattr, FakeUpstreamHandler, "completion_outages", 0)
+
+    def test_retryable_errors_are_retried(self):
+        FakeUpstreamHandler.completion_outages = 1
+        article = self.generator.generate_article("python", force_fresh=True)
+
+        self.assertEqual(article, "".join(ARTICLE_FRAGMENTS))
+        self.assertEqual(FakeUpstreamHandler.completions, 2)
+        self.assertFalse(resilience.get_breaker("openai").is_open())
+
+    def test_rejected_requests_are_not_retried(self):
+        with self.assertRaises(GenerationError):
+            self.generator.generate_article("FAIL", force_fresh=True)
+        self.assertEqual(FakeUpstreamHandler.completions, 1)
+
+    def test_open_breaker_fails_fast_until_the_trial_call(self):
+        FakeUpstreamHandler.completion_outages = 2
+        with self.assertRaises(GenerationError):
+            self.generator.generate_article("python", force_fresh=True)
+        self.assertTrue(resilience.get_breaker("openai").is_open())
+
+        with self.assertRaises(GenerationError) as raised:
+            self.generator.generate_article("python", force_fresh=True)
+        self.assertIsInstance(raised.exception.__cause__, resilience.CircuitOpenError)
+        self.assertEqual(FakeUpstreamHandler.completions, 2)
+
+        # Once the reset time has passed, one successful call closes it again
+        resilience.get_breaker("openai").opened_at -= 61
+        self.generator.generate_article("python", force_fresh=True)
+        self.assertFalse(resilience.get_breaker("openai").is_open())
+
+    def test_open_search_breaker_skips_straight_to_no_context(self):
+        FakeUpstreamHandler.search_outages = 2
+        self.assertEqual(self.generator._search_context("python", "us", "en")["overview"], "")
+        self.assertEqual(FakeUpstreamHandler.searches, 2)
+        self.assertTrue(resilience.get_breaker("search").is_open())
+
+        started = time.monotonic()
+        article = self.generator.generate_article("rust", force_fresh=True)
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(article, "".join(ARTICLE_FRAGMENTS))
+        # No search request while the breaker is open
+        self.assertEqual(FakeUpstreamHandler.searches, 2)
+        self.assertIsNotNone(self.generator.telemetry.phases["search"])
+
+    def test_open_search_breaker_still_serves_cached_context(self):
+        self.generator._search_context("python", "us", "en")
+        for _ in range(2):
+            resilience.get_breaker("search").failure()
+
+        context = self.generator._search_context("python", "us", "en")
+        self.assertEqual(context["overview"], "Fake search overview")
+        self.assertEqual(FakeUpstreamHandler.searches, 1)
+
+    @override_settings(AI_SEARCH_BUDGET=0.5)
+    def test_attempts_share_the_latency_budget(self):
+        seen = []
+
+        def slow(timeout):
+            seen.append(timeout)
+            raise requests.Timeout("slow")
+
+        started = time.monotonic()
+        with self.assertRaises(requests.Timeout):
+            resilience.call("search", slow)
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertLessEqual(seen[0], 0.5)
+
+
+class ClientRegistryTests(TestCase):
+
+    def tearDown(self):
+        clients.reset()
+
+    def test_generators_share_pooled_clients(self):
+        first = ArticleGenerator(openai_key="key", valueserp_key="key")
+        second = ArticleGenerator(openai_key="key", valueserp_key="key")
+
+        self.assertIs(first.llm.client, second.llm.client)
+        self.assertIs(first.search.session, second.search.session)
+
+    def test_clients_are_rebuilt_in_a_forked_child(self):
+        parent_client = clients.get_openai_client("key")
+        parent_session = clients.get_http_session()
+
+        with mock.patch.object(clients.os, "getpid", return_value=clients._pid + 1):
+            self.assertIsNot(clients.get_openai_client("key"), parent_client)
+            self.assertIsNot(clients.get_http_session(), parent_session)
+
+
+class GenerateArticlesCommandTests(FakeUpstreamTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("seeder")
+        Category.objects.create(name="Existing")
+
+    def run_command(self, content, suffix):
+        with tempfile.NamedTemporaryFile("w", suffix=suffix, delete=False) as f:
+            f.write(content)
+        self.addCleanup(os.remove, f.name)
+        out = io.StringIO()
+        call_command(
+            "generate_articles", f.name, "--author", "seeder",
+            "--concurrency", "3", "--rate", "50", stdout=out,
+        )
+        return out.getvalue()
+
+    def test_csv_rows_become_posts_with_categories(self):
+        output = self.run_command(
+            "keyword,language,categories\n"
+            "python,en,Existing;Brand New\n"
+            "django,es,Existing\n"
+            "rust,en,\n",
+            ".csv",
+        )
+
+        self.assertIn("Articles saved: 3/3", output)
+        self.assertEqual(Post.objects.filter(author=self.user).count(), 3)
+        post = Post.objects.get(language="es")
+        self.assertEqual(post.title, "Streamed Title")
+        self.assertEqual([c.name for c in post.categories.all()], ["Existing"])
+        self.assertTrue(post.body_html)
+        self.assertTrue(Category.objects.filter(name="Brand New").exists())
+
+    def test_upstream_retries_are_resilience_only(self):
+        FakeUpstreamHandler.completions = 0
+        FakeUpstreamHandler.completion_outages = 1
+        self.addCleanup(setattr, FakeUpstreamHandler, "completion_outages", 0)
+        output = self.run_command("keyword\npython\n", ".csv")
+
+        self.assertIn("Articles saved: 1/1", output)
+        self.assertIn("Retries: 1", output)
+        self.assertEqual(FakeUpstreamHandler.completions, 2)
+        self.assertEqual(GenerationRun.objects.get().retries, 1)
+
+    def test_non_positive_rate_is_rejected(self):
+        for option in ("--rate", "--burst", "--concurrency"):
+            with self.subTest(option=option), self.assertRaisesMessage(CommandError, "greater than 0"):
+                call_command("generate_articles", "rows.csv", "--author", "seeder", option, "0")
+
+        with self.assertRaises(ValueError):
+            TokenBucket(0)
+        with self.assertRaises(ValueError):
+            TokenBucket(1, capacity=0)
+
+    def test_bad_word_counts_name_the_row(self):
+        for content, suffix, message in [
+            ("keyword,min_words\npython,900\ndjango,many\n", ".csv", "Row 2 has non-numeric"),
+            ('{"keyword": "python", "max_words": [1]}\n', ".jsonl", "Row 1 has non-numeric"),
+            ("keyword,min_words,max_words\npython,900,800\n", ".csv", "Row 1 needs 0 < min_words <= max_words"),
+            ("keyword,min_words\npython,-5\n", ".csv", "Row 1 needs"),
+        ]:
+            with self.subTest(content=content), self.assertRaisesMessage(CommandError, message):
+                self.run_command(content, suffix)
+        self.assertFalse(Post.objects.exists())
+
+    def test_jsonl_input(self):
+        output = self.run_command(
+            '{"keyword": "python", "categories": ["Existing"], "min_words": 300}\n',
+            ".jsonl",
+        )
+        self.assertIn("Articles saved: 1/1", output)
+
+
+class GenerationDedupeTests(FakeUpstreamTestCase):
+
+    def setUp(self):
+        super().setUp()
+        FakeUpstreamHandler.completions = 0
+
+    def generate(self, **kwargs):
+        return self.make_generator().generate_article("dedupe me", **kwargs)
+
+    def test_identical_requests_reuse_a_recent_completion(self):
+        first = self.generate()
+        second = self.generate()
+
+        self.assertEqual(first, second)
+        self.assertEqual(FakeUpstreamHandler.completions, 1)
+
+    def test_force_fresh_calls_the_api_again(self):
+        self.generate()
+        self.generate(force_fresh=True)
+
+        self.assertEqual(FakeUpstreamHandler.completions, 2)
+
+    def test_concurrent_streams_share_one_completion(self):
+        FakeUpstreamHandler.fragment_delay = 0.05
+        self.addCleanup(setattr, FakeUpstreamHandler, "fragment_delay", 0.0)
+        results = []
+
+        def stream():
+            results.append("".join(self.make_generator().stream_article("dedupe me")))
+
+        threads = [threading.Thread(target=stream) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(FakeUpstreamHandler.completions, 1)
+        self.assertEqual(results, ["".join(ARTICLE_FRAGMENTS).strip()] * 3)
+
+    @override_settings(AI_DEDUPE_LOCK_TIMEOUT=5)
+    def test_failed_stream_releases_the_lock(self):
+        started = time.monotonic()
+        for _ in range(2):
+            with self.assertRaises(GenerationError):
+                list(self.make_generator().stream_article("FAIL"))
+
+        # The retry did not wait out the first request's lock
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(FakeUpstreamHandler.completions, 2)
+
+    @override_settings(AI_DEDUPE_REUSE_WINDOW=0)
+    def test_concurrent_duplicates_wait_for_the_in_flight_call(self):
+        calls = []
+
+        def slow_generate():
+            calls.append(1)
+            time.sleep(0.3)
+            return "article"
+
+        key = dedupe.request_key("model", "prompt")
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(dedupe.get_or_generate(key, slow_generate)))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["article"] * 4)
+
+        # Outside the reuse window, a new request generates again
+        dedupe.get_or_generate(key, slow_generate)
+        self.assertEqual(len(calls), 2)
+
+
+class GenerationTelemetryTests(FakeUpstreamTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("writer")
+        self.category = Category.objects.create(name="Telemetry")
+
+    def submit(self, keyword):
+        submit_job(self.user, {
+            "keyword": keyword, "language": "en", "tone": "professional",
+            "target_audience": "developers", "min_words": 800, "max_words": 1200,
+            "categories": [self.category],
+        })
+        return run_job(claim_next_job())
+
+    def test_job_records_phases_tokens_and_outcome(self):
+        job = self.submit("python")
+
+        run = GenerationRun.objects.get(job=job)
+        self.assertEqual(run.source, GenerationRun.SOURCE_JOB)
+        self.assertEqual(run.outcome, GenerationRun.OUTCOME_OK)
+        self.assertEqual(run.model, "gpt-4o-mini")
+        self.assertEqual(run.prompt_tokens, USAGE["prompt_tokens"])
+        self.assertEqual(run.completion_tokens, USAGE["completion_tokens"])
+        self.assertEqual(run.retries, 0)
+        self.assertGreaterEqual(run.total_ms, run.search_ms + run.generation_ms)
+
+    def test_reused_completion_and_failure_outcomes(self):
+        self.submit("python")
+        self.submit("python")
+        self.submit("FAIL")
+
+        outcomes = list(GenerationRun.objects.order_by("id").values_list("outcome", "generation_ms"))
+        self.assertEqual(outcomes[0][0], GenerationRun.OUTCOME_OK)
+        self.assertEqual(outcomes[1], (GenerationRun.OUTCOME_REUSED, None))
+        self.assertEqual(outcomes[2][0], GenerationRun.OUTCOME_FAILED)
+
+    def test_blocked_job_records_one_failed_run(self):
+        existing = Post.objects.create(title="Existing", body="Body", author=self.user)
+        with mock.patch("blog.duplicates.check", side_effect=NearDuplicateError(existing, 1)):
+            job = self.submit("python")
+
+        self.assertEqual(job.status, GenerationJob.STATUS_FAILED)
+        run = GenerationRun.objects.get(job=job)
+        self.assertEqual(run.outcome, GenerationRun.OUTCOME_FAILED)
+        self.assertIn("Near-duplicate", run.error)
+
+    def test_total_is_never_below_the_rounded_phases(self):
+        run = telemetry.Telemetry("m")
+        # Each phase rounds up, their exact sum does not
+        run.phases = {"search": 0.1075, "generation": 0.1075}
+        run.elapsed = 0.2151
+
+        saved = run.save(GenerationRun.SOURCE_BULK, "k")
+
+        self.assertEqual((saved.search_ms, saved.generation_ms), (108, 108))
+        self.assertEqual(saved.total_ms, 216)
+
+    def test_summary_aggregates_latency_tokens_and_failures(self):
+        for total_ms in (100, 200, 300, 400):
+            GenerationRun.objects.create(
+                source=GenerationRun.SOURCE_BULK, keyword="k", model="m",
+                outcome=GenerationRun.OUTCOME_OK, total_ms=total_ms, search_ms=10,
+                generation_ms=total_ms - 10, prompt_tokens=100, completion_tokens=150, words=100,
+            )
+        GenerationRun.objects.create(
+            source=GenerationRun.SOURCE_BULK, keyword="k", model="m",
+            outcome=GenerationRun.OUTCOME_FAILED, total_ms=5000, retries=3,
+        )
+
+        figures = telemetry.summary(GenerationRun.objects.all())
+
+        self.assertEqual(figures["total"], 5)
+        self.assertEqual(figures["failure_rate"], 20.0)
+        self.assertEqual(figures["p50"], 250.0)
+        self.assertAlmostEqual(figures["p95"], 385.0)
+        self.assertEqual(figures["tokens_per_word"], 1.5)
+        self.assertEqual(figures["retry_total"], 3)
+
+
+@override_settings(
+    AI_LLM_PROVIDER="fake", AI_SEARCH_PROVIDER="fake",
+    AI_FAKE_LATENCY=0.01, AI_FAKE_SEARCH_LATENCY=0, AI_FAKE_TOKENS_PER_SECOND=100000,
+    AI_FAKE_CHUNK_TOKENS=20, AI_FAKE_ARTICLE_WORDS=120,
+    AI_BREAKER_FAILURES=2, AI_RETRY_BACKOFF=0.01, AI_OPENAI_RETRIES=1,
+)
+class FakeProviderTests(FakeUpstreamTestCase):
+
+    def setUp(self):
+        super().setUp()
+        providers.reset_fakes()
+        self.addCleanup(providers.reset_fakes)
+        self.user = User.objects.create_user("loadtest")
+        self.category = Category.objects.create(name="Offline")
+        FakeUpstreamHandler.completions = 0
+        FakeUpstreamHandler.searches = 0
+
+    def test_settings_select_the_fake_providers(self):
+        generator = build_generator()
+        self.assertIsInstance(generator.llm, providers.FakeLLMProvider)
+        self.assertIsInstance(generator.search, providers.FakeSearchProvider)
+        self.assertEqual(generator.model, "fake-llm")
+
+    def test_incomplete_providers_fail_on_instantiation(self):
+        class CompleteOnly(providers.LLMProvider):
+            def complete(self, messages, timeout):
+                return "", None
+
+        class NoSearch(providers.SearchProvider):
+            pass
+
+        for cls in (CompleteOnly, NoSearch):
+            with self.subTest(cls=cls.__name__), self.assertRaises(TypeError):
+                cls()
+
+    def test_fake_articles_are_deterministic(self):
+        first = build_generator().generate_article("python", force_fresh=True)
+        second = build_generator().generate_article("python", force_fresh=True)
+        other = build_generator().generate_article("rust", force_fresh=True)
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertEqual(split_article(first, "python")[0], "A practical guide to python")
+        self.assertEqual(len(first.split()), 125)
+        # Nothing reached the HTTP upstream
+        self.assertEqual((FakeUpstreamHandler.completions, FakeUpstreamHandler.searches), (0, 0))
+
+    def test_stream_is_chunked_and_reports_usage(self):
+        generator = build_generator()
+        fragments = list(generator.stream_article("python"))
+
+        self.assertEqual(len(fragments), 7)
+        self.assertEqual("".join(fragments), generator.generate_article("python", force_fresh=True))
+        self.assertEqual(generator.telemetry.completion_tokens, 125)
+
+        async def consume():
+            return [fragment async for fragment in generator.astream_article("python", force_fresh=True)]
+
+        self.assertEqual(async_to_sync(consume)(), fragments)
+
+    @override_settings(AI_FAKE_LATENCY=1, AI_OPENAI_BUDGET=0.2)
+    def test_latency_over_the_budget_times_out(self):
+        started = time.monotonic()
+        with self.assertRaises(GenerationError):
+            build_generator().generate_article("python", force_fresh=True)
+        self.assertLess(time.monotonic() - started, 1)
+
+    @override_settings(AI_FAKE_ERROR_RATE=1)
+    def test_injected_errors_are_retried_and_open_the_breaker(self):
+        with self.assertRaises(GenerationError) as raised:
+            build_generator().generate_article("python", force_fresh=True)
+
+        self.assertEqual(raised.exception.__cause__.status_code, 503)
+        self.assertTrue(resilience.get_breaker("openai").is_open())
+        # Search failures fall back to no context instead of failing
+        self.assertEqual(build_generator()._search_context("python", "us", "en")["overview"], "")
+
+    @override_settings(AI_FAKE_ERROR_RATE=0.5, AI_FAKE_SEED=7)
+    def test_injected_errors_follow_the_seed(self):
+        def outcomes():
+            providers.reset_fakes()
+            results = []
+            for _ in range(10):
+                try:
+                    providers._inject_error("llm")
+                    results.append(True)
+                except Exception:
+                    results.append(False)
+            return results
+
+        first = outcomes()
+        self.assertEqual(first, outcomes())
+        self.assertIn(True, first)
+        self.assertIn(False, first)
+
+    def test_job_and_bulk_command_run_offline(self):
+        submit_job(self.user, {
+            "keyword": "python", "language": "en", "tone": "professional",
+            "target_audience": "developers", "min_words": 800, "max_words": 1200,
+            "categories": [self.category],
+        })
+        job = run_job(claim_next_job())
+        self.assertEqual(job.post.title, "A practical guide to python")
+        self.assertEqual(GenerationRun.objects.get(job=job).model, "fake-llm")
+
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as f:
+            f.write("keyword,language,categories\nrust,en,Offline\ngo,en,Offline\n")
+        self.addCleanup(os.remove, f.name)
+        out = io.StringIO()
+        call_command("generate_articles", f.name, "--author", "loadtest", "--rate", "50", stdout=out)
+
+        self.assertIn("Articles saved: 2/2", out.getvalue())
+        self.assertEqual(Post.objects.filter(author=self.user).count(), 3)
+
+
+    def test_bulk_rows_are_checked_against_the_same_batch(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as f:
+            f.write("keyword\nrust\nrust\n")
+        self.addCleanup(os.remove, f.name)
+
+        for action, saved in [("block", 1), ("flag", 2)]:
+            with self.subTest(action=action), override_settings(DUPLICATE_ACTION=action):
+                Post.objects.all().delete()
+                out = io.StringIO()
+                call_command("generate_articles", f.name, "--author", "loadtest", "--rate", "50", stdout=out)
+
+                self.assertIn(f"Articles saved: {saved}/2", out.getvalue())
+                first, *rest = Post.objects.order_by("id")
+                self.assertEqual([post.duplicate_of for post in rest], [first] * len(rest))
+                self.assertIsNone(first.duplicate_of)
+
+        # One run per row and generation: the blocked row failed, nothing else did
+        outcomes = GenerationRun.objects.order_by("id").values_list("outcome", flat=True)
+        self.assertEqual(list(outcomes).count(GenerationRun.OUTCOME_FAILED), 1)
+        self.assertEqual(len(outcomes), 4)
+
+class SaveArticleDuplicateTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user("writer")
+        self.body = " ".join(f"sentence {n} about django views" for n in range(60))
+        self.existing = Post.objects.create(title="Existing", body=self.body, author=self.user)
+
+    @override_settings(DUPLICATE_ACTION="flag")
+    def test_flagged_article_links_the_existing_post(self):
+        post = save_article(self.user, f"Again\n{self.body}", "django", "en", [])
+        self.assertEqual(post.duplicate_of, self.existing)
+
+    @override_settings(DUPLICATE_ACTION="block")
+    def test_blocked_article_is_not_saved(self):
+        with self.assertRaises(NearDuplicateError):
+            save_article(self.user, f"Again\n{self.body}", "django", "en", [])
+        self.assertEqual(Post.objects.count(), 1)
+
+        post = save_article(self.user, "Fresh\nSomething else entirely", "rust", "en", [])
+        self.assertIsNone(post.duplicate_of)
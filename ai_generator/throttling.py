@@ -0,0 +1,72 @@
+"""
+Rate limiting and retry helpers for bulk calls to the AI/search APIs
+"""
+import random
+import threading
+import time
+
+import openai
+import requests
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`
+    """
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError(f"Token bucket rate must be positive, got {rate}")
+        if capacity is not None and capacity < 1:
+            raise ValueError(f"Token bucket capacity must be at least 1, got {capacity}")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Block until a token is available, then take it
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def _status_code(exc):
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        return exc.response.status_code
+    return None
+
+
+def is_retryable(exc):
+    """
+    True for rate limits, upstream 5xx and transport errors
+    Walks the exception chain, since ArticleGenerator wraps API errors
+    """
+    while exc is not None:
+        if isinstance(exc, (openai.APIConnectionError, requests.ConnectionError, requests.Timeout)):
+            return True
+        if _status_code(exc) in RETRYABLE_STATUS:
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+def backoff_delay(attempt, base=1.0, cap=30.0):
+    """
+    Full-jitter exponential backoff for the given (1-based) retry attempt
+    """
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
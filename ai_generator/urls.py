@@ -3,4 +3,6 @@ from . import views
 
 urlpatterns = [
     path("generate/", views.generate_article_view, name="generate_article"),
+    path("generate/stream/", views.generate_article_stream_view, name="generate_article_stream"),
+    path("jobs/<int:pk>/", views.generation_job_view, name="generation_job"),
 ]
@@ -1,87 +1,186 @@
-from django.shortcuts import render, redirect
+from asgiref.sync import sync_to_async
+from django.shortcuts import aget_object_or_404, render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.views.decorators.http import require_POST
 from .forms import AIArticleForm
-from .ai_utils import ArticleGenerator
-from blog.models import Post
+from .jobs import build_generator, save_article, submit_job
+from .models import GenerationJob, GenerationRun
+from simple_blog_ai.streaming import is_asgi
+import json
 import logging
 
 logger = logging.getLogger(__name__)
 
 
 @login_required
-def generate_article_view(request):
+async def generate_article_view(request):
     """
-    View to generate AI-powered articles with localized title
+    View to queue AI-powered article generation with localized title
     """
     if request.method == "POST":
         form = AIArticleForm(request.POST)
         
-        if form.is_valid():
-            # Extract all user inputs
-            keyword = form.cleaned_data["keyword"]
-            language = form.cleaned_data["language"]
-            tone = form.cleaned_data["tone"]
-            target_audience = form.cleaned_data["target_audience"]
-            min_words = form.cleaned_data["min_words"]
-            max_words = form.cleaned_data["max_words"]
-            selected_categories = form.cleaned_data["categories"]
-            
-            try:
-                # Initialize AI generator
-                generator = ArticleGenerator(
-                    openai_key=settings.OPENAI_API_KEY,
-                    valueserp_key=settings.VALUESERP_API_KEY
-                )
-                
-                # Generate article (first line is title, rest is body)
-                full_article = generator.generate_article(
-                    keyword=keyword,
-                    language=language,
-                    tone=tone,
-                    target_audience=target_audience,
-                    min_words=min_words,
-                    max_words=max_words,
-                    country=settings.DEFAULT_COUNTRY
-                )
-                
-                # Extract title (first line) and body (rest)
-                lines = full_article.split('\n', 1)
-                if len(lines) >= 2:
-                    title = lines[0].strip()
-                    body = lines[1].strip()
-                else:
-                    # Fallback if no line break
-                    title = keyword
-                    body = full_article
-                
-                # Create post with localized title
-                post = Post.objects.create(
-                    title=title,  # ← Localized title from AI
-                    body=body,
-                    author=request.user
-                )
-                
-                # Assign categories
-                post.categories.set(selected_categories)
-                post.save()
-                
-                messages.success(
-                    request, 
-                    f"Article '{title}' generated successfully!"
-                )
-                return redirect("blog_detail", pk=post.pk)
-                
-            except Exception as e:
-                logger.error(f"Article generation failed: {e}")
-                messages.error(
-                    request, 
-                    f"Failed to generate article: {str(e)}"
-                )
+        # Category choices are validated against the database
+        if await sync_to_async(form.is_valid)():
+            # Queue the generation; a worker process runs it
+            job = await sync_to_async(submit_job)(
+                author=await request.auser(),
+                cleaned_data=form.cleaned_data,
+                country=settings.DEFAULT_COUNTRY
+            )
+            messages.info(
+                request,
+                f"Article '{job.keyword}' queued for generation."
+            )
+            return redirect("generation_job", pk=job.pk)
         
     else:
         form = AIArticleForm()
     
     context = {"form": form}
-    return render(request, "ai_generator/generate.html", context)
+    return await sync_to_async(render)(request, "ai_generator/generate.html", context)
+
+
+@login_required
+async def generation_job_view(request, pk):
+    """
+    Status page for a queued generation, polled until the job finishes
+    Redirects to the new post once it is done
+    """
+    job = await aget_object_or_404(
+        GenerationJob.objects.select_related("post"),
+        pk=pk, author=await request.auser()
+    )
+
+    if job.status == GenerationJob.STATUS_DONE and job.post_id:
+        messages.success(
+            request,
+            f"Article '{job.post.title}' generated successfully!"
+        )
+        if job.post.duplicate_of_id:
+            messages.warning(
+                request,
+                f"It is nearly identical to post #{job.post.duplicate_of_id}."
+            )
+        return redirect("blog_detail", pk=job.post_id)
+
+    context = {
+        "job": job,
+        "poll_interval": settings.AI_JOB_POLL_SECONDS,
+    }
+    return await sync_to_async(render)(request, "ai_generator/job_status.html", context)
+
+
+def sse_event(data, event=None):
+    """
+    Format one Server-Sent Events message with a JSON payload
+    """
+    message = f"data: {json.dumps(data)}\n\n"
+    if event:
+        message = f"event: {event}\n{message}"
+    return message
+
+
+@login_required
+@require_POST
+async def generate_article_stream_view(request):
+    """
+    Generate an article and stream it to the browser as Server-Sent Events
+
+    Emits `data: {"text": ...}` for each fragment, then `event: done` with the
+    URL of the saved post (and the id of a near-duplicate it was flagged
+    against), or `event: error` if generation fails or is blocked as a
+    near-duplicate.
+    Under ASGI the completion streams over the async LLM client, so a slow
+    generation does not hold a worker thread; under WSGI (and runserver) it
+    streams over the sync client, holding the worker until it finishes.
+    """
+    form = AIArticleForm(request.POST)
+    if not await sync_to_async(form.is_valid)():
+        return JsonResponse({"errors": form.errors}, status=400)
+
+    data = form.cleaned_data
+    author = await request.auser()
+    generator = build_generator()
+    options = dict(
+        keyword=data["keyword"],
+        language=data["language"],
+        tone=data["tone"],
+        target_audience=data["target_audience"],
+        min_words=data["min_words"],
+        max_words=data["max_words"],
+        country=settings.DEFAULT_COUNTRY,
+        force_fresh=data["force_fresh"]
+    )
+
+    def record(error):
+        generator.telemetry.save(
+            GenerationRun.SOURCE_STREAM, data["keyword"], error, author=author
+        )
+
+    def finish(parts):
+        """
+        Save the post, record the run and return the `done` event
+        A post blocked as a near-duplicate records a failed run
+        """
+        generator.telemetry.stop()
+        try:
+            post = save_article(
+                author, "".join(parts).strip(), data["keyword"],
+                data["language"], data["categories"]
+            )
+        except Exception as e:
+            record(e)
+            raise
+        record(None)
+        return sse_event(
+            {"post": post.pk, "title": post.title,
+             "url": reverse("blog_detail", args=[post.pk]),
+             "duplicate_of": post.duplicate_of_id},
+            event="done"
+        )
+
+    def failed(error):
+        logger.error(f"Streaming article generation failed: {error}")
+        return sse_event({"error": str(error)}, event="error")
+
+    async def async_events():
+        parts = []
+        try:
+            try:
+                async for fragment in generator.astream_article(**options):
+                    parts.append(fragment)
+                    yield sse_event({"text": fragment})
+            except Exception as e:
+                await sync_to_async(record)(e)
+                raise
+            yield await sync_to_async(finish)(parts)
+        except Exception as e:
+            yield failed(e)
+
+    def sync_events():
+        parts = []
+        try:
+            try:
+                for fragment in generator.stream_article(**options):
+                    parts.append(fragment)
+                    yield sse_event({"text": fragment})
+            except Exception as e:
+                record(e)
+                raise
+            yield finish(parts)
+        except Exception as e:
+            yield failed(e)
+
+    # An async iterator would be buffered whole under WSGI
+    events = async_events() if is_asgi(request) else sync_events()
+
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Stop nginx-style proxies from buffering the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -2,14 +2,32 @@
 
 from django.contrib import admin
 from blog.models import Category, Comment, Post
+from blog.search import highlight, search_posts, with_headlines
 
 
 class CategoryAdmin(admin.ModelAdmin):
-    pass
+    list_display = ('name', 'slug', 'post_count')
+    prepopulated_fields = {'slug': ('name',)}
 
 class PostAdmin(admin.ModelAdmin):
-    list_display = ('title', 'created_on', 'last_modified')
-    search_fields = ('title', 'body')
+    list_display = ('title', 'language', 'created_on', 'last_modified', 'search_snippet')
+    list_filter = ('language',)
+    # Only enables the search box; matching goes through the GIN-indexed vector
+    search_fields = ('title',)
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Ranked full-text search instead of ILIKE scans over every body
+        """
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        queryset = with_headlines(search_posts(queryset, search_term), search_term)
+        return queryset, False
+
+    @admin.display(description='Match')
+    def search_snippet(self, obj):
+        return highlight(getattr(obj, 'headline', ''))
 
 class CommentAdmin(admin.ModelAdmin):
     pass
@@ -5,3 +5,7 @@ class BlogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blog'
 
+    def ready(self):
+        # Keep Category.post_count in step with post category links
+        from . import signals  # noqa: F401
+
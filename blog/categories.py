@@ -0,0 +1,51 @@
+"""
+Cached per-category post counts
+Category.post_count is adjusted incrementally (see blog.signals), so category
+navigation never runs a COUNT over the posts/categories join table
+"""
+from collections import Counter
+
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest, Now
+from .models import Category, Post
+
+
+def adjust_post_counts(deltas):
+    """
+    Apply {category_id: delta} with one UPDATE per distinct delta
+    """
+    by_delta = {}
+    for category_id, delta in deltas.items():
+        if delta:
+            by_delta.setdefault(delta, []).append(category_id)
+    for delta, category_ids in by_delta.items():
+        Category.objects.filter(pk__in=category_ids).update(
+            post_count=Greatest(F("post_count") + delta, 0),
+            last_modified=Now(),
+        )
+
+
+def count_links(category_ids, delta=1):
+    """
+    Deltas for a list of category ids, one entry per post link
+    """
+    return {category_id: count * delta for category_id, count in Counter(category_ids).items()}
+
+
+def recount_posts():
+    """
+    Recompute every Category.post_count from the join table
+    Returns the number of categories whose cached count was wrong
+    """
+    Link = Post.categories.through
+    actual = (
+        Link.objects.filter(category_id=OuterRef("pk"))
+        .order_by()
+        .values("category_id")
+        .annotate(n=Count("id"))
+        .values("n")
+    )
+    fresh = Coalesce(Subquery(actual), 0)
+    drifted = Category.objects.annotate(fresh=fresh).exclude(post_count=F("fresh")).count()
+    Category.objects.update(post_count=fresh, last_modified=Now())
+    return drifted
@@ -0,0 +1,146 @@
+"""
+Conditional GET (ETag / Last-Modified) for the public blog pages
+Validators come from a couple of indexed lookups, so a matching request is
+answered with 304 before the page query or template render runs
+"""
+import hashlib
+from datetime import datetime
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from .models import Category, Comment, Post, RelatedPost
+
+
+def navigation_state():
+    """
+    (newest change, number of categories) for the category navigation
+    Post counts bump Category.last_modified, so adding or removing a post shows here too
+    """
+    state = Category.objects.aggregate(changed=Max("last_modified"), total=Count("id"))
+    return state["changed"], state["total"]
+
+
+def listing_state(request, **kwargs):
+    """
+    Validator parts for index and category pages: the newest post edit and
+    the number of posts (a deleted post leaves no newer timestamp, and posts
+    without a category do not show in navigation_state)
+    """
+    state = Post.objects.aggregate(newest=Max("last_modified"), total=Count("id"))
+    return [state["newest"], state["total"]]
+
+
+def detail_state(request, pk):
+    """
+    Validator parts for a post page: the post, its comment count, newest
+    comment and related-post rows (rewritten lists get new ids, cascaded
+    deletes lower the count)
+    None when the post does not exist (the view answers 404)
+    """
+    newest_comment = Comment.objects.filter(post=OuterRef("pk")).order_by("-created_on", "-id")
+    neighbours = RelatedPost.objects.filter(post=OuterRef("pk")).order_by().values("post")
+    row = (
+        Post.objects.filter(pk=pk)
+        .annotate(
+            comment_on=Subquery(newest_comment.values("created_on")[:1]),
+            comment_id=Subquery(newest_comment.values("id")[:1]),
+            related_count=Subquery(neighbours.annotate(n=Count("id")).values("n")),
+            related_id=Subquery(neighbours.annotate(n=Max("id")).values("n")),
+        )
+        .values_list(
+            "last_modified", "comment_count", "comment_on", "comment_id",
+            "related_count", "related_id",
+        )
+        .first()
+    )
+    return list(row) if row is not None else None
+
+
+def _validate(request, state, args, kwargs):
+    """
+    (etag, last_modified, authenticated, 304 response or None) for the
+    request, or None when it is not validated
+    """
+    if request.method not in ("GET", "HEAD") or len(get_messages(request)):
+        return None
+
+    parts = state(request, *args, **kwargs)
+    if parts is None:
+        return None
+    changed, categories = navigation_state()
+    parts += [changed, categories, request.user.pk]
+
+    # Counts, ids and the user change the page without a newer timestamp, so
+    # If-Modified-Since alone could match a stale copy; such pages get an ETag only
+    timestamps = [p for p in parts if isinstance(p, datetime)]
+    last_modified = None
+    if timestamps and all(p is None or isinstance(p, datetime) for p in parts):
+        last_modified = int(max(timestamps).timestamp())
+    raw = "|".join(str(p) for p in [request.get_full_path(), *parts])
+    etag = quote_etag(hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32])
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    return etag, last_modified, request.user.is_authenticated, response
+
+
+def _add_headers(response, etag, last_modified, authenticated):
+    if response.status_code not in (200, 304):
+        return response
+
+    response.headers.setdefault("ETag", etag)
+    if last_modified is not None:
+        response.headers.setdefault("Last-Modified", http_date(last_modified))
+    if authenticated:
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        # Browsers revalidate every time; a shared proxy may reuse the
+        # page for s-maxage seconds, then revalidates with these validators
+        patch_cache_control(
+            response, public=True, max_age=0,
+            s_maxage=settings.HTTP_CACHE_SHARED_MAX_AGE,
+        )
+    patch_vary_headers(response, ["Cookie"])
+    return response
+
+
+def conditional_page(state):
+    """
+    Add ETag, Last-Modified and Cache-Control to a GET view and answer
+    matching If-None-Match / If-Modified-Since requests with 304
+
+    `state(request, *args, **kwargs)` returns the values the page depends on,
+    or None to skip validation. All of them feed the ETag; Last-Modified is
+    only sent when every value (navigation and user included) is a datetime
+    or None. Works on sync and async views.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                validated = await sync_to_async(_validate)(request, state, args, kwargs)
+                if validated is None:
+                    return await view(request, *args, **kwargs)
+                etag, last_modified, authenticated, response = validated
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                return _add_headers(response, etag, last_modified, authenticated)
+
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            validated = _validate(request, state, args, kwargs)
+            if validated is None:
+                return view(request, *args, **kwargs)
+            etag, last_modified, authenticated, response = validated
+            if response is None:
+                response = view(request, *args, **kwargs)
+            return _add_headers(response, etag, last_modified, authenticated)
+
+        return wrapper
+    return decorator
@@ -0,0 +1,16 @@
+from .models import Category
+
+
+def categories(request):
+    """
+    Categories for the site navigation, with their cached post counts
+    The queryset is lazy: pages that do not render the nav never query it
+    """
+    return {
+        "nav_categories": (
+            Category.objects
+            .filter(post_count__gt=0)
+            .only("name", "slug", "post_count")
+            .order_by("name")
+        ),
+    }
@@ -0,0 +1,112 @@
+"""
+Near-duplicate posts from their stored body SimHash
+Every post keeps a 64-bit SimHash of its word shingles and four 16-bit LSH
+band keys (blog.rendering.signature). Signatures at most 3 bits apart share a
+band, so one GIN lookup on Post.simhash_bands returns every candidate and
+only those few are compared bit by bit.
+"""
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+from .models import Post
+from .rendering import hamming, signature
+
+logger = logging.getLogger(__name__)
+
+
+class NearDuplicateError(ValueError):
+    """
+    Raised for a generated article that is too close to an existing post
+    """
+    def __init__(self, post, distance):
+        self.post = post
+        self.distance = distance
+        # Unsaved: a post earlier in the same bulk insert
+        label = f"post #{post.pk} '{post.title}'" if post.pk else f"'{post.title}' earlier in this batch"
+        super().__init__(f"Near-duplicate of {label} ({distance} bits apart)")
+
+
+def nearest(body, exclude=None):
+    """
+    (post, distance) of the closest post within DUPLICATE_MAX_DISTANCE bits
+    of this body, or None
+    """
+    value, bands = signature(body)
+    if value is None:
+        return None
+
+    candidates = Post.objects.filter(simhash_bands__overlap=bands).only("id", "title", "simhash")
+    if exclude is not None:
+        candidates = candidates.exclude(pk=exclude)
+
+    best = None
+    for post in candidates:
+        distance = hamming(value, post.simhash)
+        if distance <= settings.DUPLICATE_MAX_DISTANCE and (best is None or distance < best[1]):
+            best = (post, distance)
+    return best
+
+
+def check(body):
+    """
+    Apply DUPLICATE_ACTION to a generated body before it is saved
+    Returns the post to record as duplicate_of ("flag"), raises
+    NearDuplicateError ("block"), or returns None
+    """
+    if settings.DUPLICATE_ACTION == "off":
+        return None
+
+    match = nearest(body)
+    if match is None:
+        return None
+
+    post, distance = match
+    if settings.DUPLICATE_ACTION == "block":
+        raise NearDuplicateError(post, distance)
+    logger.warning(f"Saving near-duplicate of post {post.pk} ({distance} bits apart)")
+    return post
+
+
+def clusters(max_distance=None):
+    """
+    Groups of near-duplicate post ids, each sorted oldest id first
+    Posts are bucketed by band key in memory; only posts sharing a bucket are
+    compared, and matches are merged with union-find
+    """
+    if max_distance is None:
+        max_distance = settings.DUPLICATE_MAX_DISTANCE
+
+    hashes = {}
+    buckets = defaultdict(list)
+    rows = Post.objects.exclude(simhash=None).values_list("id", "simhash", "simhash_bands")
+    for pk, value, bands in rows.iterator(chunk_size=5000):
+        hashes[pk] = value
+        for key in bands:
+            buckets[key].append(pk)
+
+    parent = {}
+
+    def find(pk):
+        root = pk
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while pk != root:
+            parent[pk], pk = root, parent.get(pk, pk)
+        return root
+
+    for ids in buckets.values():
+        for i, a in enumerate(ids):
+            for b in ids[i + 1:]:
+                if hamming(hashes[a], hashes[b]) <= max_distance:
+                    ra, rb = find(a), find(b)
+                    if ra != rb:
+                        parent[max(ra, rb)] = min(ra, rb)
+
+    groups = defaultdict(list)
+    for pk in parent:
+        groups[find(pk)].append(pk)
+    for root, members in groups.items():
+        if root not in members:
+            members.append(root)
+    return sorted(sorted(members) for members in groups.values())
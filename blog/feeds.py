@@ -0,0 +1,76 @@
+"""
+RSS and Atom feeds for the whole blog and for each category
+Items are built from post id, title and last_modified only, so no body is
+ever read; the views in blog.views cache the rendered feeds
+"""
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.urls import reverse, reverse_lazy
+from django.utils.feedgenerator import Atom1Feed
+from .models import Category, Post
+
+SITE_TITLE = "AI Powered Blog"
+
+
+def feed_items(queryset):
+    """
+    The newest posts as {id, title, last_modified} dicts
+    """
+    return list(
+        queryset
+        .order_by("-created_on", "-id")
+        .values("id", "title", "last_modified")[:settings.FEED_ITEMS]
+    )
+
+
+class LatestPostsFeed(Feed):
+    title = SITE_TITLE
+    link = reverse_lazy("blog_index")
+    description = "The newest posts on the blog"
+
+    def items(self):
+        return feed_items(Post.objects.all())
+
+    def item_title(self, item):
+        return item["title"]
+
+    def item_description(self, item):
+        # Feeds carry titles and links only
+        return None
+
+    def item_link(self, item):
+        return reverse("blog_detail", args=[item["id"]])
+
+    def item_updateddate(self, item):
+        return item["last_modified"]
+
+
+class LatestPostsAtomFeed(LatestPostsFeed):
+    feed_type = Atom1Feed
+    subtitle = LatestPostsFeed.description
+
+
+class CategoryFeed(LatestPostsFeed):
+
+    def get_object(self, request, category):
+        return get_object_or_404(Category.objects.only("id", "name", "slug"), slug=category)
+
+    def title(self, obj):
+        return f"{SITE_TITLE}: {obj.name}"
+
+    def link(self, obj):
+        return reverse("blog_category", args=[obj.slug])
+
+    def description(self, obj):
+        return f"The newest posts in {obj.name}"
+
+    def items(self, obj):
+        return feed_items(Post.objects.filter(categories=obj.pk))
+
+
+class CategoryAtomFeed(CategoryFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self.description(obj)
@@ -8,9 +8,10 @@ class PostForm(forms.ModelForm):
     """
     class Meta:
         model = Post
-        fields = ["title", "body", "categories"]
+        fields = ["title", "language", "body", "categories"]
         widgets = {
             "title": forms.TextInput(attrs={"class": "form-control"}),
+            "language": forms.Select(attrs={"class": "form-control"}),
             "body": forms.Textarea(attrs={"class": "form-control", "rows": 10}),
             "categories": forms.CheckboxSelectMultiple(),
         }
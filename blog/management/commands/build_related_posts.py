@@ -0,0 +1,44 @@
+"""
+Management command to rebuild the related-posts index from scratch
+Usage: python manage.py build_related_posts [--batch-size 500] [--if-missing] [--pending]
+
+Fits the TF-IDF vocabulary over every post, stores the post vectors and
+precomputes each post's neighbours (see blog.related). Saves after that are
+queued and applied incrementally by run_generation_worker (or --pending);
+rebuild offline now and then so new words and shifted IDF weights are picked up.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from blog import related
+from blog.models import RelatedIndex
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the TF-IDF related-posts index and every neighbour list'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows fetched/written per batch')
+        parser.add_argument('--if-missing', action='store_true', help='Do nothing if an index already exists')
+        parser.add_argument('--pending', action='store_true',
+                            help='Only apply queued updates of saved posts, without a rebuild')
+
+    def handle(self, *args, **options):
+        if options['pending']:
+            total = 0
+            while updated := related.process_pending():
+                total += updated
+            self.stdout.write(self.style.SUCCESS(f'Updated neighbours of {total} queued posts'))
+            return
+
+        if options['if_missing'] and RelatedIndex.objects.exists():
+            self.stdout.write('Related-posts index already built')
+            return
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Building related-posts index...'))
+        started = time.perf_counter()
+        posts, terms, neighbours = related.build(options['batch_size'], log=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {posts} posts over {terms} terms, {neighbours} neighbours '
+            f'in {time.perf_counter() - started:.1f}s'
+        ))
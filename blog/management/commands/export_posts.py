@@ -0,0 +1,100 @@
+"""
+Management command to export posts, categories and comments as JSONL
+Usage: python manage.py export_posts posts.jsonl [--no-comments] [--chunk-size 2000]
+
+One JSON object per line: every category first ({"type": "category"}), then
+each post ({"type": "post"}) with its category slugs, author username and
+comments embedded. Rows stream from a server-side cursor, so memory use does
+not grow with the number of posts. Read back with `manage.py import_posts`.
+"""
+import json
+import sys
+
+from django.core.management.base import BaseCommand
+from django.db.models import Prefetch
+from blog.models import Category, Comment, Post
+
+
+class Command(BaseCommand):
+    help = 'Stream posts, categories and comments to a JSONL file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Output file, or - for stdout')
+        parser.add_argument('--no-comments', action='store_true', help='Leave comments out')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched per round trip')
+
+    def handle(self, *args, **options):
+        to_stdout = options['path'] == '-'
+        out = sys.stdout if to_stdout else open(options['path'], 'w', encoding='utf-8')
+        # Keep progress messages out of the data when streaming to stdout
+        log = self.stderr if to_stdout else self.stdout
+
+        try:
+            categories = self._write_categories(out, options['chunk_size'])
+            posts, comments = self._write_posts(out, options['chunk_size'], not options['no_comments'])
+        finally:
+            if not to_stdout:
+                out.close()
+
+        log.write(self.style.SUCCESS(
+            f'Exported {categories} categories, {posts} posts and {comments} comments'
+        ))
+
+    def _write(self, out, record):
+        out.write(json.dumps(record, ensure_ascii=False))
+        out.write('\n')
+
+    def _write_categories(self, out, chunk_size):
+        count = 0
+        for name, slug in Category.objects.order_by('pk').values_list('name', 'slug').iterator(chunk_size):
+            self._write(out, {'type': 'category', 'name': name, 'slug': slug})
+            count += 1
+        return count
+
+    def _write_posts(self, out, chunk_size, with_comments):
+        posts = (
+            Post.objects
+            .select_related('author')
+            .only(
+                'title', 'body', 'language', 'created_on', 'last_modified',
+                'author__username',
+            )
+            .prefetch_related(Prefetch('categories', queryset=Category.objects.only('slug')))
+            .order_by('pk')
+        )
+        if with_comments:
+            posts = posts.prefetch_related(Prefetch(
+                'comment_set',
+                queryset=(
+                    Comment.objects.select_related('author')
+                    .only('body', 'created_on', 'post_id', 'author__username')
+                    .order_by('created_on', 'pk')
+                ),
+            ))
+
+        post_count = comment_count = 0
+        # Prefetches run once per chunk of posts
+        for post in posts.iterator(chunk_size=chunk_size):
+            record = {
+                'type': 'post',
+                'title': post.title,
+                'body': post.body,
+                'language': post.language,
+                'author': post.author.username,
+                'created_on': post.created_on.isoformat(),
+                'last_modified': post.last_modified.isoformat(),
+                'categories': [category.slug for category in post.categories.all()],
+            }
+            if with_comments:
+                record['comments'] = [
+                    {
+                        'author': comment.author.username,
+                        'body': comment.body,
+                        'created_on': comment.created_on.isoformat(),
+                    }
+                    for comment in post.comment_set.all()
+                ]
+                comment_count += len(record['comments'])
+            self._write(out, record)
+            post_count += 1
+        return post_count, comment_count
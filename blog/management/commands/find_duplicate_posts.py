@@ -0,0 +1,57 @@
+"""
+Management command to list clusters of near-duplicate posts
+Usage: python manage.py find_duplicate_posts [--max-distance 3] [--flag]
+
+Compares the stored body SimHashes (see blog.duplicates); posts saved before
+signatures existed need `python manage.py render_posts` first. With --flag,
+every post in a cluster except the oldest gets duplicate_of set to it.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from blog import duplicates
+from blog.models import Post
+from blog.rendering import RENDERER_VERSION
+
+
+class Command(BaseCommand):
+    help = 'Find clusters of near-duplicate posts from their stored SimHash'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-distance', type=int, default=None,
+                            help='Differing SimHash bits still counted as a duplicate (default: DUPLICATE_MAX_DISTANCE)')
+        parser.add_argument('--flag', action='store_true',
+                            help='Point duplicate_of at the oldest post of each cluster')
+
+    def handle(self, *args, **options):
+        stale = Post.objects.exclude(render_version=RENDERER_VERSION).count()
+        if stale:
+            self.stdout.write(self.style.WARNING(
+                f'{stale} posts have no signature yet; run render_posts to include them'
+            ))
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Looking for near-duplicate posts...'))
+        started = time.perf_counter()
+        groups = duplicates.clusters(options['max_distance'])
+        elapsed = time.perf_counter() - started
+
+        titles = dict(
+            Post.objects.filter(pk__in=[pk for group in groups for pk in group])
+            .values_list('id', 'title')
+        )
+        for number, group in enumerate(groups, start=1):
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\nCluster {number} ({len(group)} posts):'))
+            for pk in group:
+                self.stdout.write(f'  #{pk} {titles.get(pk, "")}')
+
+        flagged = 0
+        if options['flag']:
+            for oldest, *others in groups:
+                flagged += Post.objects.filter(pk__in=others).update(duplicate_of=oldest)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\nFound {len(groups)} clusters covering '
+            f'{sum(len(group) for group in groups)} posts in {elapsed:.1f}s'
+        ))
+        if flagged:
+            self.stdout.write(self.style.SUCCESS(f'Flagged {flagged} posts as duplicates'))
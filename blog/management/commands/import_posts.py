@@ -0,0 +1,244 @@
+"""
+Management command to load posts, categories and comments from JSONL
+Usage: python manage.py import_posts posts.jsonl [--batch-size 2000] [--no-copy]
+
+Reads the format written by `manage.py export_posts` line by line. Authors
+and categories are resolved through in-memory maps (missing users are
+created with unusable passwords), and posts are written in batches: with
+PostgreSQL COPY when available, otherwise with bulk_create. Counters, search
+vectors and dashboard stats are brought up to date for every batch.
+"""
+import io
+import json
+import sys
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from blog import page_cache
+from blog.categories import adjust_post_counts, count_links
+from blog.models import Category, Comment, Post
+from blog.search import refresh_search_vectors
+from dashboard.stats import rebuild as rebuild_user_stats
+
+
+def _copy_value(value):
+    """
+    A value in COPY text format
+    """
+    if value is None:
+        return r'\N'
+    if isinstance(value, (list, tuple)):
+        # Numeric arrays only (Post.simhash_bands), as an array literal
+        return '{' + ','.join(str(item) for item in value) + '}'
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('\t', '\\t')
+        .replace('\n', '\\n')
+        .replace('\r', '\\r')
+    )
+
+
+class Command(BaseCommand):
+    help = 'Load posts, categories and comments from a JSONL export'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='JSONL file from export_posts, or - for stdin')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Posts written per batch')
+        parser.add_argument('--no-copy', action='store_true', help='Use bulk_create even on PostgreSQL')
+
+    def handle(self, *args, **options):
+        self.use_copy = connection.vendor == 'postgresql' and not options['no_copy']
+        self.users = {}
+        self.categories = dict(Category.objects.values_list('slug', 'pk'))
+        self.touched_users = set()
+        self.totals = {'categories': 0, 'posts': 0, 'comments': 0}
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Importing {options['path']} ({'COPY' if self.use_copy else 'bulk_create'})..."
+        ))
+
+        source = sys.stdin if options['path'] == '-' else open(options['path'], encoding='utf-8')
+        batch = []
+        try:
+            for number, line in enumerate(source, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    raise CommandError(f'Line {number} is not valid JSON: {e}')
+
+                kind = record.get('type')
+                if kind == 'category':
+                    self._add_category(record['slug'], record.get('name'))
+                elif kind == 'post':
+                    batch.append(record)
+                    if len(batch) >= options['batch_size']:
+                        self._write_batch(batch)
+                        batch = []
+                else:
+                    raise CommandError(f'Line {number} has unknown type {kind!r}')
+            self._write_batch(batch)
+        finally:
+            if source is not sys.stdin:
+                source.close()
+
+        # Bulk writes send no signals
+        rebuild_user_stats(self.touched_users)
+        page_cache.invalidate([page_cache.NAV, page_cache.INDEX])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {self.totals['categories']} new categories, "
+            f"{self.totals['posts']} posts and {self.totals['comments']} comments"
+        ))
+        if self.totals['posts']:
+            self.stdout.write(self.style.WARNING(
+                'Run `manage.py build_related_posts` to add them to the related-posts index'
+            ))
+
+    def _add_category(self, slug, name=None):
+        if slug not in self.categories:
+            category = Category.objects.create(name=(name or slug)[:30], slug=slug)
+            self.categories[slug] = category.pk
+            self.totals['categories'] += 1
+        return self.categories[slug]
+
+    def _resolve_users(self, usernames):
+        """
+        Fill the username -> pk map, creating users that do not exist
+        """
+        missing = set(usernames) - self.users.keys()
+        if not missing:
+            return
+        self.users.update(User.objects.filter(username__in=missing).values_list('username', 'pk'))
+        new = [
+            User(username=name, password=make_password(None))
+            for name in sorted(missing - self.users.keys())
+        ]
+        for user in User.objects.bulk_create(new):
+            self.users[user.username] = user.pk
+        if new:
+            self.stdout.write(self.style.WARNING(f'+ Created {len(new)} users without passwords'))
+
+    def _timestamp(self, value, default):
+        return (parse_datetime(value) if value else None) or default
+
+    def _write_batch(self, records):
+        if not records:
+            return
+
+        self._resolve_users(
+            [r['author'] for r in records]
+            + [c['author'] for r in records for c in r.get('comments', [])]
+        )
+        now = timezone.now()
+
+        posts = []
+        for record in records:
+            created_on = self._timestamp(record.get('created_on'), now)
+            post = Post(
+                title=record['title'],
+                body=record.get('body', ''),
+                language=record.get('language') or 'en',
+                author_id=self.users[record['author']],
+                created_on=created_on,
+                last_modified=self._timestamp(record.get('last_modified'), created_on),
+                comment_count=len(record.get('comments', [])),
+            )
+            # Both write paths skip save(), so render the stored HTML here
+            post.render_body()
+            posts.append(post)
+
+        Link = Post.categories.through
+        with transaction.atomic():
+            if self.use_copy:
+                for post, pk in zip(posts, self._reserve_ids(Post, len(posts))):
+                    post.pk = pk
+                self._copy(Post, posts)
+            else:
+                times = [(p.created_on, p.last_modified) for p in posts]
+                Post.objects.bulk_create(posts)
+                # bulk_create stamps auto_now(_add) fields; restore the exported times
+                for post, (created_on, last_modified) in zip(posts, times):
+                    post.created_on, post.last_modified = created_on, last_modified
+                Post.objects.bulk_update(posts, ['created_on', 'last_modified'])
+
+            links = [
+                Link(post_id=post.pk, category_id=self._add_category(slug))
+                for post, record in zip(posts, records)
+                for slug in dict.fromkeys(record.get('categories', []))
+            ]
+            comments = [
+                Comment(
+                    post_id=post.pk,
+                    author_id=self.users[comment['author']],
+                    body=comment.get('body', ''),
+                    created_on=self._timestamp(comment.get('created_on'), now),
+                )
+                for post, record in zip(posts, records)
+                for comment in record.get('comments', [])
+            ]
+            if self.use_copy:
+                self._copy(Link, links)
+                self._copy(Comment, comments)
+            else:
+                Link.objects.bulk_create(links)
+                times = [c.created_on for c in comments]
+                Comment.objects.bulk_create(comments)
+                for comment, created_on in zip(comments, times):
+                    comment.created_on = created_on
+                Comment.objects.bulk_update(comments, ['created_on'])
+
+            adjust_post_counts(count_links([link.category_id for link in links]))
+            refresh_search_vectors(Post.objects.filter(pk__in=[p.pk for p in posts]))
+
+        self.touched_users.update(p.author_id for p in posts)
+        self.touched_users.update(
+            Post.objects.filter(pk__in={c.post_id for c in comments}).values_list('author_id', flat=True)
+        )
+        self.totals['posts'] += len(posts)
+        self.totals['comments'] += len(comments)
+        self.stdout.write(f"  {self.totals['posts']} posts...")
+
+    def _reserve_ids(self, model, count):
+        """
+        Take `count` primary keys from the table's sequence
+        """
+        table = model._meta.db_table
+        pk_column = model._meta.pk.column
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)',
+                [table, pk_column, count],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def _copy(self, model, objects):
+        """
+        Insert objects with one COPY ... FROM STDIN
+        Primary keys are included only when every object already has one
+        """
+        if not objects:
+            return
+        fields = [
+            field for field in model._meta.concrete_fields
+            if not (field.primary_key and objects[0].pk is None)
+        ]
+        buffer = io.StringIO()
+        for obj in objects:
+            buffer.write('\t'.join(
+                _copy_value(field.get_db_prep_save(getattr(obj, field.attname), connection))
+                for field in fields
+            ))
+            buffer.write('\n')
+        buffer.seek(0)
+
+        columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+        table = connection.ops.quote_name(model._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(f'COPY {table} ({columns}) FROM STDIN', buffer)
@@ -0,0 +1,18 @@
+"""
+Management command to repair the cached post count of every category
+Usage: python manage.py recount_categories
+"""
+from django.core.management.base import BaseCommand
+from blog.categories import recount_posts
+
+
+class Command(BaseCommand):
+    help = 'Recompute Category.post_count from the post/category links'
+
+    def handle(self, *args, **kwargs):
+        self.stdout.write(self.style.MIGRATE_HEADING('Recounting category posts...'))
+        drifted = recount_posts()
+
+        style = self.style.WARNING if drifted else self.style.SUCCESS
+        self.stdout.write(style(f'Categories with drifted counts: {drifted}'))
+        self.stdout.write(self.style.SUCCESS('Category counts updated'))
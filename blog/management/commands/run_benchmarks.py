@@ -0,0 +1,251 @@
+"""
+Management command to benchmark the hot pages in-process
+Usage: python manage.py run_benchmarks [--requests 200] [--compare benchmark-results/old.json]
+
+Needs data from `manage.py seed_benchmark_data`. Requests go through the full
+middleware stack via Django's test client, one at a time; the generation
+scenario talks to a local fake LLM. Everything the run writes is rolled back.
+Results (p50/p95/p99 latency, throughput, SQL queries) are saved as JSON.
+"""
+import json
+import os
+import random
+import statistics
+import subprocess
+import time
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from ai_generator.fake_upstream import FakeUpstreamHandler, start_fake_upstream
+from blog.models import Category, Comment, Post
+from .seed_benchmark_data import CATEGORY_PREFIX, USERNAME_PREFIX
+
+SCENARIOS = ["index", "category", "detail", "dashboard", "generate"]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark blog, dashboard and generation views against seeded data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Measured requests per scenario')
+        parser.add_argument('--warmup', type=int, default=10, help='Unmeasured requests per scenario')
+        parser.add_argument('--scenario', action='append', choices=SCENARIOS,
+                            help='Scenario to run (repeatable, default: all)')
+        parser.add_argument('--page-cache', action='store_true',
+                            help='Keep the anonymous page cache on (default: measure uncached pages)')
+        parser.add_argument('--llm-delay', type=float, default=0.0,
+                            help='Fake LLM delay per streamed fragment, in seconds')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for picking pages')
+        parser.add_argument('--output', help='JSON results file (default: benchmark-results/<timestamp>.json)')
+        parser.add_argument('--compare', help='Earlier results file to compare against')
+
+    def handle(self, *args, **options):
+        self.user = User.objects.filter(username=f'{USERNAME_PREFIX}0').first()
+        if self.user is None:
+            raise CommandError('No benchmark data; run `manage.py seed_benchmark_data` first')
+
+        self.rng = random.Random(options['seed'])
+        self.post_ids = list(Post.objects.filter(author__username__startswith=USERNAME_PREFIX)
+                             .values_list('pk', flat=True))
+        self.categories = list(Category.objects.filter(name__startswith=CATEGORY_PREFIX, post_count__gt=0)
+                               .values_list('pk', 'slug'))
+        if not self.post_ids or not self.categories:
+            raise CommandError('Benchmark data has no posts; reseed with --posts > 0')
+
+        scenarios = options['scenario'] or SCENARIOS
+        server, base = start_fake_upstream()
+        FakeUpstreamHandler.fragment_delay = options['llm_delay']
+        overrides = override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            PAGE_CACHE_TTL=settings.PAGE_CACHE_TTL if options['page_cache'] else 0,
+            OPENAI_API_KEY='benchmark',
+            OPENAI_BASE_URL=f'{base}/v1',
+            VALUESERP_URL=f'{base}/search',
+        )
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Benchmarking {', '.join(scenarios)} "
+            f"({options['requests']} requests each, {options['warmup']} warmup)..."
+        ))
+
+        results = {}
+        try:
+            with overrides, transaction.atomic():
+                for name in scenarios:
+                    results[name] = self._run(name, options['requests'], options['warmup'])
+                    self._print(name, results[name])
+                # Drop the comments, sessions and posts the run created
+                transaction.set_rollback(True)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        report = {
+            'created': timezone.now().isoformat(),
+            'git_commit': self._git_commit(),
+            'options': {
+                key: options[key]
+                for key in ('requests', 'warmup', 'page_cache', 'llm_delay', 'seed')
+            },
+            'dataset': {
+                'posts': Post.objects.count(),
+                'comments': Comment.objects.count(),
+                'categories': Category.objects.count(),
+                'users': User.objects.count(),
+            },
+            'scenarios': results,
+        }
+        path = options['output'] or os.path.join(
+            'benchmark-results', f"{timezone.now():%Y%m%d-%H%M%S}.json"
+        )
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'\nResults saved to {path}'))
+
+        if options['compare']:
+            self._compare(options['compare'], results)
+
+    def _requests(self, name):
+        """
+        (client, method, url, data) for one request of the scenario
+        """
+        if name == 'index':
+            return self.anonymous, 'get', reverse('blog_index'), None
+        if name == 'category':
+            _, slug = self.rng.choice(self.categories)
+            return self.anonymous, 'get', reverse('blog_category', args=[slug]), None
+        if name == 'detail':
+            pk = self.rng.choice(self.post_ids)
+            return self.anonymous, 'get', reverse('blog_detail', args=[pk]), None
+        if name == 'dashboard':
+            return self.member, 'get', reverse('dashboard'), None
+        category_id, _ = self.rng.choice(self.categories)
+        return self.member, 'post', reverse('generate_article_stream'), {
+            'keyword': f'benchmark topic {self.rng.randrange(10 ** 9)}',
+            'language': 'en',
+            'tone': 'professional',
+            'target_audience': 'developers',
+            'min_words': 800,
+            'max_words': 1200,
+            'categories': [category_id],
+            'force_fresh': 'on',
+        }
+
+    def _run(self, name, count, warmup):
+        self.anonymous = Client()
+        self.member = Client()
+        self.member.force_login(self.user)
+
+        for _ in range(warmup):
+            self._request(name)
+
+        latencies = []
+        queries = []
+        errors = 0
+        started = time.perf_counter()
+        for _ in range(count):
+            elapsed, status, sql = self._request(name)
+            latencies.append(elapsed)
+            queries.append(sql)
+            errors += status >= 400
+        wall = time.perf_counter() - started
+
+        return {
+            'requests': count,
+            'errors': errors,
+            'throughput_rps': round(count / wall, 2) if wall else None,
+            'latency_ms': self._percentiles(latencies),
+            'queries': {
+                'mean': round(statistics.fmean(queries), 2) if queries else None,
+                'max': max(queries, default=None),
+            },
+        }
+
+    def _request(self, name):
+        """
+        Time one request, reading a streamed body to the end
+        Returns (milliseconds, status, SQL queries)
+        """
+        client, method, url, data = self._requests(name)
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = getattr(client, method)(url, data)
+            if response.streaming:
+                self._consume(response)
+            elapsed = (time.perf_counter() - started) * 1000
+        return elapsed, response.status_code, len(captured)
+
+    def _consume(self, response):
+        if response.is_async:
+            async def read():
+                return [chunk async for chunk in response.streaming_content]
+            async_to_sync(read)()
+        else:
+            list(response.streaming_content)
+
+    def _percentiles(self, latencies):
+        if not latencies:
+            return {}
+        if len(latencies) > 1:
+            cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+            p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+        else:
+            p50 = p95 = p99 = latencies[0]
+        return {
+            'p50': round(p50, 2),
+            'p95': round(p95, 2),
+            'p99': round(p99, 2),
+            'mean': round(statistics.fmean(latencies), 2),
+            'max': round(max(latencies), 2),
+        }
+
+    def _print(self, name, result):
+        latency = result['latency_ms']
+        line = (
+            f"{name:<10} p50={latency.get('p50')}ms p95={latency.get('p95')}ms "
+            f"p99={latency.get('p99')}ms  {result['throughput_rps']} req/s  "
+            f"queries={result['queries']['mean']} (max {result['queries']['max']})"
+        )
+        style = self.style.ERROR if result['errors'] else self.style.SUCCESS
+        self.stdout.write(style(line + (f"  errors={result['errors']}" if result['errors'] else '')))
+
+    def _compare(self, path, results):
+        """
+        Print p95 latency and query count changes against an earlier run
+        """
+        try:
+            with open(path, encoding='utf-8') as f:
+                previous = json.load(f)['scenarios']
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f'Could not read {path}: {e}')
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\nCompared with {path}:'))
+        for name, result in results.items():
+            before = previous.get(name)
+            if not before:
+                self.stdout.write(f'{name:<10} (not in earlier run)')
+                continue
+            old_p95 = before['latency_ms'].get('p95')
+            new_p95 = result['latency_ms'].get('p95')
+            change = (new_p95 - old_p95) / old_p95 * 100 if old_p95 else 0
+            style = self.style.WARNING if change > 10 else self.style.SUCCESS
+            self.stdout.write(style(
+                f"{name:<10} p95 {old_p95}ms -> {new_p95}ms ({change:+.1f}%)  "
+                f"queries {before['queries']['mean']} -> {result['queries']['mean']}"
+            ))
+
+    def _git_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
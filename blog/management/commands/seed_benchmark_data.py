@@ -0,0 +1,187 @@
+"""
+Management command to fill the database with synthetic benchmark data
+Usage: python manage.py seed_benchmark_data [--users 50] [--posts 5000] [--comments 20000]
+
+Rows are written with bulk_create, so no signals run; the denormalized
+counters, search vectors, dashboard stats and related-posts index are
+rebuilt at the end.
+The same --seed always produces the same data.
+"""
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Now
+from blog import page_cache, related
+from blog.categories import recount_posts
+from blog.models import Category, Comment, Post, PostVector, RelatedPost
+from blog.search import refresh_search_vectors
+from dashboard.stats import rebuild as rebuild_user_stats
+
+USERNAME_PREFIX = "bench_user_"
+CATEGORY_PREFIX = "Bench "
+
+WORDS = (
+    "data model query index cache page latency python django server request "
+    "article search stream token worker queue design budget metric review "
+    "feature release backend frontend storage network deploy scale test"
+).split()
+
+
+class Command(BaseCommand):
+    help = 'Create synthetic users, categories, posts and comments for benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50, help='Authors/commenters to create')
+        parser.add_argument('--categories', type=int, default=20, help='Categories to create')
+        parser.add_argument('--posts', type=int, default=5000, help='Posts to create')
+        parser.add_argument('--comments', type=int, default=20000, help='Comments spread over the posts')
+        parser.add_argument('--categories-per-post', type=int, default=2, help='Category links per post')
+        parser.add_argument('--words', type=int, default=600, help='Average words per post body')
+        parser.add_argument('--password', default='bench', help='Password for every benchmark user')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk insert')
+        parser.add_argument('--flush', action='store_true', help='Delete earlier benchmark data first')
+
+    def handle(self, *args, **options):
+        existing = User.objects.filter(username__startswith=USERNAME_PREFIX)
+        if existing.exists():
+            if not options['flush']:
+                raise CommandError('Benchmark data already exists; use --flush to replace it')
+            self._flush(existing)
+
+        if options['users'] < 1 or options['categories'] < 1:
+            raise CommandError('At least one user and one category are required')
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Seeding {options['users']} users, {options['categories']} categories, "
+            f"{options['posts']} posts and {options['comments']} comments..."
+        ))
+
+        with transaction.atomic():
+            users = self._create_users(options['users'], options['password'])
+            categories = self._create_categories(options['categories'])
+            posts = self._create_posts(options['posts'], users, options['words'])
+            self._link_categories(posts, categories, options['categories_per_post'])
+            self._create_comments(options['comments'], posts, users)
+            self._rebuild_derived(users, posts)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(users)} users ({USERNAME_PREFIX}0 / password "
+            f"'{options['password']}'), {len(categories)} categories, "
+            f"{len(posts)} posts, {options['comments'] if posts else 0} comments"
+        ))
+
+    def _flush(self, users):
+        self.stdout.write(self.style.WARNING('Deleting earlier benchmark data...'))
+        # Raw deletes skip the per-row signals; counters are rebuilt afterwards
+        user_ids = list(users.values_list('pk', flat=True))
+        Comment.objects.filter(author_id__in=user_ids)._raw_delete('default')
+        Comment.objects.filter(post__author_id__in=user_ids)._raw_delete('default')
+        Post.categories.through.objects.filter(post__author_id__in=user_ids)._raw_delete('default')
+        RelatedPost.objects.filter(
+            Q(post__author_id__in=user_ids) | Q(related__author_id__in=user_ids)
+        )._raw_delete('default')
+        PostVector.objects.filter(post__author_id__in=user_ids)._raw_delete('default')
+        Post.objects.filter(author_id__in=user_ids)._raw_delete('default')
+        Category.objects.filter(name__startswith=CATEGORY_PREFIX).delete()
+        users.delete()
+        recount_posts()
+
+    def _words(self, count):
+        return ' '.join(self.rng.choice(WORDS) for _ in range(count))
+
+    def _create_users(self, count, password):
+        # Hashing is deliberately slow, so every user shares one hash
+        hashed = make_password(password)
+        users = [
+            User(username=f'{USERNAME_PREFIX}{i}', password=hashed)
+            for i in range(count)
+        ]
+        return User.objects.bulk_create(users, batch_size=self.batch_size)
+
+    def _create_categories(self, count):
+        categories = [
+            Category(name=f'{CATEGORY_PREFIX}{i}', slug=f'bench-{i}')
+            for i in range(count)
+        ]
+        return Category.objects.bulk_create(categories, batch_size=self.batch_size)
+
+    def _create_posts(self, count, users, words):
+        posts = []
+        for i in range(count):
+            paragraphs = [
+                self._words(self.rng.randint(words // 8, words // 4))
+                for _ in range(self.rng.randint(3, 6))
+            ]
+            post = Post(
+                title=self._words(self.rng.randint(3, 8)).capitalize(),
+                body='\n\n'.join(paragraphs),
+                author=self.rng.choice(users),
+                language=self.rng.choice(['en', 'en', 'en', 'es']),
+            )
+            # bulk_create skips save(), so render the stored HTML here
+            post.render_body()
+            posts.append(post)
+        posts = Post.objects.bulk_create(posts, batch_size=self.batch_size)
+
+        if posts:
+            # auto_now_add stamps every row alike; spread them over time so
+            # listings and cursors see a realistic ordering
+            newest = max(p.pk for p in posts)
+            Post.objects.filter(pk__in=[p.pk for p in posts]).update(
+                created_on=Now() - ExpressionWrapper(
+                    Value(timedelta(minutes=7)) * (Value(newest) - F('id')),
+                    output_field=DurationField(),
+                )
+            )
+        self.stdout.write(f'  posts: {len(posts)}')
+        return posts
+
+    def _link_categories(self, posts, categories, per_post):
+        Link = Post.categories.through
+        per_post = max(1, min(per_post, len(categories)))
+        links = [
+            Link(post_id=post.pk, category_id=category.pk)
+            for post in posts
+            for category in self.rng.sample(categories, per_post)
+        ]
+        Link.objects.bulk_create(links, batch_size=self.batch_size)
+        self.stdout.write(f'  category links: {len(links)}')
+
+    def _create_comments(self, count, posts, users):
+        if not posts:
+            return
+        comments = [
+            Comment(
+                author=self.rng.choice(users),
+                body=self._words(self.rng.randint(5, 40)).capitalize(),
+                post=self.rng.choice(posts),
+            )
+            for _ in range(count)
+        ]
+        Comment.objects.bulk_create(comments, batch_size=self.batch_size)
+        self.stdout.write(f'  comments: {len(comments)}')
+
+    def _rebuild_derived(self, users, posts):
+        """
+        Refresh what signals would have maintained for row-by-row inserts
+        """
+        post_ids = [p.pk for p in posts]
+        recount_posts()
+        counts = (
+            Comment.objects.filter(post=OuterRef('pk'))
+            .order_by().values('post').annotate(n=Count('id')).values('n')
+        )
+        Post.objects.filter(pk__in=post_ids).update(comment_count=Coalesce(Subquery(counts), 0))
+        refresh_search_vectors(Post.objects.filter(pk__in=post_ids))
+        rebuild_user_stats([u.pk for u in users])
+        related.build(self.batch_size)
+        page_cache.invalidate([page_cache.NAV, page_cache.INDEX])
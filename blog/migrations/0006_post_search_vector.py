@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-17 12:26
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_search_vectors(apps, schema_editor):
+    """
+    Build the search vector for posts created before this migration
+    """
+    from blog.search import refresh_search_vectors
+
+    Post = apps.get_model('blog', 'Post')
+    refresh_search_vectors(Post.objects.all())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_post_rendered_body'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='language',
+            field=models.CharField(choices=[('en', 'English'), ('es', 'Spanish')], default='en', max_length=2),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='post_search_vector_idx'),
+        ),
+        migrations.RunPython(
+            populate_search_vectors,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,63 @@
+from django.db import migrations, models
+from django.db.models import Count
+from django.utils.text import slugify
+
+
+def populate_slugs_and_counts(apps, schema_editor):
+    """
+    Give existing categories a unique slug and their current post count
+    """
+    Category = apps.get_model('blog', 'Category')
+    Link = apps.get_model('blog', 'Post').categories.through
+
+    counts = dict(
+        Link.objects.values_list('category_id').annotate(n=Count('id')).order_by()
+    )
+    taken = set()
+    for category in Category.objects.order_by('pk'):
+        base = slugify(category.name)[:36] or 'category'
+        slug = base
+        suffix = 2
+        while slug in taken:
+            slug = f'{base}-{suffix}'
+            suffix += 1
+        taken.add(slug)
+
+        category.slug = slug
+        category.post_count = counts.get(category.pk, 0)
+        category.save(update_fields=['slug', 'post_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_post_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='slug',
+            field=models.SlugField(max_length=40, null=True, db_index=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='post_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(
+            populate_slugs_and_counts,
+            reverse_code=migrations.RunPython.noop,
+        ),
+        migrations.AlterField(
+            model_name='category',
+            name='slug',
+            field=models.SlugField(max_length=40, unique=True),
+        ),
+        # Category pages look up (category_id -> post_id) on the join table
+        migrations.RunSQL(
+            'CREATE INDEX blog_post_categories_category_post_idx '
+            'ON blog_post_categories (category_id, post_id DESC);',
+            reverse_sql='DROP INDEX IF EXISTS blog_post_categories_category_post_idx;',
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-17 13:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0012_post_simhash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedUpdate',
+            fields=[
+                ('post_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('queued_on', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
@@ -1,11 +1,35 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.utils.safestring import mark_safe
+from django.utils.text import slugify
+from .rendering import RENDERER_VERSION, body_digest, render_markdown, signature, summarize
 # Create your models here.
 
 
 
+def unique_slug(name, queryset):
+    """
+    slugify(name), suffixed with -2, -3... if already taken in queryset
+    """
+    base = slugify(name)[:36] or "category"
+    slug = base
+    suffix = 2
+    while queryset.filter(slug=slug).exists():
+        slug = f"{base}-{suffix}"
+        suffix += 1
+    return slug
+
+
 class Category(models.Model):
     name = models.CharField(max_length=30)
+    slug = models.SlugField(max_length=40, unique=True)
+    # Maintained by blog.signals; repair with `manage.py recount_categories`
+    post_count = models.PositiveIntegerField(default=0, editable=False)
+    # Also touched when post_count changes, since every page shows the counts
+    last_modified = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name_plural = "categories"
@@ -13,24 +37,173 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        if not self.slug:
+            self.slug = unique_slug(self.name, Category.objects.exclude(pk=self.pk))
+        super().save(*args, **kwargs)
+
+# Columns render_body() fills in
+RENDERED_FIELDS = [
+    "body_html", "body_hash", "render_version", "excerpt", "word_count", "reading_time",
+    "simhash", "simhash_bands",
+]
+
+
 class Post(models.Model):
+    LANGUAGE_CHOICES = [
+        ("en", "English"),
+        ("es", "Spanish"),
+    ]
+
     title = models.CharField(max_length=255)
     body = models.TextField()
     author = models.ForeignKey(User, on_delete = models.CASCADE)
     created_on = models.DateTimeField(auto_now_add=True)
     last_modified = models.DateTimeField(auto_now=True)
     categories = models.ManyToManyField(Category, blank=False)
+    language = models.CharField(max_length=2, choices=LANGUAGE_CHOICES, default="en")
+    # Maintained by blog.signals so the detail page never counts comments
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
 
+    # Weighted title/body tsvector, maintained by save()
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    # Pre-rendered Markdown, refreshed only when body or renderer changes
+    body_html = models.TextField(blank=True, editable=False)
+    body_hash = models.CharField(max_length=64, blank=True, editable=False)
+    render_version = models.PositiveSmallIntegerField(default=0, editable=False)
+    # Derived with body_html, so listings never load the body
+    excerpt = models.TextField(blank=True, editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    reading_time = models.PositiveSmallIntegerField(default=0, editable=False)
+    # Body SimHash and its LSH band keys (blog.duplicates), None for short bodies
+    simhash = models.BigIntegerField(null=True, editable=False)
+    simhash_bands = ArrayField(models.IntegerField(), default=list, editable=False)
+    # Set when the post was saved despite being a near-duplicate
+    duplicate_of = models.ForeignKey(
+        "self", null=True, blank=True, editable=False,
+        on_delete=models.SET_NULL, related_name="near_duplicates"
+    )
+
+    class Meta:
+        indexes = [
+            # Backs keyset pagination on the listings (newest first)
+            models.Index(fields=["-created_on", "-id"], name="post_created_id_idx"),
+            # Newest edit, for the listings' conditional GET validators
+            models.Index(fields=["-last_modified"], name="post_last_modified_idx"),
+            GinIndex(fields=["search_vector"], name="post_search_vector_idx"),
+            # Candidate lookup for near-duplicates (simhash_bands && ...)
+            GinIndex(fields=["simhash_bands"], name="post_simhash_bands_idx"),
+        ]
 
     def __str__(self):
         return self.title
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "body" in update_fields:
+            if self.render_body() and update_fields is not None:
+                kwargs["update_fields"] = {
+                    *update_fields, *RENDERED_FIELDS
+                }
+        super().save(*args, **kwargs)
+
+        if update_fields is None or {"title", "body", "language"} & set(update_fields):
+            from .search import refresh_search_vectors
+            refresh_search_vectors(Post.objects.filter(pk=self.pk))
+
+    def needs_render(self):
+        """
+        True when the stored HTML is missing or out of date
+        """
+        return (
+            self.render_version != RENDERER_VERSION
+            or self.body_hash != body_digest(self.body)
+        )
+
+    def render_body(self, force=False):
+        """
+        Refresh body_html and the fields derived from it in memory if stale;
+        returns True when they changed
+        """
+        if not force and not self.needs_render():
+            return False
+        self.body_html = render_markdown(self.body)
+        self.excerpt, self.word_count, self.reading_time = summarize(self.body_html)
+        self.simhash, self.simhash_bands = signature(self.body)
+        self.body_hash = body_digest(self.body)
+        self.render_version = RENDERER_VERSION
+        return True
+
+    @property
+    def rendered_body(self):
+        """
+        Stored HTML, rendered on the fly for rows not yet backfilled
+        """
+        if self.render_version != RENDERER_VERSION:
+            return mark_safe(render_markdown(self.body))
+        return mark_safe(self.body_html)
     
 class Comment(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     body = models.TextField()
-    created_on = models.DateField(auto_now_add=True)
+    created_on = models.DateTimeField(auto_now_add=True)
     post = models.ForeignKey("Post", on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of a post's comments, newest first
+            models.Index(fields=["post", "-created_on", "-id"], name="comment_post_created_idx"),
+        ]
+
     def __str__(self):
         return f"{self.author.username} on '{self.post.title}'"
 
+
+class RelatedIndex(models.Model):
+    """
+    Vocabulary and IDF weights of the related-posts TF-IDF index
+    One row, replaced by each `manage.py build_related_posts`
+    """
+    terms = ArrayField(models.TextField())
+    idf = ArrayField(models.FloatField())
+    built_on = models.DateTimeField(auto_now_add=True)
+
+
+class PostVector(models.Model):
+    """
+    A post's L2-normalised TF-IDF vector (term ids into RelatedIndex.terms)
+    and its category ids, kept for incremental related-post updates
+    """
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True, related_name="vector")
+    terms = ArrayField(models.IntegerField())
+    weights = ArrayField(models.FloatField())
+    categories = ArrayField(models.IntegerField())
+    updated_on = models.DateTimeField(auto_now=True, db_index=True)
+
+
+class RelatedUpdate(models.Model):
+    """
+    A post whose related-post neighbours are due for an incremental update
+    Queued by saves, drained by the generation worker (blog.related)
+    """
+    post_id = models.BigIntegerField(primary_key=True)
+    queued_on = models.DateTimeField(auto_now_add=True, db_index=True)
+
+
+class RelatedPost(models.Model):
+    """
+    One precomputed neighbour of a post; the detail page reads a post's
+    rows best score first
+    """
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="related_links")
+    related = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="neighbour_of")
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["post", "related"], name="related_post_unique"),
+        ]
+        indexes = [
+            models.Index(fields=["post", "-score"], name="related_post_score_idx"),
+        ]
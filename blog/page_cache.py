@@ -0,0 +1,201 @@
+"""
+Full-page cache for anonymous readers with tag-based invalidation
+A page is stored under a key built from its URL and the current version of
+every tag it depends on. Invalidating a tag gives it a new version, so only
+the pages built from it stop matching (and later expire from the cache)
+"""
+import hashlib
+import uuid
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Q
+from django.http import HttpResponse
+from .models import Category
+
+# Every page renders the category navigation (names and post counts)
+NAV = "nav"
+INDEX = "index"
+
+
+def post_tag(pk):
+    return f"post:{pk}"
+
+
+def category_tag(slug):
+    return f"category:{slug}"
+
+
+def _cache():
+    return caches["pages"]
+
+
+def _tag_key(tag):
+    # Tags may carry URL input (category slugs), so keep keys backend-safe
+    return "tag:" + hashlib.md5(tag.encode("utf-8")).hexdigest()
+
+
+def _new_version():
+    return uuid.uuid4().hex[:12]
+
+
+def _page_key(cache, request, tags):
+    """
+    Key for this URL under the current versions of its tags
+    """
+    keys = [_tag_key(tag) for tag in tags]
+    versions = cache.get_many(keys)
+    missing = {key: _new_version() for key in keys if key not in versions}
+    if missing:
+        # Tags never expire on their own; pages do
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+
+    raw = "|".join([request.get_full_path(), *(versions[key] for key in keys)])
+    return "page:" + hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _is_cacheable(response):
+    cache_control = response.get("Cache-Control", "")
+    return (
+        response.status_code == 200
+        and not response.cookies
+        and "private" not in cache_control
+        and "no-store" not in cache_control
+    )
+
+
+def _lookup(request, tags):
+    """
+    (key, cached response) for this request; key is None when the request
+    must bypass the cache
+    """
+    if (
+        settings.PAGE_CACHE_TTL <= 0
+        or request.method not in ("GET", "HEAD")
+        or request.user.is_authenticated
+        # Pending flash messages are rendered once, so never cached
+        or len(get_messages(request))
+    ):
+        return None, None
+
+    cache = _cache()
+    key = _page_key(cache, request, [NAV, *tags])
+    stored = cache.get(key)
+    if stored is None:
+        return key, None
+
+    content, content_type = stored
+    response = HttpResponse(content, content_type=content_type)
+    response["X-Page-Cache"] = "hit"
+    return key, response
+
+
+def _set(key, content, content_type):
+    _cache().set(key, (content, content_type), settings.PAGE_CACHE_TTL)
+
+
+def _store_when_sent(key, response):
+    """
+    Pass a streamed body through, storing it once the last chunk is sent
+    A client that disconnects early leaves nothing behind
+    """
+    content = response.streaming_content
+    content_type = response["Content-Type"]
+
+    if response.is_async:
+        async def stream():
+            chunks = []
+            async for chunk in content:
+                chunks.append(chunk)
+                yield chunk
+            await sync_to_async(_set)(key, b"".join(chunks), content_type)
+    else:
+        def stream():
+            chunks = []
+            for chunk in content:
+                chunks.append(chunk)
+                yield chunk
+            _set(key, b"".join(chunks), content_type)
+    return stream()
+
+
+def _store(key, response):
+    if not _is_cacheable(response):
+        return
+    if response.streaming:
+        response.streaming_content = _store_when_sent(key, response)
+    else:
+        _set(key, response.content, response["Content-Type"])
+    response["X-Page-Cache"] = "miss"
+
+
+def cache_anonymous_page(tags):
+    """
+    Serve GET requests from anonymous users from the page cache
+
+    `tags(request, *args, **kwargs)` lists what the page is built from;
+    invalidate() on any of them drops it. Works on sync and async views.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                key, cached = await sync_to_async(_lookup)(request, tags(request, *args, **kwargs))
+                if cached is not None:
+                    return cached
+                response = await view(request, *args, **kwargs)
+                if key is not None:
+                    await sync_to_async(_store)(key, response)
+                return response
+
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            key, cached = _lookup(request, tags(request, *args, **kwargs))
+            if cached is not None:
+                return cached
+            response = view(request, *args, **kwargs)
+            if key is not None:
+                _store(key, response)
+            return response
+
+        return wrapper
+    return decorator
+
+
+def invalidate(tags):
+    """
+    Give each tag a new version, dropping every cached page that used it
+    """
+    tags = set(tags)
+    if not tags:
+        return
+
+    def bump():
+        _cache().set_many({_tag_key(tag): _new_version() for tag in tags}, timeout=None)
+
+    bump()
+    # Again after commit: a reader that ran mid-transaction may have cached
+    # the old rows under the versions set above
+    transaction.on_commit(bump)
+
+
+def post_tags(post_ids, category_ids=()):
+    """
+    Tags for pages showing these posts: their detail pages, the index and
+    every category page listing them (current links plus `category_ids`)
+    """
+    post_ids = set(post_ids)
+    slugs = (
+        Category.objects
+        .filter(Q(pk__in=category_ids) | Q(post__in=post_ids))
+        .values_list("slug", flat=True)
+        .distinct()
+    )
+    return [INDEX, *map(post_tag, post_ids), *map(category_tag, slugs)]
@@ -0,0 +1,77 @@
+"""
+Keyset (cursor) pagination helpers
+Pages are addressed by the (created_on, id) of the last row shown,
+so fetching page N costs the same as fetching page 1 (no OFFSET scan)
+"""
+import base64
+import binascii
+from datetime import datetime
+
+from django.db.models import Q
+
+
+def encode_cursor(created_on, pk):
+    """
+    Build an opaque, URL-safe cursor from a row's sort key
+    """
+    raw = f"{created_on.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Parse a cursor back into (created_on, pk)
+    Returns None for missing or malformed cursors so callers fall back to page 1
+    """
+    if not cursor:
+        return None
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        created_on, pk = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_on), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def _page_queryset(queryset, cursor, page_size, field):
+    queryset = queryset.order_by(f"-{field}", "-id")
+
+    position = decode_cursor(cursor)
+    if position is not None:
+        value, pk = position
+        queryset = queryset.filter(
+            Q(**{f"{field}__lt": value}) | Q(**{field: value, "id__lt": pk})
+        )
+
+    return queryset[:page_size + 1]
+
+
+def _split_page(rows, page_size, field):
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, field), last.pk)
+
+    return rows, next_cursor
+
+
+def keyset_page(queryset, cursor, page_size, field="created_on"):
+    """
+    Return (rows, next_cursor) for the page that starts after `cursor`
+
+    The queryset is ordered newest first on (field, id). One extra row is
+    fetched to find out whether a next page exists without a COUNT query.
+    """
+    rows = list(_page_queryset(queryset, cursor, page_size, field))
+    return _split_page(rows, page_size, field)
+
+
+async def akeyset_page(queryset, cursor, page_size, field="created_on"):
+    """
+    keyset_page for async views
+    """
+    rows = [row async for row in _page_queryset(queryset, cursor, page_size, field)]
+    return _split_page(rows, page_size, field)
@@ -0,0 +1,391 @@
+"""
+Related posts from a TF-IDF index over post titles and bodies
+`manage.py build_related_posts` fits the vocabulary and IDF weights, stores
+every post's vector (PostVector) and precomputes its top RELATED_POSTS
+neighbours (RelatedPost): cosine similarity, plus RELATED_CATEGORY_BOOST when
+two posts share a category. Afterwards saves queue their posts
+(schedule_update) and the generation worker drains the queue
+(process_pending): update_posts() scores only those posts against the stored
+vectors and merges them into the neighbour lists they now belong to, so web
+processes never load the index. Words first seen after the last rebuild are
+ignored until the next one.
+"""
+import math
+import re
+import threading
+from collections import Counter
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from scipy import sparse
+from . import page_cache
+from .models import Post, PostVector, RelatedIndex, RelatedPost, RelatedUpdate
+
+# Letters only, three or more: skips numbers and Markdown punctuation
+TOKEN = re.compile(r"[^\W\d_]{3,}")
+# Title words count as this many body words
+TITLE_WEIGHT = 3
+# Cells per block of the all-pairs similarity matrix (about 16 MB of floats)
+BLOCK_CELLS = 2_000_000
+# Vectors committed by other processes around the last sync are read again
+SYNC_SLACK = timedelta(seconds=30)
+
+STOPWORDS = frozenset("""
+    the and for are but not you all any can her was one our out has have had
+    his how its may new now old see two who did get him let say she too use
+    that with this from they will would there their what about which when
+    make like time just know take into year your some could them than then
+    look only come over also back after work first well even want because
+    these give most very been were more other such each where those being
+    should through while here both between under again further once same
+    los las una por con para como del que sus más pero este esta estos
+    estas son han ser está sin sobre entre también cuando muy todo todos
+""".split())
+
+
+def tokenize(text):
+    return [word for word in TOKEN.findall((text or "").lower()) if word not in STOPWORDS]
+
+
+def term_counts(title, body):
+    counts = Counter(tokenize(body))
+    for word in tokenize(title):
+        counts[word] += TITLE_WEIGHT
+    return counts
+
+
+def _weigh(counts, vocabulary, idf):
+    """
+    (term ids, weights): sublinear TF times IDF, L2-normalised
+    """
+    pairs = sorted(
+        (vocabulary[word], (1 + math.log(n)) * idf[vocabulary[word]])
+        for word, n in counts.items() if word in vocabulary
+    )
+    norm = math.sqrt(sum(w * w for _, w in pairs)) or 1.0
+    return [t for t, _ in pairs], [w / norm for _, w in pairs]
+
+
+def _matrix(rows, width):
+    """
+    CSR matrix from (ids, values) rows
+    """
+    indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(ids) for ids, _ in rows])
+    indices = np.fromiter((i for ids, _ in rows for i in ids), dtype=np.int32, count=indptr[-1])
+    data = np.fromiter((v for _, values in rows for v in values), dtype=np.float64, count=indptr[-1])
+    return sparse.csr_matrix((data, indices, indptr), shape=(len(rows), width))
+
+
+def _category_matrix(categories, width=1):
+    rows = [(ids, [1.0] * len(ids)) for ids in categories]
+    width = max(width, 1 + max((max(ids) for ids in categories if ids), default=0))
+    return _matrix(rows, width)
+
+
+def _widen(matrix, width):
+    if matrix.shape[1] == width:
+        return matrix
+    matrix = matrix.copy()
+    matrix.resize((matrix.shape[0], width))
+    return matrix
+
+
+def _scores(X, C, vectors, categories):
+    """
+    Dense (len(vectors) x N) scores of some posts against every indexed post
+    """
+    scores = (vectors @ X.T).toarray()
+    boost = settings.RELATED_CATEGORY_BOOST
+    if boost:
+        width = max(C.shape[1], categories.shape[1])
+        shared = _widen(categories, width) @ _widen(C, width).T
+        scores += boost * (shared.toarray() > 0)
+    return scores
+
+
+def _top(row, count, exclude):
+    """
+    (column, score) of the best `count` positive scores, best first
+    """
+    row = row.copy()
+    row[exclude] = -np.inf
+    count = min(count, len(row))
+    if not count:
+        return []
+    best = np.argpartition(-row, count - 1)[:count]
+    best = best[np.argsort(-row[best], kind="stable")]
+    return [(int(c), float(row[c])) for c in best if row[c] > 0]
+
+
+def build(batch_size=500, log=None):
+    """
+    Fit the index over every post and replace all vectors and neighbour lists
+    Returns (posts, terms, neighbour rows)
+    """
+    log = log or (lambda message: None)
+    found = {}
+    df = Counter()
+    ids, docs, categories = [], [], []
+
+    links = {}
+    for post_id, category_id in Post.categories.through.objects.values_list("post_id", "category_id").iterator():
+        links.setdefault(post_id, []).append(category_id)
+
+    started = timezone.now()
+    for post in Post.objects.only("id", "title", "body").order_by("pk").iterator(chunk_size=batch_size):
+        counts = term_counts(post.title, post.body)
+        df.update(counts.keys())
+        ids.append(post.pk)
+        docs.append(counts)
+        categories.append(sorted(links.get(post.pk, [])))
+    log(f"  tokenized {len(ids)} posts, {len(df)} distinct words")
+
+    # Keep the most widespread words; words in one post cannot link two posts
+    for word, _ in df.most_common(settings.RELATED_MAX_TERMS):
+        found[word] = len(found)
+    total = len(ids)
+    idf = [0.0] * len(found)
+    for word, term in found.items():
+        idf[term] = math.log((1 + total) / (1 + df[word])) + 1
+
+    vectors = [_weigh(counts, found, idf) for counts in docs]
+    del docs
+    X = _matrix(vectors, len(found))
+    C = _category_matrix(categories)
+
+    neighbours = []
+    step = max(1, BLOCK_CELLS // max(total, 1))
+    for start in range(0, total, step):
+        block = _scores(X, C, X[start:start + step], C[start:start + step])
+        for offset, row in enumerate(block):
+            post_id = ids[start + offset]
+            neighbours += [
+                RelatedPost(post_id=post_id, related_id=ids[column], score=score)
+                for column, score in _top(row, settings.RELATED_POSTS, start + offset)
+            ]
+    log(f"  scored {total} posts, {len(neighbours)} neighbours")
+
+    with transaction.atomic():
+        RelatedIndex.objects.all().delete()
+        PostVector.objects.all()._raw_delete("default")
+        RelatedPost.objects.all()._raw_delete("default")
+        RelatedIndex.objects.create(terms=list(found), idf=idf)
+        PostVector.objects.bulk_create(
+            [
+                PostVector(post_id=post_id, terms=terms, weights=weights, categories=cats)
+                for post_id, (terms, weights), cats in zip(ids, vectors, categories)
+            ],
+            batch_size=batch_size,
+        )
+        RelatedPost.objects.bulk_create(neighbours, batch_size=batch_size)
+        # Saves queued before the posts were read are covered by this build
+        RelatedUpdate.objects.filter(queued_on__lt=started).delete()
+        # Every detail page may have changed; NAV is part of every page key
+        page_cache.invalidate([page_cache.NAV])
+    return total, len(found), len(neighbours)
+
+
+class LoadedIndex:
+    """
+    A process's copy of the stored index, kept current by sync()
+    """
+
+    def __init__(self, stored):
+        self.version = stored.pk
+        self.vocabulary = {word: term for term, word in enumerate(stored.terms)}
+        self.idf = stored.idf
+        self.ids = []
+        self.rows = {}
+        self.X = sparse.csr_matrix((0, len(self.idf)))
+        self.C = sparse.csr_matrix((0, 1))
+        self.synced = None
+
+    def vectorize(self, post):
+        return _weigh(term_counts(post.title, post.body), self.vocabulary, self.idf)
+
+    def sync(self):
+        """
+        Read vectors written since the last sync (by any process)
+        """
+        changed = PostVector.objects.order_by("pk")
+        if self.synced is not None:
+            changed = changed.filter(updated_on__gte=self.synced - SYNC_SLACK)
+        self.synced = timezone.now()
+
+        fresh = list(changed.values_list("post_id", "terms", "weights", "categories").iterator(chunk_size=2000))
+        if fresh:
+            self.replace([(post_id, (terms, weights), cats) for post_id, terms, weights, cats in fresh])
+
+    def replace(self, entries):
+        """
+        Put (post id, (terms, weights), categories) rows in place of any old ones
+        """
+        new_ids = {post_id for post_id, _, _ in entries}
+        self.drop(new_ids)
+        X = _matrix([vector for _, vector, _ in entries], len(self.idf))
+        C = _category_matrix([cats for _, _, cats in entries], self.C.shape[1])
+        self.C.resize((self.C.shape[0], C.shape[1]))
+        self.X = sparse.vstack([self.X, X], format="csr")
+        self.C = sparse.vstack([self.C, C], format="csr")
+        for post_id, _, _ in entries:
+            self.rows[post_id] = len(self.ids)
+            self.ids.append(post_id)
+
+    def drop(self, post_ids):
+        gone = [self.rows[pk] for pk in post_ids if pk in self.rows]
+        if not gone:
+            return
+        keep = np.ones(len(self.ids), dtype=bool)
+        keep[gone] = False
+        self.X = self.X[keep]
+        self.C = self.C[keep]
+        self.ids = [pk for pk, kept in zip(self.ids, keep) if kept]
+        self.rows = {pk: row for row, pk in enumerate(self.ids)}
+
+
+_loaded = None
+_lock = threading.Lock()
+
+
+def _current_index():
+    """
+    This process's index, reloaded after a rebuild; None before the first build
+    """
+    global _loaded
+    version = RelatedIndex.objects.values_list("pk", flat=True).first()
+    if version is None:
+        return None
+    if _loaded is None or _loaded.version != version:
+        stored = RelatedIndex.objects.get(pk=version)
+        _loaded = LoadedIndex(stored)
+    _loaded.sync()
+    return _loaded
+
+
+def update_posts(post_ids):
+    """
+    Re-vectorize these posts, rewrite their neighbour lists and merge them
+    into the lists of the posts they are now close to
+    """
+    post_ids = set(post_ids)
+    if not post_ids:
+        return
+    with _lock:
+        index = _current_index()
+        if index is None:
+            return
+
+        links = {}
+        for post_id, category_id in Post.categories.through.objects.filter(
+            post_id__in=post_ids
+        ).values_list("post_id", "category_id"):
+            links.setdefault(post_id, []).append(category_id)
+        entries = [
+            (post.pk, index.vectorize(post), sorted(links.get(post.pk, [])))
+            for post in Post.objects.filter(pk__in=post_ids).only("id", "title", "body")
+        ]
+        index.drop(post_ids)
+        if not entries:
+            return
+        index.replace(entries)
+
+        rows = [index.rows[post_id] for post_id, _, _ in entries]
+        scores = _scores(index.X, index.C, index.X[rows], index.C[rows])
+        k = settings.RELATED_POSTS
+        own = {}
+        others = {}
+        for i, (post_id, _, _) in enumerate(entries):
+            own[post_id] = [(index.ids[c], score) for c, score in _top(scores[i], k, rows[i])]
+            # Posts that may now rank this one among their neighbours
+            for column, score in _top(scores[i], k * 10, rows):
+                others.setdefault(index.ids[column], {})[post_id] = score
+        # Lists holding a saved post must rescore or drop it
+        holders = (
+            RelatedPost.objects.filter(related_id__in=post_ids)
+            .exclude(post_id__in=post_ids)
+            .values_list("post_id", flat=True)
+        )
+        for other in holders:
+            others.setdefault(other, {})
+
+    _write(entries, own, others)
+
+
+def _ranked(pairs):
+    return sorted(pairs, key=lambda pair: (-pair[1], pair[0]))
+
+
+def _write(entries, own, others):
+    """
+    Store the vectors and every neighbour list that changed
+    """
+    saved = set(own)
+    current = {}
+    for post_id, related_id, score in RelatedPost.objects.filter(
+        post_id__in=list(others)
+    ).values_list("post_id", "related_id", "score"):
+        current.setdefault(post_id, []).append((related_id, score))
+
+    lists = dict(own)
+    for other, found in others.items():
+        before = _ranked(current.get(other, []))
+        merged = [(r, s) for r, s in before if r not in saved] + list(found.items())
+        merged = _ranked(merged)[:settings.RELATED_POSTS]
+        if merged != before:
+            lists[other] = merged
+
+    # Skip posts deleted since this process indexed them
+    referenced = set(lists) | {r for found in lists.values() for r, _ in found}
+    alive = set(Post.objects.filter(pk__in=referenced).values_list("pk", flat=True))
+    lists = {
+        pk: [(r, s) for r, s in found if r in alive]
+        for pk, found in lists.items() if pk in alive
+    }
+
+    with transaction.atomic():
+        PostVector.objects.filter(post_id__in=saved).delete()
+        PostVector.objects.bulk_create([
+            PostVector(post_id=post_id, terms=terms, weights=weights, categories=cats)
+            for post_id, (terms, weights), cats in entries if post_id in alive
+        ])
+        RelatedPost.objects.filter(post_id__in=list(lists)).delete()
+        RelatedPost.objects.bulk_create([
+            RelatedPost(post_id=pk, related_id=r, score=s)
+            for pk, found in lists.items() for r, s in found
+        ])
+        page_cache.invalidate(map(page_cache.post_tag, lists))
+
+
+def schedule_update(post_ids):
+    """
+    Queue these posts for process_pending(); part of the caller's transaction
+    """
+    RelatedUpdate.objects.bulk_create(
+        [RelatedUpdate(post_id=post_id) for post_id in set(post_ids)],
+        ignore_conflicts=True,
+    )
+
+
+def process_pending(limit=None):
+    """
+    Update up to `limit` queued posts, oldest first; returns how many
+    SKIP LOCKED lets several workers drain the queue; a failed update rolls
+    back, leaving its posts queued for the next pass
+    """
+    limit = limit or settings.RELATED_UPDATE_BATCH
+    with transaction.atomic():
+        post_ids = list(
+            RelatedUpdate.objects
+            .select_for_update(skip_locked=True)
+            .order_by("queued_on")
+            .values_list("post_id", flat=True)[:limit]
+        )
+        if not post_ids:
+            return 0
+        RelatedUpdate.objects.filter(post_id__in=post_ids).delete()
+        update_posts(post_ids)
+    return len(post_ids)
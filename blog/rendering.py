@@ -0,0 +1,105 @@
+"""
+Markdown rendering for post bodies
+Rendered HTML (and the excerpt and word count derived from it) is stored on
+Post so pages never run Markdown per request or read bodies for listings,
+together with the body's SimHash for near-duplicate lookups (blog.duplicates)
+"""
+import hashlib
+import math
+import re
+from collections import Counter
+from html import unescape
+
+import markdown as md
+import numpy as np
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+# Bump whenever MARKDOWN_EXTENSIONS (or their config), summarize() or
+# signature() change,
+# then run:
+#   python manage.py render_posts
+RENDERER_VERSION = 3
+MARKDOWN_EXTENSIONS = ["extra", "nl2br"]
+
+EXCERPT_LENGTH = 400
+WORDS_PER_MINUTE = 200
+
+WORD = re.compile(r"[^\W_]+")
+# Words per shingle, and the fewest shingles worth a signature
+SHINGLE_SIZE = 3
+MIN_SHINGLES = 20
+# 64-bit SimHash split into 4 bands of 16 bits: two signatures at most
+# 3 bits apart always share a band
+SIMHASH_BANDS = 4
+BAND_BITS = 16
+
+
+def render_markdown(text):
+    """
+    Convert markdown text to HTML with the site-wide extension set
+    """
+    return md.markdown(text or "", extensions=MARKDOWN_EXTENSIONS)
+
+
+def body_digest(text):
+    """
+    SHA-256 of the source body, used to detect edits that need a re-render
+    """
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def summarize(html):
+    """
+    (excerpt, word count, reading minutes) of rendered HTML
+    The excerpt is plain text cut at a word boundary
+    """
+    text = " ".join(unescape(strip_tags(html)).split())
+    words = len(text.split())
+    minutes = math.ceil(words / WORDS_PER_MINUTE)
+    return Truncator(text).chars(EXCERPT_LENGTH), words, minutes
+
+
+def _to_signed(value):
+    # Stored in a bigint column
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def signature(text):
+    """
+    (SimHash, band keys) of a body's word shingles, or (None, []) for text
+    too short to compare
+    Band keys carry their band number, so equal keys mean the same bits in
+    the same position
+    """
+    words = WORD.findall((text or "").lower())
+    shingles = Counter(
+        " ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)
+    )
+    if len(shingles) < MIN_SHINGLES:
+        return None, []
+
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+         for s in shingles),
+        dtype=np.uint64, count=len(shingles),
+    )
+    weights = np.fromiter(shingles.values(), dtype=np.int64, count=len(shingles))
+    bits = (hashes[:, None] >> np.arange(64, dtype=np.uint64)) & np.uint64(1)
+    # Each shingle votes +weight for its set bits and -weight for the others
+    totals = weights @ (bits.astype(np.int64) * 2 - 1)
+    value = sum(1 << int(i) for i in np.flatnonzero(totals > 0))
+
+    mask = (1 << BAND_BITS) - 1
+    bands = [
+        band << BAND_BITS | (value >> band * BAND_BITS) & mask
+        for band in range(SIMHASH_BANDS)
+    ]
+    return _to_signed(value), bands
+
+
+def hamming(a, b):
+    """
+    Number of differing bits between two stored signatures
+    """
+    return ((a ^ b) & ((1 << 64) - 1)).bit_count()
@@ -0,0 +1,118 @@
+"""
+PostgreSQL full-text search over posts
+Each post stores a weighted title (A) / body (B) tsvector built with the
+text search config of its own language, covered by a GIN index
+"""
+from django.contrib.postgres.search import (
+    SearchHeadline,
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+)
+from django.db.models import Case, F, Q, Value, When
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+# Post.language -> PostgreSQL text search configuration
+SEARCH_CONFIGS = {
+    "en": "english",
+    "es": "spanish",
+}
+DEFAULT_SEARCH_CONFIG = "english"
+
+# Control characters never appear in post text, so they are safe highlight markers
+_START_SEL = "\x02"
+_STOP_SEL = "\x03"
+
+
+def _per_language(build):
+    """
+    Build a CASE over Post.language, calling build(config) for each language
+    """
+    return Case(
+        *[
+            When(language=lang, then=build(config))
+            for lang, config in SEARCH_CONFIGS.items()
+        ],
+        default=build(DEFAULT_SEARCH_CONFIG),
+    )
+
+
+def search_vector_expression():
+    """
+    Weighted title/body vector using the config of each row's language
+    """
+    config = _per_language(Value)
+    return (
+        SearchVector("title", weight="A", config=config)
+        + SearchVector("body", weight="B", config=config)
+    )
+
+
+def refresh_search_vectors(queryset):
+    """
+    Recompute the stored vector for every post in the queryset (one UPDATE)
+    """
+    return queryset.update(search_vector=search_vector_expression())
+
+
+def _query(text, config):
+    return SearchQuery(text, config=config, search_type="websearch")
+
+
+def search_posts(queryset, text, language=None):
+    """
+    Filter and rank posts matching `text`, best matches first
+
+    Each language is matched with a query parsed by its own config, so
+    stemming is consistent between the stored vector and the search terms.
+    """
+    languages = [language] if language in SEARCH_CONFIGS else list(SEARCH_CONFIGS)
+
+    match = Q()
+    for lang in languages:
+        match |= Q(
+            language=lang,
+            search_vector=_query(text, SEARCH_CONFIGS[lang]),
+        )
+
+    return (
+        queryset
+        .filter(match)
+        .annotate(
+            rank=_per_language(
+                lambda config: SearchRank(F("search_vector"), _query(text, config))
+            )
+        )
+        .order_by("-rank", "-created_on", "-id")
+    )
+
+
+def with_headlines(queryset, text):
+    """
+    Annotate a body snippet with the matched terms marked
+    Only apply this to a single page of results: ts_headline is expensive
+    """
+    return queryset.annotate(
+        headline=_per_language(
+            lambda config: SearchHeadline(
+                "body",
+                _query(text, config),
+                config=config,
+                start_sel=_START_SEL,
+                stop_sel=_STOP_SEL,
+                max_words=35,
+                min_words=15,
+                max_fragments=2,
+            )
+        )
+    )
+
+
+def highlight(headline):
+    """
+    Escape a headline and turn the match markers into <mark> tags
+    """
+    html = escape(headline or "")
+    html = html.replace(_START_SEL, "<mark>").replace(_STOP_SEL, "</mark>")
+    return mark_safe(html)
@@ -0,0 +1,128 @@
+"""
+Signal handlers that keep denormalized data in step:
+Category.post_count with post category links, Post.comment_count with
+comments, related-post neighbours with post text and categories, and the
+anonymous page cache with everything it renders
+"""
+from django.db.models import F
+from django.db.models.functions import Greatest, Now
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from . import page_cache, related
+from .categories import adjust_post_counts, count_links
+from .models import Category, Comment, Post
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    page_cache.invalidate(page_cache.post_tags([instance.pk]))
+    # New posts are indexed once their categories are linked (m2m_changed)
+    if not created and (update_fields is None or {"title", "body"} & set(update_fields)):
+        related.schedule_update([instance.pk])
+
+
+@receiver(pre_delete, sender=Post)
+def remember_categories(sender, instance, **kwargs):
+    # Join rows cascade away without an m2m_changed signal
+    instance._category_ids = list(
+        sender.categories.through.objects
+        .filter(post_id=instance.pk)
+        .values_list("category_id", flat=True)
+    )
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    category_ids = getattr(instance, "_category_ids", [])
+    adjust_post_counts(count_links(category_ids, -1))
+    page_cache.invalidate([
+        page_cache.NAV, *page_cache.post_tags([instance.pk], category_ids)
+    ])
+
+
+@receiver(m2m_changed, sender=Post.categories.through)
+def categories_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ("pre_clear", "pre_remove"):
+        # pk_set is None for clear() and may list unlinked ids for remove(),
+        # so remember the links that are actually about to go
+        links = sender.objects.filter(
+            **{"category_id" if reverse else "post_id": instance.pk}
+        )
+        if pk_set is not None:
+            links = links.filter(**{"post_id__in" if reverse else "category_id__in": pk_set})
+        instance._removed_links = list(links.values_list("post_id", "category_id"))
+        return
+
+    if action in ("post_clear", "post_remove"):
+        links = getattr(instance, "_removed_links", [])
+        adjust_post_counts(count_links([category_id for _, category_id in links], -1))
+    elif action == "post_add" and pk_set:
+        # Django only reports ids that were not linked yet
+        if reverse:
+            # instance is a Category and pk_set holds the newly linked posts
+            links = [(post_id, instance.pk) for post_id in pk_set]
+            adjust_post_counts({instance.pk: len(pk_set)})
+        else:
+            links = [(instance.pk, category_id) for category_id in pk_set]
+            adjust_post_counts(count_links(pk_set))
+    else:
+        return
+
+    if links:
+        # Category boosts in the related-post scores changed
+        related.schedule_update({post_id for post_id, _ in links})
+        # Post counts in the navigation changed as well
+        page_cache.invalidate([
+            page_cache.NAV,
+            *page_cache.post_tags(
+                [post_id for post_id, _ in links],
+                [category_id for _, category_id in links],
+            ),
+        ])
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        Post.objects.filter(pk=instance.post_id).update(comment_count=F("comment_count") + 1)
+    elif not raw:
+        # An edit changes neither the count nor the newest comment, so mark
+        # the post as changed for its ETag
+        Post.objects.filter(pk=instance.post_id).update(last_modified=Now())
+    page_cache.invalidate([page_cache.post_tag(instance.post_id)])
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    # A deletion leaves no newer timestamp behind, so mark the post as changed
+    Post.objects.filter(pk=instance.post_id).update(
+        comment_count=Greatest(F("comment_count") - 1, 0),
+        last_modified=Now(),
+    )
+    page_cache.invalidate([page_cache.post_tag(instance.post_id)])
+
+
+@receiver(pre_save, sender=Category)
+def remember_slug(sender, instance, raw=False, **kwargs):
+    # A renamed slug leaves the old category URL cached otherwise
+    instance._old_slug = None
+    if instance.pk and not raw:
+        instance._old_slug = (
+            Category.objects.filter(pk=instance.pk).values_list("slug", flat=True).first()
+        )
+
+
+@receiver(post_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    # The navigation changed, but no remaining row carries a newer timestamp
+    Category.objects.update(last_modified=Now())
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_changed(sender, instance, **kwargs):
+    # Category names appear in the navigation and post listings on every page
+    slugs = {instance.slug, getattr(instance, "_old_slug", None)} - {None}
+    page_cache.invalidate([page_cache.NAV, *map(page_cache.category_tag, slugs)])
@@ -0,0 +1,109 @@
+"""
+Sitemap index and pages, written as streams of XML (sync generators, see
+simple_blog_ai.streaming)
+Posts are split into pages by id range (SITEMAP_PAGE_SIZE ids per page), so a
+page is one indexed range scan over id and last_modified, with no OFFSET and
+no COUNT. Ranges emptied by deletions simply drop out of the index.
+"""
+from django.conf import settings
+from django.db.models import F, IntegerField, Max
+from django.db.models.functions import Cast
+from django.urls import reverse
+from django.utils.html import escape
+from .models import Category, Post
+
+HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n'
+NAMESPACE = "http://www.sitemaps.org/schemas/sitemap/0.9"
+# Rows fetched per round trip from the server-side cursor
+CHUNK_SIZE = 2000
+
+
+def _lastmod(value):
+    return value.isoformat(timespec="seconds") if value else None
+
+
+def _entry(tag, location, lastmod):
+    lastmod = f"<lastmod>{lastmod}</lastmod>" if lastmod else ""
+    return f"<{tag}><loc>{escape(location)}</loc>{lastmod}</{tag}>\n"
+
+
+def post_page_range(page):
+    """
+    (first id, last id) covered by a post sitemap page, counting from 1
+    """
+    size = settings.SITEMAP_PAGE_SIZE
+    return (page - 1) * size + 1, page * size
+
+
+def index_entries(request):
+    """
+    <sitemapindex>: the category sitemap, then one entry per non-empty post page
+    """
+    yield HEADER + f'<sitemapindex xmlns="{NAMESPACE}">\n'
+
+    changed = Category.objects.aggregate(changed=Max("last_modified"))
+    yield _entry(
+        "sitemap",
+        request.build_absolute_uri(reverse("sitemap_categories")),
+        _lastmod(changed["changed"]),
+    )
+
+    # Integer division buckets ids into pages; one aggregate row per page
+    pages = (
+        Post.objects
+        .annotate(page=Cast((F("id") - 1) / settings.SITEMAP_PAGE_SIZE, IntegerField()) + 1)
+        .values("page")
+        .annotate(changed=Max("last_modified"))
+        .order_by("page")
+    )
+    for row in pages.iterator(chunk_size=CHUNK_SIZE):
+        yield _entry(
+            "sitemap",
+            request.build_absolute_uri(reverse("sitemap_posts", args=[row["page"]])),
+            _lastmod(row["changed"]),
+        )
+    yield "</sitemapindex>\n"
+
+
+def _urlset(request, rows):
+    yield HEADER + f'<urlset xmlns="{NAMESPACE}">\n'
+    for path, changed in rows:
+        yield _entry("url", request.build_absolute_uri(path), _lastmod(changed))
+    yield "</urlset>\n"
+
+
+def post_entries(request, page):
+    """
+    <urlset> for the posts in one id range, streamed from a server-side cursor
+    """
+    first, last = post_page_range(page)
+    rows = (
+        Post.objects
+        .filter(id__gte=first, id__lte=last)
+        .order_by("id")
+        .values_list("id", "last_modified")
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    paths = ((reverse("blog_detail", args=[pk]), changed) for pk, changed in rows)
+    yield from _urlset(request, paths)
+
+
+def category_entries(request):
+    """
+    <urlset> for the home page and every category with posts
+    """
+    newest = Post.objects.aggregate(changed=Max("last_modified"))
+    rows = (
+        Category.objects
+        .filter(post_count__gt=0)
+        .order_by("slug")
+        .values_list("slug", "last_modified")
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+    def paths():
+        yield reverse("blog_index"), newest["changed"]
+        for slug, changed in rows:
+            yield reverse("blog_category", args=[slug]), changed
+
+    yield from _urlset(request, paths())
@@ -1,6 +1,6 @@
 from django import template
 from django.utils.safestring import mark_safe
-import markdown as md
+from blog.rendering import render_markdown
 
 register = template.Library()
 
@@ -10,4 +10,4 @@ def markdown_format(text):
     """
     Convert markdown text to HTML
     """
-    return mark_safe(md.markdown(text, extensions=['extra', 'nl2br']))
+    return mark_safe(render_markdown(text))
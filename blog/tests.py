@@ -1,3 +1,959 @@
-from django.test import TestCase
+import io
+import json
+import os
+import random
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from simple_blog_ai import request_timing
+
+from . import duplicates, related
+from .categories import recount_posts
+from .models import Category, Comment, Post, RelatedUpdate
+from .rendering import RENDERER_VERSION, render_markdown
+
+
+class CategoryPageTests(TestCase):
+
+    def setUp(self):
+        self.author = User.objects.create_user("author")
+        self.data = Category.objects.create(name="Data")
+        self.data_science = Category.objects.get(name="Data Science")
+
+    def create_post(self, title, *categories):
+        post = Post.objects.create(title=title, body="Body", author=self.author)
+        post.categories.set(categories)
+        return post
+
+    def test_slug_matches_exactly(self):
+        self.create_post("Only data", self.data)
+        self.create_post("Science", self.data_science)
+
+        response = self.client.get(reverse("blog_category", args=["data"]))
+
+        self.assertEqual([p.title for p in response.context["posts"]], ["Only data"])
+        self.assertEqual(response.context["category"], self.data)
+
+    def test_legacy_name_links_redirect_to_slug(self):
+        response = self.client.get("/category/Data Science")
+        self.assertRedirects(
+            response, reverse("blog_category", args=["data-science"]),
+            status_code=301,
+        )
+
+    def test_unknown_category_is_404(self):
+        response = self.client.get(reverse("blog_category", args=["nope"]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_slugs_are_unique(self):
+        clash = Category.objects.create(name="data")
+        self.assertEqual(clash.slug, "data-2")
+
+
+@override_settings(BLOG_PAGE_SIZE=2, PAGE_CACHE_TTL=0)
+class ListingPaginationTests(TestCase):
+
+    def setUp(self):
+        self.author = User.objects.create_user("author")
+        self.tech = Category.objects.create(name="Tech")
+        self.posts = []
+        for number in range(5):
+            post = Post.objects.create(title=f"Post {number}", body="Body", author=self.author)
+            post.categories.set([self.tech])
+            self.posts.append(post)
+
+    def walk(self, url):
+        """
+        Follow the next-page cursors; returns the titles of each page
+        """
+        pages = []
+        response = self.client.get(url)
+        while True:
+            pages.append([p.title for p in response.context["posts"]])
+            cursor = response.context["next_cursor"]
+            if cursor is None:
+                return pages, response
+            response = self.client.get(url, {"cursor": cursor})
+
+    def test_pages_have_no_overlap_or_gap(self):
+        for url in [reverse("blog_index"), reverse("blog_category", args=["tech"])]:
+            pages, _ = self.walk(url)
+            self.assertEqual(
+                pages, [["Post 4", "Post 3"], ["Post 2", "Post 1"], ["Post 0"]], url
+            )
+
+    def test_equal_timestamps_split_across_pages_by_id(self):
+        Post.objects.update(created_on=self.posts[0].created_on)
+
+        pages, _ = self.walk(reverse("blog_index"))
+
+        self.assertEqual(pages, [["Post 4", "Post 3"], ["Post 2", "Post 1"], ["Post 0"]])
+
+    def test_malformed_cursor_falls_back_to_the_first_page(self):
+        for cursor in ["garbage", "%%%", "bm90LWEtY3Vyc29y"]:
+            response = self.client.get(reverse("blog_index"), {"cursor": cursor})
+            self.assertEqual(response.status_code, 200, cursor)
+            self.assertEqual([p.title for p in response.context["posts"]], ["Post 4", "Post 3"])
+
+    def test_last_page_has_no_next_link(self):
+        _, last = self.walk(reverse("blog_index"))
+
+        self.assertNotContains(last, "Older posts")
+        self.assertContains(last, "Newest")
+
+    def test_categories_load_in_a_fixed_number_of_queries(self):
+        # Two validator lookups, the page, its categories and the nav categories
+        with self.assertNumQueries(5):
+            self.client.get(reverse("blog_index"))
+
+        for post in self.posts:
+            post.categories.add(Category.objects.create(name=f"Extra {post.pk}"))
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse("blog_index"))
+        self.assertContains(response, "Extra")
+
+
+class CategoryPostCountTests(TestCase):
+
+    def setUp(self):
+        self.author = User.objects.create_user("author")
+        self.tech = Category.objects.create(name="Tech")
+        self.news = Category.objects.create(name="News")
+
+    def assert_counts(self, tech, news):
+        self.tech.refresh_from_db()
+        self.news.refresh_from_db()
+        self.assertEqual((self.tech.post_count, self.news.post_count), (tech, news))
+        # Incremental counts must agree with a full recount
+        self.assertEqual(recount_posts(), 0)
+
+    def test_counts_follow_category_changes(self):
+        first = Post.objects.create(title="1", body="b", author=self.author)
+        second = Post.objects.create(title="2", body="b", author=self.author)
+
+        first.categories.set([self.tech, self.news])
+        second.categories.add(self.tech)
+        self.assert_counts(2, 1)
+
+        first.categories.set([self.news])
+        self.assert_counts(1, 1)
+
+        first.categories.remove(self.tech)
+        self.assert_counts(1, 1)
+
+        self.news.post_set.add(second)
+        self.assert_counts(1, 2)
+
+        second.categories.clear()
+        self.assert_counts(0, 1)
+
+        first.delete()
+        self.assert_counts(0, 0)
+
+    def test_recount_repairs_drift(self):
+        post = Post.objects.create(title="1", body="b", author=self.author)
+        post.categories.add(self.tech)
+        Category.objects.filter(pk=self.tech.pk).update(post_count=7)
+
+        self.assertEqual(recount_posts(), 1)
+        self.assert_counts(1, 0)
+
+
+@override_settings(PAGE_CACHE_TTL=0)
+class StoredSummaryTests(TestCase):
+
+    def setUp(self):
+        self.author = User.objects.create_user("author")
+        self.post = Post.objects.create(
+            title="Long", body="# Heading\n\n" + "**word** " * 450, author=self.author,
+        )
+        self.post.categories.set([Category.objects.create(name="Tech")])
+
+    def test_summary_is_computed_on_save(self):
+        self.assertEqual(self.post.word_count, 451)
+        self.assertEqual(self.post.reading_time, 3)
+        self.assertTrue(self.post.excerpt.startswith("Heading word word"))
+        self.assertNotIn("**", self.post.excerpt)
+        self.assertLessEqual(len(self.post.excerpt), 400)
+
+        self.post.body = "Short *edit*"
+        self.post.save(update_fields=["body"])
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.excerpt, self.post.word_count, self.post.reading_time), ("Short edit", 2, 1))
+
+    def test_listings_never_select_the_body(self):
+        self.client.force_login(self.author)
+        for url in [reverse("blog_index"), reverse("blog_category", args=["tech"]), reverse("dashboard")]:
+            with CaptureQueriesContext(connection) as captured:
+                response = self.client.get(url)
+            self.assertContains(response, "Long")
+            for query in captured:
+                self.assertNotIn('"blog_post"."body"', query["sql"], url)
+
+    def test_render_posts_backfills_old_rows(self):
+        Post.objects.update(render_version=1, excerpt="", word_count=0, reading_time=0)
+        call_command("render_posts", stdout=io.StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.word_count, self.post.reading_time), (451, 3))
+        self.assertTrue(self.post.excerpt)
+
+
+@override_settings(PAGE_CACHE_TTL=0)
+class StoredHtmlTests(TestCase):
+
+    def setUp(self):
+        self.author = User.objects.create_user("author")
+        self.post = Post.objects.create(title="Post", body="Some **bold** text", author=self.author)
+        self.post.categories.set([Category.objects.create(name="Tech")])
+
+    def rendered_on_save(self, **changes):
+        for field, value in changes.items():
+            setattr(self.post, field, value)
+        with mock.patch("blog.models.render_markdown", wraps=render_markdown) as render:
+            self.post.save()
+        return render.call_count
+
+    def test_save_renders_only_when_body_or_renderer_changes(self):
+        self.assertEqual(self.post.body_html, "<p>Some <strong>bold</strong> text</p>")
+
+        self.assertEqual(self.rendered_on_save(title="Renamed"), 0)
+        self.assertEqual(self.rendered_on_save(body="Some *new* text"), 1)
+        self.assertIn("<em>new</em>", self.post.body_html)
+
+        with mock.patch("blog.models.RENDERER_VERSION", RENDERER_VERSION + 1):
+            self.assertEqual(self.rendered_on_save(), 1)
+        self.assertEqual(self.post.render_version, RENDERER_VERSION + 1)
+
+    def test_render_posts_modes(self):
+        other = Post.objects.create(title="Other", body="Other body", author=self.author)
+        # An old renderer version, and a body changed behind the model's back
+        Post.objects.filter(pk=self.post.pk).update(render_version=1, body_html="")
+        Post.objects.filter(pk=other.pk).update(body="Edited *body*")
+
+        for options, rerendered in [((), 1), (("--all",), 1), (("--force",), 2)]:
+            with self.subTest(options=options):
+                out = io.StringIO()
+                call_command("render_posts", *options, stdout=out)
+                self.assertIn(f"Posts re-rendered: {rerendered}", out.getvalue())
+
+        self.post.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.post.render_version, RENDERER_VERSION)
+        self.assertEqual(self.post.body_html, "<p>Some <strong>bold</strong> text</p>")
+        self.assertEqual(other.body_html, "<p>Edited <em>body</em></p>")
+
+    def test_detail_page_serves_the_stored_html(self):
+        Post.objects.filter(pk=self.post.pk).update(body_html="<p>Stored copy</p>")
+
+        with mock.patch("blog.models.render_markdown") as render:
+            response = self.client.get(reverse("blog_detail", args=[self.post.pk]))
+
+        self.assertContains(response, "<p>Stored copy</p>", html=True)
+        render.assert_not_called()
+
+
+class SearchTests(TestCase):
+
+    def setUp(self):
+        self.author = User.objects.create_user("author")
+
+    def create_post(self, title, body="Body", language="en"):
+        return Post.objects.create(title=title, body=body, author=self.author, language=language)
+
+    def search(self, **params):
+        return self.client.get(reverse("blog_search"), params)
+
+    def test_title_matches_rank_above_body_matches(self):
+        self.create_post("Tomatoes", "A short note.")
+        self.create_post("Gardening notes", "Tomatoes need plenty of sun.")
+        self.create_post("Unrelated", "Nothing to see here.")
+
+        response = self.search(q="tomatoes")
+
+        self.assertEqual([p.title for p in response.context["posts"]], ["Tomatoes", "Gardening notes"])
+        self.assertContains(response, "<mark>Tomatoes</mark>")
+
+    def test_each_language_uses_its_own_stemming(self):
+        self.create_post("Canciones", "Estamos cantando en el coro.", language="es")
+        self.create_post("Songs", "We keep running every morning.")
+
+        self.assertEqual([p.title for p in self.search(q="cantar").context["posts"]], ["Canciones"])
+        self.assertEqual([p.title for p in self.search(q="runs").context["posts"]], ["Songs"])
+        # English stemming does not reduce the Spanish verb
+        self.assertEqual(list(self.search(q="cantar", lang="en").context["posts"]), [])
+
+    def test_language_filter(self):
+        self.create_post("Python en español", "Python", language="es")
+        self.create_post("Python in English", "Python")
+
+        response = self.search(q="python", lang="es")
+
+        self.assertEqual([p.title for p in response.context["posts"]], ["Python en español"])
+
+    @override_settings(BLOG_PAGE_SIZE=2)
+    def test_ranked_results_are_paginated(self):
+        for number in range(5):
+            self.create_post(f"Django {number}")
+
+        first = self.search(q="django")
+        self.assertEqual(len(first.context["posts"]), 2)
+        self.assertEqual((first.context["previous_page"], first.context["next_page"]), (None, 2))
+
+        last = self.search(q="django", page=3)
+        self.assertEqual(len(last.context["posts"]), 1)
+        self.assertEqual((last.context["previous_page"], last.context["next_page"]), (2, None))
+
+        seen = [
+            post.pk for page in (1, 2, 3)
+            for post in self.search(q="django", page=page).context["posts"]
+        ]
+        self.assertEqual(len(set(seen)), 5)
+
+    def test_empty_query_runs_no_search(self):
+        self.create_post("Django")
+
+        # Only the nav categories
+        with self.assertNumQueries(1):
+            response = self.search(q="  ")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["posts"], [])
+        self.assertIsNone(response.context["next_page"])
+        self.assertNotContains(response, "No posts match")
+
+    def test_admin_search_is_ranked_with_snippets(self):
+        admin = User.objects.create_superuser("admin", password="secret")
+        self.client.force_login(admin)
+        # Newest first would be the wrong order here
+        self.create_post("Tomatoes", "Tomatoes, tomatoes everywhere.")
+        self.create_post("Gardening notes", "Tomatoes need plenty of sun.")
+        self.create_post("Unrelated", "Nothing to see here.")
+
+        response = self.client.get(reverse("admin:blog_post_changelist"), {"q": "tomatoes"})
+
+        results = list(response.context["cl"].result_list)
+        self.assertEqual([p.title for p in results], ["Tomatoes", "Gardening notes"])
+        self.assertContains(response, "<mark>Tomatoes</mark>")
+
+
+@override_settings(BLOG_COMMENTS_PAGE_SIZE=2, PAGE_CACHE_TTL=0)
+class PostDetailTests(TestCase):
+
+    def setUp(self):
+        self.author = User.objects.create_user("author")
+        self.post = Post.objects.create(title="Post", body="Body", author=self.author)
+        self.post.categories.set([Category.objects.create(name="Tech")])
+
+    def add_comments(self, count):
+        for number in range(count):
+            reader = User.objects.get_or_create(username=f"reader{number}")[0]
+            Comment.objects.create(author=reader, body=f"Comment {number}", post=self.post)
+
+    def test_missing_post_is_404(self):
+        response = self.client.get(reverse("blog_detail", args=[self.post.pk + 1]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_query_count_does_not_grow_with_comments(self):
+        self.add_comments(2)
+        # Two validator lookups, then post + author, its categories,
+        # related posts, comments + authors and the nav categories
+        with self.assertNumQueries(7):
+            self.client.get(reverse("blog_detail", args=[self.post.pk]))
+
+        self.add_comments(5)
+        with self.assertNumQueries(7):
+            self.client.get(reverse("blog_detail", args=[self.post.pk]))
+
+    def test_comments_are_paginated_newest_first(self):
+        self.add_comments(3)
+        url = reverse("blog_detail", args=[self.post.pk])
+
+        first = self.client.get(url)
+        self.assertEqual([c.body for c in first.context["comments"]], ["Comment 2", "Comment 1"])
+        self.assertContains(first, "Comments (3)")
+
+        cursor = first.context["next_comments_cursor"]
+        second = self.client.get(url, {"comments": cursor})
+        self.assertEqual([c.body for c in second.context["comments"]], ["Comment 0"])
+        self.assertIsNone(second.context["next_comments_cursor"])
+
+    async def test_pages_render_under_asgi(self):
+        for url in [
+            reverse("blog_index"),
+            reverse("blog_category", args=["tech"]),
+            reverse("blog_detail", args=[self.post.pk]),
+            reverse("blog_search") + "?q=post",
+        ]:
+            response = await self.async_client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+
+    def test_comment_count_follows_deletes(self):
+        self.add_comments(2)
+        Comment.objects.filter(body="Comment 0").get().delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
+
+LOCMEM = {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+
+
+@override_settings(
+    PAGE_CACHE_TTL=60,
+    CACHES={
+        "default": LOCMEM,
+        "search": {**LOCMEM, "LOCATION": "search"},
+        "pages": {**LOCMEM, "LOCATION": "pages"},
+    },
+)
+class PageCacheTests(TestCase):
+
+    def setUp(self):
+        caches["pages"].clear()
+        self.author = User.objects.create_user("author", password="pw")
+        self.tech = Category.objects.create(name="Tech")
+        self.news = Category.objects.create(name="News")
+        self.post = Post.objects.create(title="Tech post", body="Body", author=self.author)
+        self.post.categories.set([self.tech])
+        self.other = Post.objects.create(title="News post", body="Body", author=self.author)
+        self.other.categories.set([self.news])
+
+    def get(self, name, *args):
+        return self.client.get(reverse(name, args=args))
+
+    def assert_cached(self, name, *args):
+        self.assertEqual(self.get(name, *args)["X-Page-Cache"], "hit")
+
+    def assert_purged(self, name, *args):
+        self.assertEqual(self.get(name, *args)["X-Page-Cache"], "miss")
+
+    def warm(self):
+        for page in [
+            ("blog_index",), ("blog_category", "tech"), ("blog_category", "news"),
+            ("blog_detail", self.post.pk), ("blog_detail", self.other.pk),
+        ]:
+            self.get(*page)
+
+    def test_anonymous_pages_are_served_from_cache(self):
+        self.assertEqual(self.get("blog_detail", self.post.pk)["X-Page-Cache"], "miss")
+        # Only the conditional GET validators touch the database
+        with self.assertNumQueries(2):
+            response = self.get("blog_detail", self.post.pk)
+        self.assertEqual(response["X-Page-Cache"], "hit")
+        self.assertContains(response, "Tech post")
+
+    def test_logged_in_users_bypass_cache(self):
+        self.warm()
+        self.client.login(username="author", password="pw")
+        self.assertFalse(self.get("blog_index").has_header("X-Page-Cache"))
+
+    def test_comment_purges_only_its_detail_page(self):
+        self.warm()
+        Comment.objects.create(author=self.author, body="Nice", post=self.post)
+
+        self.assertContains(self.get("blog_detail", self.post.pk), "Nice")
+        self.assert_cached("blog_detail", self.other.pk)
+        self.assert_cached("blog_index")
+        self.assert_cached("blog_category", "tech")
+
+    def test_post_edit_purges_its_listings(self):
+        self.warm()
+        self.post.title = "Renamed"
+        self.post.save()
+
+        self.assertContains(self.get("blog_detail", self.post.pk), "Renamed")
+        self.assert_purged("blog_index")
+        self.assert_purged("blog_category", "tech")
+        self.assert_cached("blog_category", "news")
+        self.assert_cached("blog_detail", self.other.pk)
+
+    def test_category_change_purges_navigation(self):
+        self.warm()
+        self.news.refresh_from_db()
+        self.news.name = "World"
+        self.news.save()
+
+        self.assertContains(self.get("blog_detail", self.post.pk), "World")
+        self.assertEqual(self.get("blog_category", "news").status_code, 200)
+
+    def test_post_delete_purges_pages(self):
+        self.warm()
+        pk = self.post.pk
+        self.post.delete()
+
+        self.assertEqual(self.get("blog_detail", pk).status_code, 404)
+        self.assertNotContains(self.get("blog_category", "tech"), "Tech post")
+
+
+@override_settings(
+    PAGE_CACHE_TTL=60,
+    SITEMAP_PAGE_SIZE=2,
+    CACHES={
+        "default": LOCMEM,
+        "search": {**LOCMEM, "LOCATION": "search"},
+        "pages": {**LOCMEM, "LOCATION": "pages"},
+    },
+)
+class FeedAndSitemapTests(TestCase):
+
+    def setUp(self):
+        caches["pages"].clear()
+        self.author = User.objects.create_user("author", password="pw")
+        self.tech = Category.objects.create(name="Tech")
+        self.news = Category.objects.create(name="News")
+        self.posts = []
+        for i in range(5):
+            post = Post.objects.create(title=f"Post {i}", body=f"Secret body {i}", author=self.author)
+            post.categories.set([self.tech if i % 2 else self.news])
+            self.posts.append(post)
+
+    def get(self, name, *args):
+        response = self.client.get(reverse(name, args=args))
+        content = b"".join(response) if response.streaming else response.content
+        return response, content.decode()
+
+    def test_feeds_list_titles_and_links_without_bodies(self):
+        for name in ["blog_feed_rss", "blog_feed_atom"]:
+            response, content = self.get(name)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn("Post 4", content)
+            self.assertIn(reverse("blog_detail", args=[self.posts[4].pk]), content)
+            self.assertNotIn("Secret body", content)
+
+        _, content = self.get("blog_category_feed_rss", "tech")
+        self.assertIn("Post 3", content)
+        self.assertNotIn("Post 4", content)
+        self.assertEqual(self.get("blog_category_feed_atom", "missing")[0].status_code, 404)
+
+    def test_feed_is_cached_until_a_post_changes(self):
+        self.get("blog_feed_rss")
+        with self.assertNumQueries(2):
+            response, _ = self.get("blog_feed_rss")
+        self.assertEqual(response["X-Page-Cache"], "hit")
+
+        self.posts[0].title = "Renamed"
+        self.posts[0].save()
+        response, content = self.get("blog_feed_rss")
+        self.assertEqual(response["X-Page-Cache"], "miss")
+        self.assertIn("Renamed", content)
+
+    def test_sitemap_index_lists_pages_by_id_range(self):
+        _, content = self.get("sitemap_index")
+        self.assertIn(reverse("sitemap_categories"), content)
+        first = self.posts[0].pk
+        pages = {(pk - 1) // 2 + 1 for pk in range(first, first + 5)}
+        for page in pages:
+            self.assertIn(reverse("sitemap_posts", args=[page]), content)
+        self.assertEqual(content.count("<sitemap>"), len(pages) + 1)
+
+        urls = ""
+        for page in pages:
+            response, body = self.get("sitemap_posts", page)
+            self.assertEqual(response.status_code, 200)
+            urls += body
+        for post in self.posts:
+            self.assertIn(f'{reverse("blog_detail", args=[post.pk])}</loc>', urls)
+
+        self.assertEqual(self.get("sitemap_posts", max(pages) + 1)[0].status_code, 404)
+        _, content = self.get("sitemap_categories")
+        self.assertIn(reverse("blog_category", args=["tech"]), content)
+
+    async def test_sitemaps_stream_under_wsgi_and_asgi(self):
+        url = reverse("sitemap_posts", args=[(self.posts[0].pk - 1) // 2 + 1])
+        wsgi = await sync_to_async(self.client.get)(url)
+        self.assertFalse(wsgi.is_async)
+        wsgi_body = b"".join(await sync_to_async(list)(wsgi.streaming_content))
+
+        await sync_to_async(caches["pages"].clear)()
+        asgi = await self.async_client.get(url)
+        self.assertTrue(asgi.is_async)
+        asgi_body = b"".join([chunk async for chunk in asgi.streaming_content])
+
+        self.assertEqual(wsgi_body, asgi_body)
+        self.assertTrue(asgi_body.endswith(b"</urlset>\n"))
+
+    def test_streamed_sitemap_is_cached_after_it_is_sent(self):
+        response, _ = self.get("sitemap_index")
+        self.assertEqual(response["X-Page-Cache"], "miss")
+        response, content = self.get("sitemap_index")
+        self.assertEqual(response["X-Page-Cache"], "hit")
+        self.assertTrue(content.endswith("</sitemapindex>\n"))
+
+        Post.objects.create(title="New", body="Body", author=self.author).categories.set([self.tech])
+        self.assertEqual(self.get("sitemap_index")[0]["X-Page-Cache"], "miss")
+
+
+@override_settings(PAGE_CACHE_TTL=0, HTTP_CACHE_SHARED_MAX_AGE=30)
+class ConditionalGetTests(TestCase):
+
+    def setUp(self):
+        self.author = User.objects.create_user("author", password="pw")
+        self.tech = Category.objects.create(name="Tech")
+        self.post = Post.objects.create(title="Post", body="Body", author=self.author)
+        self.post.categories.set([self.tech])
+        self.url = reverse("blog_detail", args=[self.post.pk])
+
+    def test_matching_etag_returns_304_without_rendering(self):
+        first = self.client.get(self.url)
+        self.assertIn("public", first["Cache-Control"])
+        self.assertIn("s-maxage=30", first["Cache-Control"])
+        # Comment counts and navigation are not timestamps: ETag only
+        self.assertFalse(first.has_header("Last-Modified"))
+
+        with self.assertNumQueries(2):
+            second = self.client.get(self.url, headers={"if-none-match": first["ETag"]})
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.content, b"")
+
+    def test_if_modified_since_alone_never_matches(self):
+        future = "Fri, 01 Jan 2100 00:00:00 GMT"
+        for url in [self.url, reverse("blog_index")]:
+            response = self.client.get(url, headers={"if-modified-since": future})
+            self.assertEqual(response.status_code, 200, url)
+
+        self.client.login(username="author", password="pw")
+        response = self.client.get(self.url, headers={"if-modified-since": future})
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_changes_with_comments_and_categories(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        comment = Comment.objects.create(author=self.author, body="Hi", post=self.post)
+        after_comment = self.client.get(self.url, headers={"if-none-match": etag})
+        self.assertEqual(after_comment.status_code, 200)
+
+        comment.delete()
+        after_delete = self.client.get(self.url, headers={"if-none-match": after_comment["ETag"]})
+        self.assertEqual(after_delete.status_code, 200)
+
+        self.tech.refresh_from_db()
+        self.tech.name = "Technology"
+        self.tech.save()
+        after_rename = self.client.get(self.url, headers={"if-none-match": after_delete["ETag"]})
+        self.assertEqual(after_rename.status_code, 200)
+
+    def test_etag_changes_when_a_comment_is_edited(self):
+        comment = Comment.objects.create(author=self.author, body="Frist", post=self.post)
+        first = self.client.get(self.url)
+
+        editor = Client()
+        editor.force_login(self.author)
+        editor.post(reverse("edit_comment", args=[comment.pk]), {"body": "First"})
+
+        second = self.client.get(self.url, headers={"if-none-match": first["ETag"]})
+        self.assertEqual(second.status_code, 200)
+        self.assertContains(second, "First")
+
+    def test_listing_etag_changes_with_new_post(self):
+        index = reverse("blog_index")
+        etag = self.client.get(index)["ETag"]
+        self.assertEqual(self.client.get(index, headers={"if-none-match": etag}).status_code, 304)
+
+        Post.objects.create(title="Another", body="Body", author=self.author)
+        self.assertEqual(self.client.get(index, headers={"if-none-match": etag}).status_code, 200)
+
+    def test_listing_etag_changes_when_an_uncategorised_post_is_deleted(self):
+        index = reverse("blog_index")
+        older = Post.objects.create(title="No category", body="Body", author=self.author)
+        Post.objects.filter(pk=older.pk).update(last_modified=self.post.last_modified)
+        etag = self.client.get(index)["ETag"]
+
+        older.delete()
+
+        self.assertEqual(self.client.get(index, headers={"if-none-match": etag}).status_code, 200)
+
+    def test_missing_post_is_not_validated(self):
+        response = self.client.get(reverse("blog_detail", args=[self.post.pk + 1]))
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header("ETag"))
+
+    def test_logged_in_pages_are_private(self):
+        self.client.login(username="author", password="pw")
+        response = self.client.get(self.url)
+        self.assertIn("private", response["Cache-Control"])
+
+
+class BenchmarkCommandTests(TestCase):
+
+    def seed(self, *args):
+        call_command(
+            "seed_benchmark_data", "--users", "3", "--categories", "4", "--posts", "12",
+            "--comments", "30", *args, stdout=io.StringIO(),
+        )
+
+    def test_seed_creates_consistent_data(self):
+        self.seed()
+
+        posts = Post.objects.filter(author__username__startswith="bench_user_")
+        self.assertEqual(posts.count(), 12)
+        self.assertEqual(Comment.objects.count(), 30)
+        self.assertEqual(sum(posts.values_list("comment_count", flat=True)), 30)
+        self.assertEqual(recount_posts(), 0)
+        self.assertFalse(posts.filter(search_vector=None).exists())
+        # Rows are spread over time, newest last
+        newest = posts.order_by("-created_on").first()
+        self.assertEqual(newest.pk, posts.order_by("-pk").first().pk)
+
+    def test_seed_refuses_to_duplicate_without_flush(self):
+        self.seed()
+        with self.assertRaises(CommandError):
+            self.seed()
+        self.seed("--flush")
+        self.assertEqual(Post.objects.count(), 12)
+
+    def test_benchmark_writes_json_and_rolls_back(self):
+        self.seed()
+        output = os.path.join(tempfile.mkdtemp(), "results.json")
+        self.addCleanup(os.remove, output)
+
+        call_command(
+            "run_benchmarks", "--requests", "3", "--warmup", "0",
+            "--scenario", "detail", "--scenario", "generate",
+            "--output", output, stdout=io.StringIO(),
+        )
+
+        with open(output) as f:
+            report = json.load(f)
+        self.assertEqual(set(report["scenarios"]), {"detail", "generate"})
+        detail = report["scenarios"]["detail"]
+        self.assertEqual(detail["errors"], 0)
+        self.assertIn("p99", detail["latency_ms"])
+        self.assertGreater(detail["queries"]["mean"], 0)
+        # Posts created by the generation scenario are rolled back
+        self.assertEqual(Post.objects.count(), 12)
+
+
+@override_settings(PAGE_CACHE_TTL=0, RELATED_POSTS=2, RELATED_CATEGORY_BOOST=0.1)
+class RelatedPostsTests(TestCase):
+
+    def setUp(self):
+        self.author = User.objects.create_user("author")
+        self.tech = Category.objects.create(name="Tech")
+        self.food = Category.objects.create(name="Food")
+        self.django = self.create("Django views", "Python django views templates queries", self.tech)
+        self.orm = self.create("Django ORM", "Python django queries models migrations", self.tech)
+        self.flask = self.create("Flask apps", "Python flask templates routes", self.food)
+        self.bread = self.create("Sourdough bread", "Flour water salt starter oven bread", self.food)
+
+    def create(self, title, body, category):
+        post = Post.objects.create(title=title, body=body, author=self.author)
+        post.categories.set([category])
+        return post
+
+    def related(self, post):
+        return [p.title for p in Post.objects.filter(neighbour_of__post=post).order_by("-neighbour_of__score")]
+
+    def test_build_ranks_similar_posts_first(self):
+        call_command("build_related_posts", stdout=io.StringIO())
+
+        self.assertEqual(self.related(self.django), ["Django ORM", "Flask apps"])
+        # Shares no words with anything; only its category links it to Flask
+        self.assertEqual(self.related(self.bread), ["Flask apps"])
+
+    def test_category_boost_breaks_ties(self):
+        call_command("build_related_posts", stdout=io.StringIO())
+        with override_settings(RELATED_CATEGORY_BOOST=0):
+            call_command("build_related_posts", stdout=io.StringIO())
+            self.assertEqual(self.related(self.bread), [])
+
+    def test_detail_page_reads_neighbours_in_one_query(self):
+        call_command("build_related_posts", stdout=io.StringIO())
+        url = reverse("blog_detail", args=[self.django.pk])
+        # Validators, post, categories, related posts, comments, nav
+        with self.assertNumQueries(7):
+            response = self.client.get(url)
+        self.assertEqual([p.title for p in response.context["related_posts"]], ["Django ORM", "Flask apps"])
+        self.assertContains(response, "Related posts")
+
+    def test_saves_are_queued_and_applied_incrementally(self):
+        call_command("build_related_posts", stdout=io.StringIO())
+        self.assertFalse(RelatedUpdate.objects.exists())
+
+        new = self.create("Django templates", "Python django templates views", self.tech)
+        self.assertEqual(self.related(new), [])
+        self.assertEqual(related.process_pending(), 1)
+        self.assertEqual(self.related(new)[0], "Django views")
+        self.assertIn("Django templates", self.related(self.django))
+
+        new.title = "Baking bread"
+        new.body = "Flour water oven bread starter"
+        new.save()
+        new.categories.set([self.food])
+        self.assertEqual(RelatedUpdate.objects.count(), 1)
+        call_command("build_related_posts", "--pending", stdout=io.StringIO())
+        self.assertEqual(self.related(new)[0], "Sourdough bread")
+        self.assertNotIn("Baking bread", self.related(self.django))
+        self.assertFalse(RelatedUpdate.objects.exists())
+
+    def test_saves_before_the_first_build_are_ignored(self):
+        post = self.create("Django again", "Python django", self.tech)
+        self.assertEqual(related.process_pending(), 5)
+        self.assertEqual(self.related(post), [])
+        self.assertFalse(RelatedUpdate.objects.exists())
+
+
+def make_body(seed, words=400):
+    rng = random.Random(seed)
+    vocabulary = [f"word{n}" for n in range(300)]
+    return " ".join(rng.choice(vocabulary) for _ in range(words))
+
+
+@override_settings(PAGE_CACHE_TTL=0, DUPLICATE_ACTION="flag", DUPLICATE_MAX_DISTANCE=3)
+class NearDuplicateTests(TestCase):
+
+    def setUp(self):
+        self.author = User.objects.create_user("author")
+        self.body = make_body(1)
+        self.original = Post.objects.create(title="Original", body=self.body, author=self.author)
+        self.other = Post.objects.create(title="Other", body=make_body(2), author=self.author)
+
+    def test_signature_is_stored_with_band_keys(self):
+        self.assertIsNotNone(self.original.simhash)
+        self.assertEqual(len(self.original.simhash_bands), 4)
+        short = Post.objects.create(title="Short", body="Too short to compare", author=self.author)
+        self.assertIsNone(short.simhash)
+        self.assertEqual(short.simhash_bands, [])
+
+    def test_lookup_finds_edited_copy_in_one_query(self):
+        edited = self.body.replace("word7 ", "changed ", 1) + " one more sentence"
+        with self.assertNumQueries(1):
+            post, distance = duplicates.nearest(edited)
+        self.assertEqual(post, self.original)
+        self.assertLessEqual(distance, 3)
+        self.assertIsNone(duplicates.nearest(make_body(3)))
+
+    def test_check_flags_or_blocks(self):
+        self.assertEqual(duplicates.check(self.body), self.original)
+        with override_settings(DUPLICATE_ACTION="block"):
+            with self.assertRaises(duplicates.NearDuplicateError) as raised:
+                duplicates.check(self.body)
+            self.assertEqual(raised.exception.post, self.original)
+        with override_settings(DUPLICATE_ACTION="off"), self.assertNumQueries(0):
+            self.assertIsNone(duplicates.check(self.body))
+
+    def test_command_lists_clusters_and_flags_copies(self):
+        copy = Post.objects.create(title="Copy", body=self.body + " again", author=self.author)
+        out = io.StringIO()
+        call_command("find_duplicate_posts", "--flag", stdout=out)
+
+        self.assertIn("Found 1 clusters covering 2 posts", out.getvalue())
+        self.assertEqual(duplicates.clusters(), [[self.original.pk, copy.pk]])
+        copy.refresh_from_db()
+        self.assertEqual(copy.duplicate_of, self.original)
+        self.other.refresh_from_db()
+        self.assertIsNone(self.other.duplicate_of)
+
+
+class ExportImportTests(TestCase):
+
+    def setUp(self):
+        call_command(
+            "seed_benchmark_data", "--users", "3", "--categories", "3", "--posts", "7",
+            "--comments", "20", stdout=io.StringIO(),
+        )
+        post = Post.objects.first()
+        post.body = "Tabs\tand\nnewlines \\ survive"
+        post.save()
+        self.path = os.path.join(tempfile.mkdtemp(), "posts.jsonl")
+        self.addCleanup(os.remove, self.path)
+
+    def snapshot(self):
+        return sorted(
+            (p.title, p.body, p.author.username, p.created_on, p.comment_count,
+             tuple(sorted(c.slug for c in p.categories.all())))
+            for p in Post.objects.select_related("author").prefetch_related("categories")
+        )
+
+    def round_trip(self, *args):
+        call_command("export_posts", self.path, "--chunk-size", "3", stdout=io.StringIO())
+        before = self.snapshot()
+        comments = sorted(Comment.objects.values_list("body", "created_on"))
+        Post.objects.all().delete()
+        Category.objects.all().delete()
+        User.objects.all().delete()
+
+        call_command("import_posts", self.path, "--batch-size", "3", *args, stdout=io.StringIO())
+
+        self.assertEqual(self.snapshot(), before)
+        self.assertEqual(sorted(Comment.objects.values_list("body", "created_on")), comments)
+        self.assertEqual(recount_posts(), 0)
+        self.assertFalse(Post.objects.filter(search_vector=None).exists())
+        # Imported authors cannot log in until a password is set
+        self.assertFalse(User.objects.first().has_usable_password())
+
+    def test_round_trip_with_copy(self):
+        self.round_trip()
+
+    def test_round_trip_with_bulk_create(self):
+        self.round_trip("--no-copy")
+
+    def test_import_rejects_bad_lines(self):
+        with open(self.path, "w") as f:
+            f.write('{"type": "post"\n')
+        with self.assertRaises(CommandError):
+            call_command("import_posts", self.path, stdout=io.StringIO())
+
+
+@override_settings(REQUEST_TIMING=True, PAGE_CACHE_TTL=0, REQUEST_TIMING_SLOW_MS=60000)
+class RequestTimingTests(TestCase):
+
+    def setUp(self):
+        self.author = User.objects.create_user("author")
+        post = Post.objects.create(title="Post", body="Body", author=self.author)
+        post.categories.set([Category.objects.create(name="Tech")])
+        self.url = reverse("blog_detail", args=[post.pk])
+
+    def record(self, logs):
+        return json.loads(logs.records[-1].getMessage())
+
+    def test_server_timing_header_and_log_line(self):
+        with self.assertLogs("simple_blog_ai.requests", "INFO") as logs:
+            response = self.client.get(self.url)
+
+        metrics = dict(part.split(";", 1)[0:2] for part in response["Server-Timing"].split(", "))
+        self.assertEqual(set(metrics), {"total", "db", "tpl"})
+        record = self.record(logs)
+        self.assertEqual(record["path"], self.url)
+        self.assertEqual(record["status"], 200)
+        self.assertGreater(record["queries"], 0)
+        self.assertGreater(record["template_ms"], 0)
+        self.assertEqual(logs.records[-1].levelname, "INFO")
+
+    @override_settings(REQUEST_TIMING_SLOW_MS=0)
+    def test_slow_requests_are_warnings(self):
+        with self.assertLogs("simple_blog_ai.requests", "WARNING") as logs:
+            self.client.get(self.url)
+        self.assertTrue(self.record(logs)["slow"])
+
+    def test_repeated_statements_are_flagged(self):
+        for title in ("Second", "Third"):
+            Post.objects.create(title=title, body="Body", author=self.author)
+        with self.assertLogs("simple_blog_ai.requests"):
+            self.client.get(self.url)  # installs the SQL wrapper
+
+        stats = request_timing.RequestStats()
+        token = request_timing._current.set(stats)
+        try:
+            # Classic N+1: one author query per post
+            for post in Post.objects.all():
+                User.objects.get(pk=post.author_id)
+        finally:
+            request_timing._current.reset(token)
+
+        duplicates = stats.duplicates(3)
+        self.assertEqual(len(duplicates), 1)
+        self.assertIn("auth_user", duplicates[0][0])
+        self.assertEqual(duplicates[0][1], 3)
+
+    @override_settings(REQUEST_TIMING=False)
+    def test_disabled_adds_nothing(self):
+        self.assertFalse(self.client.get(self.url).has_header("Server-Timing"))
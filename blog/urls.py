@@ -3,8 +3,16 @@ from . import views
 
 urlpatterns = [
     path("",views.blog_index, name="blog_index"),
+    path("search/", views.blog_search, name="blog_search"),
     path("post/<int:pk>", views.blog_detail, name="blog_detail"),
-    path("category/<category>", views.blog_category, name="blog_category"),
+    path("category/<str:category>", views.blog_category, name="blog_category"),
     path("post/new/", views.create_post, name="create_post"),
+    path("feed/rss/", views.rss_feed, name="blog_feed_rss"),
+    path("feed/atom/", views.atom_feed, name="blog_feed_atom"),
+    path("category/<str:category>/feed/rss/", views.category_rss_feed, name="blog_category_feed_rss"),
+    path("category/<str:category>/feed/atom/", views.category_atom_feed, name="blog_category_feed_atom"),
+    path("sitemap.xml", views.sitemap_index, name="sitemap_index"),
+    path("sitemap-categories.xml", views.sitemap_categories, name="sitemap_categories"),
+    path("sitemap-posts-<int:page>.xml", views.sitemap_posts, name="sitemap_posts"),
 
 ]
\ No newline at end of file
@@ -1,58 +1,229 @@
-from django.http import HttpResponseRedirect
-from django.shortcuts import render, redirect
+from django.http import Http404, HttpResponseRedirect
+from asgiref.sync import sync_to_async
+from django.shortcuts import aget_object_or_404, render, redirect
 from django.contrib.auth.decorators import login_required
+from django.conf import settings
+from django.db.models import Prefetch
 from .models import Post, Comment, Category
+from .feeds import CategoryAtomFeed, CategoryFeed, LatestPostsAtomFeed, LatestPostsFeed
 from .forms import CommentForm, PostForm  # ← Importar ambos formularios
+from . import sitemaps
+from .conditional import conditional_page, detail_state, listing_state
+from .page_cache import INDEX, cache_anonymous_page, category_tag, post_tag
+from .pagination import akeyset_page
+from .search import highlight, search_posts, with_headlines
+from simple_blog_ai.streaming import streaming_response
 
 
 # Create your views here.
 
-def blog_index(request):
-    posts = Post.objects.all().order_by("-created_on")
+def listing_queryset():
+    """
+    Posts with only the columns a listing row renders
+    The stored excerpt stands in for the body, and categories for the whole
+    page load in one query
+    """
+    return (
+        Post.objects
+        .only("id", "title", "created_on", "excerpt", "reading_time")
+        .prefetch_related(
+            Prefetch("categories", queryset=Category.objects.only("id", "name", "slug"))
+        )
+    )
+
+
+@conditional_page(listing_state)
+@cache_anonymous_page(lambda request: [INDEX])
+async def blog_index(request):
+    posts, next_cursor = await akeyset_page(
+        listing_queryset(),
+        request.GET.get("cursor"),
+        settings.BLOG_PAGE_SIZE,
+    )
     context = {
         "posts": posts,
+        "next_cursor": next_cursor,
+        "is_first_page": not request.GET.get("cursor"),
     }
-    return render(request, "blog/index.html", context)
+    return await sync_to_async(render)(request, "blog/index.html", context)
+
 
+@conditional_page(listing_state)
+@cache_anonymous_page(lambda request, category: [category_tag(category)])
+async def blog_category(request, category):
+    """
+    Posts in one category, resolved by its unique slug
+    """
+    match = await Category.objects.only("id", "name", "slug", "post_count").filter(slug=category).afirst()
+    if match is None:
+        # Links made before slugs existed used the category name
+        legacy = await Category.objects.only("slug").filter(name=category).afirst()
+        if legacy is None:
+            raise Http404("Category not found")
+        return redirect("blog_category", category=legacy.slug, permanent=True)
 
-def blog_category(request, category):
-    posts = Post.objects.filter(
-        categories__name__contains=category
-    ).order_by("-created_on")
+    posts, next_cursor = await akeyset_page(
+        listing_queryset().filter(categories=match.pk),
+        request.GET.get("cursor"),
+        settings.BLOG_PAGE_SIZE,
+    )
     context = {
-        "category": category,
+        "category": match,
         "posts": posts,
+        "next_cursor": next_cursor,
+        "is_first_page": not request.GET.get("cursor"),
+    }
+    return await sync_to_async(render)(request, "blog/category.html", context)
+
+
+async def blog_search(request):
+    """
+    Ranked full-text search with highlighted snippets
+    Pages are fetched with LIMIT page_size + 1, so no COUNT over the matches
+    """
+    query = request.GET.get("q", "").strip()
+    language = request.GET.get("lang", "")
+    page_size = settings.BLOG_PAGE_SIZE
+
+    try:
+        page = min(max(int(request.GET.get("page", 1)), 1), settings.BLOG_SEARCH_MAX_PAGES)
+    except ValueError:
+        page = 1
+
+    results = []
+    has_next = False
+    if query:
+        start = (page - 1) * page_size
+        matches = search_posts(
+            Post.objects.only("id", "title", "created_on", "language"),
+            query,
+            language,
+        )
+        results = [post async for post in matches[start:start + page_size + 1]]
+        has_next = len(results) > page_size and page < settings.BLOG_SEARCH_MAX_PAGES
+        results = results[:page_size]
+
+        # Headlines only for the rows being shown
+        headlines = {
+            pk: headline
+            async for pk, headline in (
+                with_headlines(Post.objects.filter(pk__in=[p.pk for p in results]), query)
+                .values_list("pk", "headline")
+            )
+        }
+        for post in results:
+            post.snippet = highlight(headlines.get(post.pk))
+
+    context = {
+        "query": query,
+        "language": language,
+        "languages": Post.LANGUAGE_CHOICES,
+        "posts": results,
+        "page": page,
+        "previous_page": page - 1 if page > 1 else None,
+        "next_page": page + 1 if has_next else None,
     }
-    return render(request, "blog/category.html", context)
+    return await sync_to_async(render)(request, "blog/search.html", context)
 
 
-def blog_detail(request, pk):
-    post = Post.objects.get(pk=pk)
+@conditional_page(detail_state)
+@cache_anonymous_page(lambda request, pk: [post_tag(pk)])
+async def blog_detail(request, pk):
+    """
+    Post page assembled with a fixed number of queries:
+    post + author, its categories, its precomputed related posts, and one
+    page of comments + authors
+    """
+    post = await aget_object_or_404(
+        Post.objects
+        .select_related("author")
+        .defer("body", "body_hash", "search_vector", "excerpt")
+        .prefetch_related(
+            Prefetch("categories", queryset=Category.objects.only("id", "name", "slug"))
+        ),
+        pk=pk,
+    )
     form = CommentForm()
 
     if request.method == "POST":
         form = CommentForm(request.POST)
+        user = await request.auser()
 
-        if request.user.is_authenticated:
+        if user.is_authenticated:
             if form.is_valid():
                 comment = Comment(
-                    author=request.user,
+                    author=user,
                     body=form.cleaned_data["body"],
                     post=post,
                 )
-                comment.save()
+                await comment.asave()
                 return HttpResponseRedirect(request.path_info)
         else:
             return HttpResponseRedirect("/accounts/login/")
 
-    comments = Comment.objects.filter(post=post).order_by("-created_on")
+    # Neighbours come from blog.related, read in one indexed join
+    related_posts = [
+        related async for related in
+        Post.objects.filter(neighbour_of__post=post)
+        .only("id", "title")
+        .order_by("-neighbour_of__score")
+    ]
+
+    comments, next_cursor = await akeyset_page(
+        Comment.objects.filter(post=post).select_related("author"),
+        request.GET.get("comments"),
+        settings.BLOG_COMMENTS_PAGE_SIZE,
+    )
 
     context = {
         "post": post,
+        "related_posts": related_posts,
         "comments": comments,
+        "next_comments_cursor": next_cursor,
+        "is_first_comments_page": not request.GET.get("comments"),
         "form": CommentForm(),
     }
-    return render(request, "blog/detail.html", context)
+    return await sync_to_async(render)(request, "blog/detail.html", context)
+
+
+# Feeds change with the listings they mirror
+rss_feed = conditional_page(listing_state)(
+    cache_anonymous_page(lambda request: [INDEX])(LatestPostsFeed())
+)
+atom_feed = conditional_page(listing_state)(
+    cache_anonymous_page(lambda request: [INDEX])(LatestPostsAtomFeed())
+)
+category_rss_feed = conditional_page(listing_state)(
+    cache_anonymous_page(lambda request, category: [category_tag(category)])(CategoryFeed())
+)
+category_atom_feed = conditional_page(listing_state)(
+    cache_anonymous_page(lambda request, category: [category_tag(category)])(CategoryAtomFeed())
+)
+
+
+def _sitemap_response(request, entries):
+    return streaming_response(request, entries, content_type="application/xml; charset=utf-8")
+
+
+@conditional_page(listing_state)
+@cache_anonymous_page(lambda request: [INDEX])
+async def sitemap_index(request):
+    return _sitemap_response(request, sitemaps.index_entries(request))
+
+
+@conditional_page(listing_state)
+@cache_anonymous_page(lambda request, page: [INDEX])
+async def sitemap_posts(request, page):
+    first, last = sitemaps.post_page_range(page)
+    if not await Post.objects.filter(id__gte=first, id__lte=last).aexists():
+        raise Http404("Sitemap page not found")
+    return _sitemap_response(request, sitemaps.post_entries(request, page))
+
+
+@conditional_page(listing_state)
+@cache_anonymous_page(lambda request: [INDEX])
+async def sitemap_categories(request):
+    return _sitemap_response(request, sitemaps.category_entries(request))
 
 
 @login_required
@@ -1,3 +1,11 @@
 from django.contrib import admin
+from .models import UserStats
 
-# Register your models here.
+
+class UserStatsAdmin(admin.ModelAdmin):
+    list_display = ('user', 'post_count', 'comment_count', 'category_count', 'updated_on')
+    search_fields = ('user__username',)
+    raw_id_fields = ('user',)
+
+
+admin.site.register(UserStats, UserStatsAdmin)
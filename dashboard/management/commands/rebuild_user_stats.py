@@ -0,0 +1,38 @@
+"""
+Management command to backfill or repair the denormalized dashboard statistics
+Usage: python manage.py rebuild_user_stats [--user USERNAME ...]
+"""
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from dashboard.stats import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recompute per-user dashboard statistics from posts, comments and categories'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            action='append',
+            dest='usernames',
+            help='Only rebuild these users (repeatable); default is everyone',
+        )
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['usernames']:
+            users = dict(
+                User.objects.filter(username__in=options['usernames'])
+                .values_list('username', 'id')
+            )
+            unknown = set(options['usernames']) - users.keys()
+            if unknown:
+                raise CommandError(f"Unknown user(s): {', '.join(sorted(unknown))}")
+            user_ids = list(users.values())
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Rebuilding user statistics...'))
+        drifted = rebuild(user_ids)
+
+        style = self.style.WARNING if drifted else self.style.SUCCESS
+        self.stdout.write(style(f'Users with drifted counters: {drifted}'))
+        self.stdout.write(self.style.SUCCESS('User statistics rebuilt'))
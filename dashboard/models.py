@@ -1,3 +1,40 @@
 from django.db import models
+from django.contrib.auth.models import User
+from blog.models import Category
 
-# Create your models here.
+
+class UserStats(models.Model):
+    """
+    Denormalized dashboard counters for one author
+    Kept current by signals in dashboard.signals; repair with `manage.py rebuild_user_stats`
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="stats")
+    post_count = models.PositiveIntegerField(default=0)
+    # Comments received on the user's posts
+    comment_count = models.PositiveIntegerField(default=0)
+    # Distinct categories across the user's posts
+    category_count = models.PositiveIntegerField(default=0)
+    updated_on = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "user stats"
+
+    def __str__(self):
+        return f"Stats for {self.user}"
+
+
+class UserCategoryUsage(models.Model):
+    """
+    How many of a user's posts are in a category; backs UserStats.category_count
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="category_usage")
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name="+")
+    post_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "category"], name="unique_user_category_usage"),
+        ]
+
+    def __str__(self):
+        return f"{self.user} / {self.category}: {self.post_count}"
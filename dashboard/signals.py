@@ -0,0 +1,114 @@
+"""
+Signal handlers that keep UserStats in step with posts, comments and categories
+"""
+from collections import Counter, defaultdict
+
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from blog.models import Category, Comment, Post
+from .stats import bump, change_category_usage, recount_categories
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        bump(instance.author_id, post_count=1)
+
+
+@receiver(pre_delete, sender=Post)
+def remember_post_categories(sender, instance, **kwargs):
+    # Category links are gone by post_delete, and no m2m_changed is sent for them
+    instance._stats_category_ids = list(
+        instance.categories.through.objects
+        .filter(post_id=instance.pk)
+        .values_list("category_id", flat=True)
+    )
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    bump(instance.author_id, post_count=-1)
+    change_category_usage(
+        instance.author_id, getattr(instance, "_stats_category_ids", []), -1
+    )
+
+
+@receiver(pre_delete, sender=Category)
+def remember_category_users(sender, instance, **kwargs):
+    # The links and usage rows are cascaded without m2m_changed
+    instance._stats_user_ids = set(
+        Post.categories.through.objects
+        .filter(category_id=instance.pk)
+        .values_list("post__author_id", flat=True)
+    )
+
+
+@receiver(post_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    recount_categories(getattr(instance, "_stats_user_ids", set()))
+
+
+@receiver(m2m_changed, sender=Post.categories.through)
+def post_categories_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ("pre_clear", "pre_remove"):
+        # pk_set is None for clear() and may list unlinked ids for remove(),
+        # so capture the links that are actually about to go
+        if reverse:
+            links = sender.objects.filter(category_id=instance.pk)
+            if pk_set is not None:
+                links = links.filter(post_id__in=pk_set)
+            instance._stats_removed = list(links.values_list("post__author_id", "category_id"))
+        else:
+            links = sender.objects.filter(post_id=instance.pk)
+            if pk_set is not None:
+                links = links.filter(category_id__in=pk_set)
+            instance._stats_removed = [
+                (instance.author_id, category_id)
+                for category_id in links.values_list("category_id", flat=True)
+            ]
+        return
+
+    if action in ("post_clear", "post_remove"):
+        changes = getattr(instance, "_stats_removed", [])
+        delta = -1
+    elif action == "post_add" and pk_set:
+        # Django only reports ids that were not linked yet
+        delta = 1
+        if reverse:
+            # instance is a Category, pk_set holds post ids
+            authors = Post.objects.filter(pk__in=pk_set).values_list("author_id", flat=True)
+            changes = [(author_id, instance.pk) for author_id in authors]
+        else:
+            changes = [(instance.author_id, category_id) for category_id in pk_set]
+    else:
+        return
+
+    # Several of one user's posts can change at once (reverse side), so
+    # group identical (user, category) pairs into a single delta
+    grouped = defaultdict(lambda: defaultdict(list))
+    for (user_id, category_id), count in Counter(changes).items():
+        grouped[user_id][count].append(category_id)
+    for user_id, by_count in grouped.items():
+        for count, category_ids in by_count.items():
+            change_category_usage(user_id, category_ids, delta * count)
+
+
+def _post_author_id(comment):
+    return (
+        Post.objects.filter(pk=comment.post_id)
+        .values_list("author_id", flat=True)
+        .first()
+    )
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        bump(_post_author_id(instance), comment_count=1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    author_id = _post_author_id(instance)
+    if author_id is not None:
+        bump(author_id, comment_count=-1)
@@ -0,0 +1,159 @@
+"""
+Maintenance of the denormalized per-user dashboard statistics
+"""
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.functions import Greatest
+from blog.models import Comment, Post
+from .models import UserCategoryUsage, UserStats
+
+
+def compute_stats(user_ids=None):
+    """
+    Recompute counters from the source tables with grouped queries
+    Returns ({user_id: {field: value}}, {(user_id, category_id): post_count})
+    """
+    posts = Post.objects.all()
+    comments = Comment.objects.all()
+    links = Post.categories.through.objects.all()
+    if user_ids is not None:
+        posts = posts.filter(author_id__in=user_ids)
+        comments = comments.filter(post__author_id__in=user_ids)
+        links = links.filter(post__author_id__in=user_ids)
+
+    stats = {}
+
+    def row(user_id):
+        return stats.setdefault(user_id, {"post_count": 0, "comment_count": 0, "category_count": 0})
+
+    for user_id, count in posts.values_list("author_id").annotate(n=Count("id")).order_by():
+        row(user_id)["post_count"] = count
+
+    for user_id, count in comments.values_list("post__author_id").annotate(n=Count("id")).order_by():
+        row(user_id)["comment_count"] = count
+
+    usage = {}
+    for user_id, category_id, count in (
+        links.values_list("post__author_id", "category_id").annotate(n=Count("id")).order_by()
+    ):
+        usage[(user_id, category_id)] = count
+        row(user_id)["category_count"] += 1
+
+    return stats, usage
+
+
+def rebuild(user_ids=None):
+    """
+    Replace stored stats (for some or all users) with freshly computed ones
+    Returns the number of users whose stored counters were wrong
+    """
+    stats, usage = compute_stats(user_ids)
+    if user_ids is not None:
+        for user_id in user_ids:
+            stats.setdefault(user_id, {"post_count": 0, "comment_count": 0, "category_count": 0})
+
+    existing = UserStats.objects.all()
+    if user_ids is not None:
+        existing = existing.filter(user_id__in=user_ids)
+    stored = {
+        s.user_id: {"post_count": s.post_count, "comment_count": s.comment_count,
+                     "category_count": s.category_count}
+        for s in existing
+    }
+    drifted = sum(1 for user_id, values in stats.items() if stored.get(user_id) != values)
+
+    with transaction.atomic():
+        if user_ids is None:
+            UserStats.objects.exclude(user_id__in=stats.keys()).delete()
+            UserCategoryUsage.objects.all().delete()
+        else:
+            UserCategoryUsage.objects.filter(user_id__in=user_ids).delete()
+
+        UserStats.objects.bulk_create(
+            [UserStats(user_id=user_id, **values) for user_id, values in stats.items()],
+            update_conflicts=True,
+            unique_fields=["user"],
+            update_fields=["post_count", "comment_count", "category_count", "updated_on"],
+            batch_size=1000,
+        )
+        UserCategoryUsage.objects.bulk_create(
+            [
+                UserCategoryUsage(user_id=user_id, category_id=category_id, post_count=count)
+                for (user_id, category_id), count in usage.items()
+            ],
+            # Signal handlers may insert the same rows from live requests
+            # after the delete above; take the recomputed count over theirs
+            update_conflicts=True,
+            unique_fields=["user", "category"],
+            update_fields=["post_count"],
+            batch_size=1000,
+        )
+    return drifted
+
+
+def get_stats(user):
+    """
+    One indexed lookup; rows missing for a user are built on first access
+    """
+    try:
+        return UserStats.objects.get(user=user)
+    except UserStats.DoesNotExist:
+        rebuild([user.pk])
+        return UserStats.objects.get(user=user)
+
+
+def bump(user_id, **deltas):
+    """
+    Apply counter deltas with an UPDATE ... SET f = GREATEST(f + n, 0)
+
+    Users without a stats row yet get a full recompute on additions; removals
+    never create rows (the user may be in the middle of being deleted).
+    """
+    updated = UserStats.objects.filter(user_id=user_id).update(
+        **{field: Greatest(F(field) + delta, 0) for field, delta in deltas.items()}
+    )
+    if not updated and all(delta > 0 for delta in deltas.values()):
+        rebuild([user_id])
+
+
+def change_category_usage(user_id, category_ids, delta):
+    """
+    Adjust per-category post counts and the distinct category counter
+    """
+    if not category_ids:
+        return
+    if not UserStats.objects.filter(user_id=user_id).exists():
+        if delta > 0:
+            rebuild([user_id])
+        return
+
+    with transaction.atomic():
+        if delta > 0:
+            UserCategoryUsage.objects.bulk_create(
+                [UserCategoryUsage(user_id=user_id, category_id=c) for c in category_ids],
+                ignore_conflicts=True,
+            )
+        usage = UserCategoryUsage.objects.filter(user_id=user_id, category_id__in=category_ids)
+        usage.update(post_count=Greatest(F("post_count") + delta, 0))
+        usage.filter(post_count__lte=0).delete()
+
+        UserStats.objects.filter(user_id=user_id).update(
+            category_count=UserCategoryUsage.objects.filter(user_id=user_id).count()
+        )
+
+
+def recount_categories(user_ids):
+    """
+    Reset category_count from the remaining usage rows, e.g. after a
+    category (and its usage rows) was deleted
+    """
+    if not user_ids:
+        return
+    remaining = (
+        UserCategoryUsage.objects.filter(user_id=OuterRef("user_id"))
+        .values("user_id").annotate(n=Count("id")).values("n")
+    )
+    UserStats.objects.filter(user_id__in=user_ids).update(
+        category_count=Coalesce(Subquery(remaining), 0)
+    )
@@ -1,3 +1,153 @@
+import io
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+
+from ai_generator.models import GenerationRun
+from blog.models import Category, Comment, Post
+from .models import UserCategoryUsage, UserStats
+from .stats import compute_stats, rebuild
+
+
+class UserStatsSignalTests(TestCase):
+
+    def setUp(self):
+        self.author = User.objects.create_user("author")
+        self.reader = User.objects.create_user("reader")
+        self.tech, self.news, self.ai = [
+            Category.objects.create(name=name) for name in ("Tech", "News", "AI")
+        ]
+
+    def create_post(self, *categories):
+        post = Post.objects.create(title="Post", body="Body", author=self.author)
+        post.categories.set(categories)
+        return post
+
+    def assert_stats(self, posts, comments, categories):
+        stats = UserStats.objects.get(user=self.author)
+        self.assertEqual(
+            (stats.post_count, stats.comment_count, stats.category_count),
+            (posts, comments, categories),
+        )
+        # Incremental counters must match a full recompute
+        computed, _ = compute_stats([self.author.pk])
+        self.assertEqual(computed[self.author.pk], {
+            "post_count": posts, "comment_count": comments, "category_count": categories,
+        })
+
+    def test_posts_and_categories_are_counted(self):
+        self.create_post(self.tech, self.news)
+        self.create_post(self.tech)
+        self.assert_stats(2, 0, 2)
+
+    def test_category_changes_update_distinct_count(self):
+        first = self.create_post(self.tech)
+        second = self.create_post(self.tech)
+
+        first.categories.set([self.news])
+        self.assert_stats(2, 0, 2)
+
+        second.categories.clear()
+        self.assert_stats(2, 0, 1)
+
+        self.ai.post_set.add(first, second)
+        self.assert_stats(2, 0, 2)
+
+        # Removing links that do not exist changes nothing
+        first.categories.remove(self.tech)
+        self.assert_stats(2, 0, 2)
+
+    def test_deleting_a_category_recounts_its_users(self):
+        self.create_post(self.tech, self.news)
+        other = User.objects.create_user("other")
+        Post.objects.create(title="Other", body="Body", author=other).categories.set([self.news])
+
+        self.news.delete()
+        self.assert_stats(1, 0, 1)
+        self.assertEqual(UserStats.objects.get(user=other).category_count, 0)
+        self.assertEqual(rebuild(), 0)
+
+    def test_comments_on_own_posts_are_counted(self):
+        post = self.create_post(self.tech)
+        comment = Comment.objects.create(author=self.reader, body="Nice", post=post)
+        Comment.objects.create(author=self.reader, body="Again", post=post)
+        self.assert_stats(1, 2, 1)
+
+        comment.delete()
+        self.assert_stats(1, 1, 1)
+
+    def test_deleting_a_post_removes_its_comments_and_categories(self):
+        keep = self.create_post(self.tech)
+        gone = self.create_post(self.news, self.tech)
+        Comment.objects.create(author=self.reader, body="Hi", post=gone)
+
+        gone.delete()
+        self.assert_stats(1, 0, 1)
+        self.assertTrue(Post.objects.filter(pk=keep.pk).exists())
+
+    def test_deleting_the_user_does_not_recreate_stats(self):
+        post = self.create_post(self.tech)
+        Comment.objects.create(author=self.reader, body="Hi", post=post)
+
+        self.author.delete()
+        self.assertFalse(UserStats.objects.filter(user_id=post.author_id).exists())
+
+    def test_rebuild_command_repairs_drift(self):
+        self.create_post(self.tech)
+        UserStats.objects.filter(user=self.author).update(post_count=42, category_count=0)
+
+        call_command("rebuild_user_stats", stdout=io.StringIO())
+        self.assert_stats(1, 0, 1)
+
+    def test_rebuild_tolerates_rows_inserted_during_it(self):
+        self.create_post(self.tech)
+        bulk_create = UserStats.objects.bulk_create
+
+        def concurrent_insert(*args, **kwargs):
+            # A post saved by a live request between the delete and the insert
+            UserCategoryUsage.objects.create(user=self.author, category=self.tech, post_count=7)
+            return bulk_create(*args, **kwargs)
+
+        with mock.patch.object(UserStats.objects, "bulk_create", side_effect=concurrent_insert):
+            rebuild([self.author.pk])
+
+        self.assert_stats(1, 0, 1)
+        self.assertEqual(UserCategoryUsage.objects.get(user=self.author).post_count, 1)
+
+
+class DashboardViewTests(TestCase):
+
+    def test_header_stats_come_from_the_stats_row(self):
+        user = User.objects.create_user("author")
+        category = Category.objects.create(name="Tech")
+        for _ in range(3):
+            Post.objects.create(title="Post", body="Body", author=user).categories.add(category)
+        self.client.force_login(user)
+
+        response = self.client.get(reverse("dashboard"))
+
+        self.assertEqual(response.context["user_posts_count"], 3)
+        self.assertEqual(response.context["total_comments"], 0)
+        self.assertEqual(response.context["categories_used"], 1)
+
+    def test_generation_panel_shows_own_runs_unless_staff(self):
+        user = User.objects.create_user("author")
+        other = User.objects.create_user("other")
+        for author, outcome in ((user, GenerationRun.OUTCOME_OK), (other, GenerationRun.OUTCOME_FAILED)):
+            GenerationRun.objects.create(
+                author=author, source=GenerationRun.SOURCE_JOB, keyword="k", model="m",
+                outcome=outcome, total_ms=1000,
+            )
+        self.client.force_login(user)
+
+        response = self.client.get(reverse("dashboard"))
+        self.assertEqual(response.context["generation_stats"]["total"], 1)
+        self.assertContains(response, "Failure rate: <strong>0.0%</strong>")
 
-# Create your tests here.
+        user.is_staff = True
+        user.save()
+        response = self.client.get(reverse("dashboard"))
+        self.assertEqual(response.context["generation_stats"]["failure_rate"], 50.0)
@@ -1,32 +1,54 @@
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import HttpResponseForbidden
+from django.utils import timezone
+from ai_generator import telemetry
+from ai_generator.models import GenerationRun
 from blog.models import Post, Comment, Category
 from blog.forms import PostForm
+from .stats import get_stats
 
 
 @login_required
-def dashboard_view(request):
+async def dashboard_view(request):
     """
     Main dashboard view with user statistics and recent posts
     """
-    # Get all posts created by the logged-in user
-    user_posts = Post.objects.filter(author=request.user).order_by("-created_on")
-    
-    # Calculate user statistics
-    user_posts_count = user_posts.count()
-    total_comments = Comment.objects.filter(post__author=request.user).count()
-    categories_used = user_posts.values('categories').distinct().count()
+    user = await request.auser()
+
+    # Last 10 posts created by the logged-in user
+    user_posts = [
+        post async for post in
+        Post.objects.filter(author=user)
+        .only("id", "title", "created_on", "word_count", "duplicate_of_id")
+        .order_by("-created_on")[:10]
+    ]
+    
+    # User statistics come from one denormalized row (see dashboard.signals)
+    stats = await sync_to_async(get_stats)(user)
+
+    # AI generation telemetry: staff see every author's runs
+    days = settings.AI_TELEMETRY_PANEL_DAYS
+    runs = GenerationRun.objects.filter(created_on__gte=timezone.now() - timedelta(days=days))
+    if not user.is_staff:
+        runs = runs.filter(author=user)
+    generation_stats = await sync_to_async(telemetry.summary)(runs)
     
     context = {
-        "user": request.user,
-        "user_posts": user_posts[:10],  # Show last 10 posts
-        "user_posts_count": user_posts_count,
-        "total_comments": total_comments,
-        "categories_used": categories_used,
+        "user": user,
+        "user_posts": user_posts,
+        "user_posts_count": stats.post_count,
+        "total_comments": stats.comment_count,
+        "categories_used": stats.category_count,
+        "generation_stats": generation_stats,
+        "generation_days": days,
     }
-    return render(request, "dashboard/dashboard.html", context)
+    return await sync_to_async(render)(request, "dashboard/dashboard.html", context)
 
 
 @login_required
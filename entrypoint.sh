@@ -12,12 +12,21 @@ echo "✅ PostgreSQL is ready!"
 echo "🔄 Running database migrations..."
 python manage.py migrate --noinput
 
+echo "🔄 Creating cache tables..."
+python manage.py createcachetable
+
 # Check if populate_categories command exists
 if python manage.py help populate_categories >/dev/null 2>&1; then
   echo "🔄 Populating categories..."
   python manage.py populate_categories || true
 fi
 
+echo "🔄 Rendering stale post HTML, excerpts and signatures..."
+python manage.py render_posts || true
+
+echo "🔄 Building related-posts index (first start only)..."
+python manage.py build_related_posts --if-missing || true
+
 echo "🔄 Collecting static files..."
 python manage.py collectstatic --noinput
 
@@ -32,5 +41,5 @@ if not User.objects.filter(username='${DJANGO_SUPERUSER_USERNAME}').exists():
 " || true
 fi
 
-echo "🚀 Starting Gunicorn server..."
-exec python -m gunicorn simple_blog_ai.wsgi:application --bind 0.0.0.0:8000 -c gunicorn_config.py
+echo "🚀 Starting Gunicorn server (${SERVER_PROFILE:-wsgi})..."
+exec python -m gunicorn -c gunicorn_config.py
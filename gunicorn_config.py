@@ -1,8 +1,27 @@
+import os
+
 bind = "0.0.0.0:8000"
 workers = 2
 timeout = 120
 graceful_timeout = 30
-worker_class = "sync"
 accesslog = "-"
 errorlog = "-"
 loglevel = "info"
+
+# SERVER_PROFILE=wsgi: sync workers, one request per worker at a time; SSE
+# generations and sitemaps still stream (from sync iterators), but hold their
+# worker until they finish
+# SERVER_PROFILE=asgi: uvicorn workers; async views share one event loop per
+# worker, so slow AI generations and page reads no longer tie up a worker
+if os.environ.get("SERVER_PROFILE", "wsgi") == "asgi":
+    wsgi_app = "simple_blog_ai.asgi:application"
+    worker_class = "uvicorn_worker.UvicornWorker"
+else:
+    wsgi_app = "simple_blog_ai.wsgi:application"
+    worker_class = "sync"
+
+
+def post_fork(server, worker):
+    # Each worker builds its own pooled AI/search clients
+    from ai_generator import clients
+    clients.reset()
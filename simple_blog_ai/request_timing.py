@@ -0,0 +1,214 @@
+"""
+Per-request timing: SQL, templates and external AI/search calls
+RequestTimingMiddleware adds a Server-Timing header, logs one JSON line per
+request, and warns about slow requests and repeated (N+1) queries.
+Off unless REQUEST_TIMING is set; then the middleware is removed at startup
+and nothing below is installed.
+"""
+import json
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.backends.signals import connection_created
+from django.db import connections
+
+logger = logging.getLogger("simple_blog_ai.requests")
+
+# Stats of the request being served; sync_to_async threads inherit it
+_current = ContextVar("request_timing", default=None)
+
+
+class RequestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.template = 0.0
+        self.template_depth = 0
+        self.external = Counter()
+        self.statements = Counter()
+
+    def duplicates(self, threshold):
+        """
+        Statements run at least `threshold` times, most repeated first
+        """
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= threshold]
+
+
+@contextmanager
+def timed(kind):
+    """
+    Add the time spent in the block to the current request under `kind`
+    ("ai", "search"); free when no request is being timed
+    """
+    stats = _current.get()
+    if stats is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.external[kind] += time.perf_counter() - started
+
+
+def _sql_wrapper(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db += time.perf_counter() - started
+        stats.queries += 1
+        # Same SQL with different parameters is the N+1 signature
+        stats.statements[sql] += 1
+
+
+def _add_sql_wrapper(sender, connection, **kwargs):
+    if _sql_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_sql_wrapper)
+
+
+def _patch_templates():
+    """
+    Time Django template rendering; nested renders count once
+    """
+    from django.template.backends.django import Template
+
+    if getattr(Template.render, "_timed", False):
+        return
+    original = Template.render
+
+    def render(self, context=None, request=None):
+        stats = _current.get()
+        if stats is None:
+            return original(self, context, request)
+        stats.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return original(self, context, request)
+        finally:
+            stats.template_depth -= 1
+            if not stats.template_depth:
+                stats.template += time.perf_counter() - started
+
+    render._timed = True
+    Template.render = render
+
+
+def _install():
+    connection_created.connect(_add_sql_wrapper, dispatch_uid="request_timing")
+    for connection in connections.all(initialized_only=True):
+        _add_sql_wrapper(None, connection)
+    _patch_templates()
+
+
+class RequestTimingMiddleware:
+    """
+    Records timings for each request; see the module docstring
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_TIMING:
+            raise MiddlewareNotUsed
+        _install()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = _current.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, stats)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, stats)
+
+    def _finish(self, request, response, stats):
+        response["Server-Timing"] = self._server_timing(stats)
+        if response.streaming:
+            # AI time keeps accruing while the body streams; log at the end
+            response.streaming_content = self._log_after(request, response, stats)
+        else:
+            self._log(request, response, stats)
+        return response
+
+    def _log_after(self, request, response, stats):
+        content = response.streaming_content
+
+        if response.is_async:
+            async def stream():
+                token = _current.set(stats)
+                try:
+                    async for chunk in content:
+                        yield chunk
+                finally:
+                    _current.reset(token)
+                    self._log(request, response, stats)
+        else:
+            def stream():
+                token = _current.set(stats)
+                try:
+                    yield from content
+                finally:
+                    _current.reset(token)
+                    self._log(request, response, stats)
+        return stream()
+
+    def _server_timing(self, stats):
+        metrics = [
+            f"total;dur={(time.perf_counter() - stats.started) * 1000:.1f}",
+            f'db;dur={stats.db * 1000:.1f};desc="{stats.queries} queries"',
+            f"tpl;dur={stats.template * 1000:.1f}",
+        ]
+        metrics += [
+            f"{kind};dur={seconds * 1000:.1f}" for kind, seconds in sorted(stats.external.items())
+        ]
+        return ", ".join(metrics)
+
+    def _log(self, request, response, stats):
+        total = (time.perf_counter() - stats.started) * 1000
+        duplicates = stats.duplicates(settings.REQUEST_TIMING_DUPLICATE_QUERIES)
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "total_ms": round(total, 1),
+            "queries": stats.queries,
+            "db_ms": round(stats.db * 1000, 1),
+            "template_ms": round(stats.template * 1000, 1),
+            **{f"{kind}_ms": round(s * 1000, 1) for kind, s in stats.external.items()},
+        }
+        if duplicates:
+            record["duplicate_queries"] = [
+                {"sql": sql[:200], "count": n} for sql, n in duplicates[:5]
+            ]
+
+        slow = total >= settings.REQUEST_TIMING_SLOW_MS
+        if slow:
+            record["slow"] = True
+        level = logging.WARNING if slow or duplicates else logging.INFO
+        logger.log(level, json.dumps(record))
@@ -38,6 +38,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "accounts",
     "dashboard",
     "ai_generator",
@@ -45,6 +46,8 @@ INSTALLED_APPS = [
 
 # Middleware 
 MIDDLEWARE = [
+    # Outermost, so its totals cover the whole stack; inactive unless REQUEST_TIMING
+    "simple_blog_ai.request_timing.RequestTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -70,6 +73,7 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "blog.context_processors.categories",
             ],
         },
     },
@@ -88,6 +92,63 @@ DATABASES = {
 }
 
 
+# Caches. Set REDIS_URL (docker-compose runs Redis) so every web and worker
+# process shares them: page cache invalidation, search/completion single-flight
+# locks and hit counters all rely on that. Without it each process gets its own
+# local-memory cache, which only suits runserver or a single worker.
+# DatabaseCache still works via CACHE_BACKEND (needs `manage.py createcachetable`)
+# but culls arbitrary rows instead of LRU, its incr() is read-then-write so
+# concurrent counters lose updates, and it puts page cache traffic on PostgreSQL.
+REDIS_URL = config("REDIS_URL", default="")
+CACHE_BACKEND = config(
+    "CACHE_BACKEND",
+    default="django.core.cache.backends.redis.RedisCache" if REDIS_URL
+    else "django.core.cache.backends.locmem.LocMemCache",
+)
+SEARCH_CACHE_TTL = config("SEARCH_CACHE_TTL", default=60 * 60 * 24, cast=int)
+SEARCH_CACHE_MAX_ENTRIES = config("SEARCH_CACHE_MAX_ENTRIES", default=5000, cast=int)
+SEARCH_CACHE_LOCK_TIMEOUT = config("SEARCH_CACHE_LOCK_TIMEOUT", default=15, cast=int)
+SEARCH_CACHE_WAIT_INTERVAL = config("SEARCH_CACHE_WAIT_INTERVAL", default=0.1, cast=float)
+# Anonymous blog pages; 0 disables the page cache
+PAGE_CACHE_TTL = config("PAGE_CACHE_TTL", default=60 * 10, cast=int)
+PAGE_CACHE_MAX_ENTRIES = config("PAGE_CACHE_MAX_ENTRIES", default=10000, cast=int)
+# s-maxage sent with anonymous blog pages, for a reverse proxy/CDN in front
+HTTP_CACHE_SHARED_MAX_AGE = config("HTTP_CACHE_SHARED_MAX_AGE", default=60, cast=int)
+
+
+def _cache(location_setting, default_location, max_entries=None, **extra):
+    """
+    One CACHES entry on CACHE_BACKEND
+    Redis entries share the server (bounded by its maxmemory LRU policy); the
+    other backends get their own location and MAX_ENTRIES
+    """
+    if CACHE_BACKEND.endswith("RedisCache"):
+        return {"BACKEND": CACHE_BACKEND, "LOCATION": REDIS_URL, **extra}
+    cache = {
+        "BACKEND": CACHE_BACKEND,
+        "LOCATION": config(location_setting, default=default_location),
+        **extra,
+    }
+    if max_entries:
+        cache["OPTIONS"] = {"MAX_ENTRIES": max_entries}
+    return cache
+
+
+CACHES = {
+    "default": _cache("CACHE_LOCATION", "django_cache"),
+    # ValueSerp search context, keyed on (keyword, country, lang)
+    "search": _cache(
+        "SEARCH_CACHE_LOCATION", "search_cache", SEARCH_CACHE_MAX_ENTRIES,
+        KEY_PREFIX="search", TIMEOUT=SEARCH_CACHE_TTL,
+    ),
+    # Rendered index/category/detail pages for anonymous readers (blog.page_cache)
+    "pages": _cache(
+        "PAGE_CACHE_LOCATION", "page_cache", PAGE_CACHE_MAX_ENTRIES,
+        KEY_PREFIX="pages", TIMEOUT=PAGE_CACHE_TTL,
+    ),
+}
+
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
@@ -117,7 +178,106 @@ LOGIN_URL = "/accounts/login/"
 LOGIN_REDIRECT_URL = "/dashboard/"
 LOGOUT_REDIRECT_URL = "/accounts/login/"
 
-# AI keys
-OPENAI_API_KEY = config("OPENAI_API_KEY")
-VALUESERP_API_KEY = config("VALUESERP_API_KEY")
+# AI keys (not needed with the fake providers below)
+OPENAI_API_KEY = config("OPENAI_API_KEY", default="")
+VALUESERP_API_KEY = config("VALUESERP_API_KEY", default="")
 DEFAULT_COUNTRY = config("DEFAULT_COUNTRY", default="us")
+
+# Generation backends (ai_generator.providers): "openai"/"valueserp", "fake"
+# for offline load tests, or a dotted path to a provider class
+AI_LLM_PROVIDER = config("AI_LLM_PROVIDER", default="openai")
+AI_SEARCH_PROVIDER = config("AI_SEARCH_PROVIDER", default="valueserp")
+# Fake providers: deterministic output; seconds to first token and per
+# search, tokens per second, tokens per streamed chunk, article length, and
+# the share of calls failing with AI_FAKE_ERROR_STATUS (seeded sequence)
+AI_FAKE_LATENCY = config("AI_FAKE_LATENCY", default=0.5, cast=float)
+AI_FAKE_SEARCH_LATENCY = config("AI_FAKE_SEARCH_LATENCY", default=0.2, cast=float)
+AI_FAKE_TOKENS_PER_SECOND = config("AI_FAKE_TOKENS_PER_SECOND", default=50.0, cast=float)
+AI_FAKE_CHUNK_TOKENS = config("AI_FAKE_CHUNK_TOKENS", default=5, cast=int)
+AI_FAKE_ARTICLE_WORDS = config("AI_FAKE_ARTICLE_WORDS", default=900, cast=int)
+AI_FAKE_ERROR_RATE = config("AI_FAKE_ERROR_RATE", default=0.0, cast=float)
+AI_FAKE_ERROR_STATUS = config("AI_FAKE_ERROR_STATUS", default=503, cast=int)
+AI_FAKE_SEED = config("AI_FAKE_SEED", default=0, cast=int)
+
+# Upstream endpoints (override to point at a proxy or a local fake)
+OPENAI_BASE_URL = config("OPENAI_BASE_URL", default="") or None
+VALUESERP_URL = config("VALUESERP_URL", default="https://api.valueserp.com/search")
+
+# Keep-alive connection pools shared by every ArticleGenerator in a process
+AI_HTTP_MAX_CONNECTIONS = config("AI_HTTP_MAX_CONNECTIONS", default=20, cast=int)
+AI_HTTP_MAX_KEEPALIVE = config("AI_HTTP_MAX_KEEPALIVE", default=10, cast=int)
+AI_HTTP_KEEPALIVE_EXPIRY = config("AI_HTTP_KEEPALIVE_EXPIRY", default=30.0, cast=float)
+
+# Upstream resilience (ai_generator.resilience): consecutive failures that
+# open an endpoint's circuit breaker, seconds until it lets a trial call
+# through, retries of 429/5xx/connection errors, base backoff, and the total
+# seconds (attempts, backoff) each call may take
+AI_BREAKER_FAILURES = config("AI_BREAKER_FAILURES", default=5, cast=int)
+AI_BREAKER_RESET = config("AI_BREAKER_RESET", default=30.0, cast=float)
+AI_RETRY_BACKOFF = config("AI_RETRY_BACKOFF", default=0.5, cast=float)
+AI_SEARCH_RETRIES = config("AI_SEARCH_RETRIES", default=1, cast=int)
+AI_SEARCH_BUDGET = config("AI_SEARCH_BUDGET", default=5.0, cast=float)
+AI_OPENAI_RETRIES = config("AI_OPENAI_RETRIES", default=2, cast=int)
+AI_OPENAI_BUDGET = config("AI_OPENAI_BUDGET", default=180.0, cast=float)
+
+# AI generation worker (manage.py run_generation_worker)
+AI_WORKER_CONCURRENCY = config("AI_WORKER_CONCURRENCY", default=4, cast=int)
+AI_WORKER_POLL_INTERVAL = config("AI_WORKER_POLL_INTERVAL", default=2.0, cast=float)
+AI_WORKER_STALE_AFTER = config("AI_WORKER_STALE_AFTER", default=600, cast=int)
+AI_JOB_POLL_SECONDS = config("AI_JOB_POLL_SECONDS", default=3, cast=int)
+
+# Generation dedupe: identical prompts share one completion
+AI_DEDUPE_REUSE_WINDOW = config("AI_DEDUPE_REUSE_WINDOW", default=600, cast=int)
+AI_DEDUPE_LOCK_TIMEOUT = config("AI_DEDUPE_LOCK_TIMEOUT", default=180, cast=int)
+AI_DEDUPE_WAIT_INTERVAL = config("AI_DEDUPE_WAIT_INTERVAL", default=0.5, cast=float)
+
+# Generation telemetry (ai_generator.telemetry): days covered by the
+# dashboard's latency/token panel
+AI_TELEMETRY_PANEL_DAYS = config("AI_TELEMETRY_PANEL_DAYS", default=30, cast=int)
+
+# Blog listings
+BLOG_PAGE_SIZE = config("BLOG_PAGE_SIZE", default=10, cast=int)
+BLOG_COMMENTS_PAGE_SIZE = config("BLOG_COMMENTS_PAGE_SIZE", default=20, cast=int)
+BLOG_SEARCH_MAX_PAGES = config("BLOG_SEARCH_MAX_PAGES", default=20, cast=int)
+
+# Related posts (blog.related): neighbours per post, score added for a
+# shared category, and vocabulary size of the TF-IDF index
+RELATED_POSTS = config("RELATED_POSTS", default=5, cast=int)
+RELATED_CATEGORY_BOOST = config("RELATED_CATEGORY_BOOST", default=0.1, cast=float)
+RELATED_MAX_TERMS = config("RELATED_MAX_TERMS", default=50000, cast=int)
+# Saved posts are queued and re-scored by run_generation_worker, this many
+# per pass, so only the worker process holds the index in memory
+RELATED_UPDATE_BATCH = config("RELATED_UPDATE_BATCH", default=200, cast=int)
+
+# Near-duplicate check on generated articles (blog.duplicates): "flag" saves
+# and links the closest post, "block" rejects the article, "off" skips it.
+# Distance is in differing SimHash bits; above 3 some matches are missed
+DUPLICATE_ACTION = config("DUPLICATE_ACTION", default="flag")
+DUPLICATE_MAX_DISTANCE = config("DUPLICATE_MAX_DISTANCE", default=3, cast=int)
+
+# RSS/Atom feeds and sitemaps (cached with the anonymous pages)
+FEED_ITEMS = config("FEED_ITEMS", default=30, cast=int)
+# Posts per sitemap page; the protocol allows at most 50,000 URLs
+SITEMAP_PAGE_SIZE = config("SITEMAP_PAGE_SIZE", default=10000, cast=int)
+
+# Request timing (simple_blog_ai.request_timing): Server-Timing header and
+# one JSON log line per request with SQL, template and AI/search time
+REQUEST_TIMING = config("REQUEST_TIMING", default=False, cast=bool)
+REQUEST_TIMING_SLOW_MS = config("REQUEST_TIMING_SLOW_MS", default=500, cast=int)
+# Warn when one SQL statement runs this many times in a request (N+1)
+REQUEST_TIMING_DUPLICATE_QUERIES = config("REQUEST_TIMING_DUPLICATE_QUERIES", default=5, cast=int)
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "simple_blog_ai.requests": {
+            "handlers": ["console"],
+            "level": config("REQUEST_TIMING_LOG_LEVEL", default="INFO"),
+            "propagate": False,
+        },
+    },
+}
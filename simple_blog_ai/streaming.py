@@ -0,0 +1,39 @@
+"""
+Streamed responses that stream under both WSGI and ASGI
+Django buffers an async iterator completely when serving it over WSGI (and a
+sync one over ASGI), so views hand over a sync iterator under WSGI and an
+async one under ASGI.
+"""
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+# Chunks pulled per thread hop when a sync iterator is served over ASGI
+BATCH_SIZE = 200
+
+
+def is_asgi(request):
+    return isinstance(request, ASGIRequest)
+
+
+async def aiterate(iterable, batch_size=BATCH_SIZE):
+    """
+    Async iterator over a sync iterable that may touch the database
+    Batches are pulled on the request's sync thread, like the async ORM does
+    """
+    iterator = iter(iterable)
+    next_batch = sync_to_async(lambda: list(islice(iterator, batch_size)))
+    while batch := await next_batch():
+        for chunk in batch:
+            yield chunk
+
+
+def streaming_response(request, content, **kwargs):
+    """
+    StreamingHttpResponse over a sync iterable, adapted for ASGI
+    """
+    if is_asgi(request):
+        content = aiterate(content)
+    return StreamingHttpResponse(content, **kwargs)